@@ -0,0 +1,306 @@
+"""Headless scheduling API: a library, an HTTP/JSON service and a CLI.
+
+    python api.py serve --port 8080
+    curl 'localhost:8080/cheapest-window?region=A&hours=4'
+    python api.py tomorrow --region A --hours 3
+
+Everything reads the same in-memory DataService snapshot the dashboard
+uses; nothing here imports streamlit or plotly, and xgboost is only
+loaded by the first forecast request.
+"""
+import argparse
+import inspect
+import json
+import os
+import sys
+import threading
+from datetime import datetime, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+import pytz
+from data_service import DataService
+from instrumentation import incr, metrics, timer
+from price_calculator import PriceCalculator
+from price_series import SLOT_SECONDS
+from regions import REGION_CODES
+from window_index import WindowIndex
+
+DEFAULT_PRODUCT_CODE = os.environ.get("OCTOPUS_PRODUCT_CODE", "AGILE-18-02-21")
+MAX_WINDOW_HOURS = 12
+
+
+def _flag(value):
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+def _region(value):
+    # Unknown codes would be fetched upstream on every refresh and used as a store path
+    if value not in REGION_CODES:
+        raise ValueError(f"unknown region {value!r}; expected one of {', '.join(REGION_CODES)}")
+    return value
+
+
+# Query-string / command-line parameter parsers
+PARAM_TYPES = {
+    "region": _region,
+    "hours": int,
+    "from_now": _flag,
+    "battery_capacity": float,
+    "current_soc": float,
+    "target_soc": float,
+    "charger_kw": float,
+    "deadline": str,
+}
+
+
+class SchedulingAPI:
+    """Schedule queries over shared in-memory price data, with no UI attached.
+
+    Methods take plain values and return JSON-ready dicts. A WindowIndex
+    over today onwards is kept per region and rebuilt only when that
+    region's series is replaced or the local date changes, so window
+    queries are a few array reads.
+    """
+
+    def __init__(self, product_code=DEFAULT_PRODUCT_CODE, service=None, registry=None,
+                 timezone="Europe/London"):
+        self.product_code = product_code
+        self.service = service or DataService(product_code)
+        self.timezone = timezone
+        self.tz = pytz.timezone(timezone)
+        self._registry = registry
+        self._indexes = {}  # region -> (prices, date, WindowIndex)
+        self._lock = threading.Lock()
+
+    def _now(self):
+        return datetime.now(self.tz)
+
+    def _index(self, region):
+        prices = self.service.prices(region)
+        today = self._now().date()
+        entry = self._indexes.get(region)
+        if entry is not None and entry[0] is prices and entry[1] == today:
+            incr("api.window_index_hit")
+            return entry[2]
+        with self._lock:
+            entry = self._indexes.get(region)
+            if entry is None or entry[0] is not prices or entry[1] != today:
+                incr("api.window_index_miss")
+                midnight = self.tz.localize(datetime.combine(today, time()))
+                entry = self._indexes[region] = (prices, today, WindowIndex(prices.after(midnight)))
+        return entry[2]
+
+    def _forecast_registry(self):
+        if self._registry is None:
+            from model_registry import ForecastRegistry
+
+            self._registry = ForecastRegistry()
+        return self._registry
+
+    @staticmethod
+    def _check_hours(hours):
+        if not 1 <= hours <= MAX_WINDOW_HOURS:
+            raise ValueError(f"hours must be between 1 and {MAX_WINDOW_HOURS}")
+
+    def _window(self, region, prices, start, hours, avg_price):
+        if start is None:
+            return {"region": region, "hours": hours, "start": None, "end": None, "avg_price": None, "cost_1kw": None}
+        end = prices.local_time(start + hours * 2 - 1) + timedelta(seconds=SLOT_SECONDS)
+        return {
+            "region": region,
+            "hours": hours,
+            "start": prices.local_time(start).isoformat(),
+            "end": end.isoformat(),
+            "avg_price": avg_price,
+            "cost_1kw": avg_price * hours,
+        }
+
+    # --- Queries ---
+    @timer("api.current_price")
+    def current_price(self, region):
+        prices = self.service.prices(region)
+        i = prices.slot_at(self._now())
+        if i is None:
+            return {"region": region, "start": None, "price_gbp": None}
+        return {"region": region, "start": prices.local_time(i).isoformat(), "price_gbp": float(prices.prices[i])}
+
+    @timer("api.cheapest_window")
+    def cheapest_window(self, region, hours=4, from_now=True):
+        """Cheapest contiguous window from now (or from today's midnight)."""
+        self._check_hours(hours)
+        index = self._index(region)
+        start, avg_price = index.cheapest_within(hours, self._now() if from_now else None)
+        return self._window(region, index.prices, start, hours, avg_price)
+
+    @timer("api.tomorrow_window")
+    def tomorrow_window(self, region, hours=4):
+        """Cheapest window inside tomorrow; `slots` is 0 until prices are released."""
+        self._check_hours(hours)
+        index = self._index(region)
+        tomorrow = (self._now() + timedelta(days=1)).date()
+        start, avg_price = index.cheapest_on_day(hours, tomorrow)
+        result = self._window(region, index.prices, start, hours, avg_price)
+        result["slots"] = len(index.prices.day(tomorrow))
+        return result
+
+    @timer("api.savings")
+    def savings(self, region, battery_capacity, current_soc, target_soc, hours=4):
+        """Cost of charging now vs in the cheapest window."""
+        self._check_hours(hours)
+        index = self._index(region)
+        calculator = PriceCalculator(index.prices, battery_capacity, current_soc, target_soc, hours,
+                                     self.timezone, index=index)
+        result = calculator.calculate_savings()
+        result.pop("window_df")
+        for key in ("price_time", "start_time", "end_time"):
+            if result[key] is not None:
+                result[key] = result[key].isoformat()
+        return result
+
+    @timer("api.schedule")
+    def schedule(self, region, battery_capacity, current_soc, target_soc, charger_kw=7.4, deadline=None):
+        """Cheapest (possibly non-contiguous) slots between now and `deadline` (ISO time, local if no offset; default +12h)."""
+        index = self._index(region)
+        if deadline is None:
+            deadline = self._now() + timedelta(hours=MAX_WINDOW_HOURS)
+        else:
+            deadline = datetime.fromisoformat(deadline)
+            if deadline.tzinfo is None:
+                deadline = self.tz.localize(deadline)
+        calculator = PriceCalculator(index.prices, battery_capacity, current_soc, target_soc, 1, self.timezone)
+        plan = calculator.schedule_charging(charger_kw, deadline)
+        slots = plan.pop("schedule_df")
+        plan["slots"] = [
+            {"start": row.valid_from_bst.isoformat(), "price_gbp": float(row.price_gbp),
+             "energy_kwh": float(row.energy_kwh), "cost": float(row.cost)}
+            for row in slots.itertuples()
+        ]
+        return plan
+
+    @timer("api.forecast")
+    def forecast(self, region):
+        """Next-day price forecast; trains (or reuses) the region's model."""
+        prices = self.service.prices(region)
+        if prices.empty:
+            return {"region": region, "forecast": [], "metrics": {}}
+        forecaster = self._forecast_registry().get(f"{self.product_code}-{region}", prices)
+        forecast_df = forecaster.predict_next_day(prices)
+        return {
+            "region": region,
+            "forecast": [
+                {"start": row.valid_from_bst.isoformat(), "predicted_price": float(row.predicted_price)}
+                for row in forecast_df.itertuples()
+            ],
+            "metrics": forecaster.metrics.get("test", {}),
+        }
+
+    @timer("api.forecast_all")
+    def forecast_all(self):
+        """Next-day forecast for every region from one global model."""
+        series = {code: prices for code, prices in self.service.prices_for(REGION_CODES).items() if not prices.empty}
+        if not series:
+            return {"regions": {}, "metrics": {}}
+        from forecast_pipeline import global_forecaster
+
+        forecaster = global_forecaster(self._forecast_registry(), f"{self.product_code}-global", series)
+        forecast_df = forecaster.predict(series)
+        return {
+            "regions": {
+                code: [{"start": start.isoformat(), "predicted_price": float(price)}
+                       for start, price in forecast_df[code].items()]
+                for code in forecast_df.columns
+            },
+            "metrics": forecaster.metrics.get("test") or {},
+        }
+
+
+ENDPOINTS = {
+    "current": "current_price",
+    "cheapest-window": "cheapest_window",
+    "tomorrow": "tomorrow_window",
+    "savings": "savings",
+    "schedule": "schedule",
+    "forecast": "forecast",
+    "forecast-all": "forecast_all",
+}
+
+
+def call(api, endpoint, params):
+    """Run one endpoint with string parameters (from a query string or the CLI)."""
+    method = getattr(api, ENDPOINTS[endpoint])
+    unknown = set(params) - set(inspect.signature(method).parameters)
+    if unknown:
+        raise ValueError(f"unknown parameter(s): {', '.join(sorted(unknown))}")
+    return method(**{k: PARAM_TYPES[k](v) for k, v in params.items()})
+
+
+def make_server(api, host="0.0.0.0", port=8080):
+    """A threaded HTTP server: GET /<endpoint>?region=...; also /health and /metrics."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body, content_type="application/json"):
+            body = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            endpoint = url.path.strip("/")
+            if endpoint == "health":
+                return self._send(200, json.dumps({"status": "ok", "version": api.service.snapshot().version}))
+            if endpoint == "metrics":
+                return self._send(200, metrics.prometheus_text(), "text/plain; version=0.0.4")
+            if endpoint not in ENDPOINTS:
+                return self._send(404, json.dumps({"error": f"unknown endpoint {url.path}"}))
+            try:
+                result = call(api, endpoint, dict(parse_qsl(url.query)))
+            except (TypeError, ValueError) as e:
+                return self._send(400, json.dumps({"error": str(e)}))
+            except Exception as e:
+                return self._send(502, json.dumps({"error": str(e)}))
+            self._send(200, json.dumps(result, default=str))
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--product", default=DEFAULT_PRODUCT_CODE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the HTTP/JSON service")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8080)
+    for endpoint, name in ENDPOINTS.items():
+        method = getattr(SchedulingAPI, name)
+        sub = commands.add_parser(endpoint, help=(method.__doc__ or "").split("\n")[0] or None)
+        for param in list(inspect.signature(method).parameters.values())[1:]:
+            required = param.default is inspect.Parameter.empty
+            sub.add_argument("--" + param.name.replace("_", "-"), dest=param.name, required=required,
+                             default=None if required else param.default)
+    args = vars(parser.parse_args(argv))
+
+    api = SchedulingAPI(args.pop("product"))
+    command = args.pop("command")
+    if command == "serve":
+        # Keep prices fresh in the background; regions load on first request
+        api.service.start()
+        server = make_server(api, args["host"], args["port"])
+        print(f"Serving on http://{args['host']}:{args['port']}")
+        server.serve_forever()
+        return 0
+    params = {k: str(v) for k, v in args.items() if v is not None}
+    json.dump(call(api, command, params), sys.stdout, indent=2, default=str)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
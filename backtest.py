@@ -0,0 +1,191 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from price_series import PriceSeries, SLOT_SECONDS
+from price_store import PriceStore, DEFAULT_STORE_DIR
+from slot_scheduler import SLOT_HOURS, fill_in_order
+
+
+class Sessions:
+    """One overnight charging session per day, as (days, slots) arrays.
+
+    Row d covers the slots from `plug_in` local time on day d up to
+    `departure` the next morning. Days with any missing slot are dropped.
+    Padding beyond a shorter (DST) session is NaN in `prices`.
+    `carbon` is an optional PriceSeries of gCO₂/kWh on the same slots
+    (e.g. a region's Carbon Intensity history); slots it lacks are NaN,
+    and an empty series is treated as no carbon data.
+    """
+
+    def __init__(self, prices, start_date, end_date, plug_in="18:00", departure="07:00",
+                 kwh_needed=30.0, charger_kw=7.4, carbon=None, timezone="Europe/London"):
+        self.history = prices
+        self.kwh_needed = kwh_needed
+        self.slot_cap = charger_kw * SLOT_HOURS
+        days = pd.date_range(start_date, end_date, freq="D")
+
+        def epochs(clock, offset):
+            local = (days + pd.Timedelta(days=offset) + pd.Timedelta(clock + ":00")).tz_localize(
+                timezone, ambiguous=np.zeros(len(days), dtype=bool), nonexistent="shift_forward")
+            return ((local - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+
+        plug_s = epochs(plug_in, 0)
+        depart_s = epochs(departure, 1 if departure <= plug_in else 0)
+        expected = (depart_s - plug_s) // SLOT_SECONDS
+        width = int(expected.max()) if len(expected) else 0
+        wanted = plug_s[:, None] + SLOT_SECONDS * np.arange(width)
+        inside = np.arange(width) < expected[:, None]
+
+        idx = np.searchsorted(prices.starts, plug_s)[:, None] + np.arange(width)
+        safe = np.clip(idx, 0, max(len(prices) - 1, 0))
+        if len(prices):
+            present = (idx < len(prices)) & (prices.starts[safe] == wanted)
+            values = prices.prices[safe]
+        else:
+            present = np.zeros(idx.shape, dtype=bool)
+            values = np.zeros(idx.shape)
+        # A day is usable only if every slot it needs is present and in place
+        complete = ((present | ~inside).all(axis=1)) & (expected > 0)
+
+        self.days = days[complete]
+        self.starts = wanted[complete]
+        self.prices = np.where(inside, values, np.nan)[complete].astype(np.float64)
+        self.carbon = None
+        if carbon is not None and len(carbon):
+            cols = np.searchsorted(carbon.starts, self.starts)
+            cols = np.minimum(cols, len(carbon) - 1)
+            found = carbon.starts[cols] == self.starts
+            self.carbon = np.where(found, carbon.prices[cols], np.nan).astype(np.float64)
+
+    def __len__(self):
+        return len(self.days)
+
+
+class ChargeOnPlugIn:
+    """Baseline: charge at full rate from the moment the car is plugged in."""
+    name = "plug_in"
+
+    def plan(self, sessions):
+        caps = np.where(np.isnan(sessions.prices), 0.0, sessions.slot_cap)
+        order = np.broadcast_to(np.arange(caps.shape[1]), caps.shape)
+        return fill_in_order(order, caps, sessions.kwh_needed)
+
+
+class CheapestContiguous:
+    """Full rate through the cheapest contiguous block long enough for the energy."""
+    name = "cheapest_window"
+
+    def plan(self, sessions):
+        n_days, width = sessions.prices.shape
+        slots = max(1, min(width, math.ceil(sessions.kwh_needed / sessions.slot_cap)))
+        prices = np.where(np.isnan(sessions.prices), np.inf, sessions.prices)
+        sums = np.concatenate([np.zeros((n_days, 1)), np.cumsum(prices, axis=1)], axis=1)
+        with np.errstate(invalid="ignore"):
+            totals = sums[:, slots:] - sums[:, :-slots]
+        start = np.argmin(np.nan_to_num(totals, nan=np.inf), axis=1)
+        caps = np.zeros_like(prices)
+        cols = np.arange(width)
+        caps[(cols >= start[:, None]) & (cols < start[:, None] + slots)] = sessions.slot_cap
+        order = np.broadcast_to(cols, caps.shape)
+        return fill_in_order(order, caps, sessions.kwh_needed)
+
+
+class CheapestSlots:
+    """Cheapest (non-contiguous) half-hours of the session, at full rate."""
+    name = "cheapest_slots"
+
+    def _rank(self, sessions):
+        return np.where(np.isnan(sessions.prices), np.inf, sessions.prices)
+
+    def plan(self, sessions):
+        caps = np.where(np.isnan(sessions.prices), 0.0, sessions.slot_cap)
+        order = np.argsort(self._rank(sessions), axis=1, kind="stable")
+        return fill_in_order(order, caps, sessions.kwh_needed)
+
+
+class ForecastSlots(CheapestSlots):
+    """Cheapest slots by a PriceForecaster trained only on data before each day.
+
+    The model is refit every `retrain_days` days on the history up to
+    the plug-in time, then ranks that day's slots by predicted price.
+    """
+    name = "forecast_slots"
+
+    def __init__(self, retrain_days=7):
+        self.retrain_days = retrain_days
+
+    def _rank(self, sessions):
+        from price_prediction import PriceForecaster
+
+        history = sessions.history
+        ranks = np.full(sessions.prices.shape, np.inf)
+        forecaster = None
+        for d in range(len(sessions)):
+            if forecaster is None or d % self.retrain_days == 0:
+                cutoff = history.index_of(int(sessions.starts[d, 0]))
+                if cutoff == 0:
+                    continue
+                forecaster = PriceForecaster()
+                forecaster.fit(history.slice(0, cutoff))
+            valid = ~np.isnan(sessions.prices[d])
+            slots = PriceSeries(sessions.starts[d, valid], np.zeros(valid.sum()), history.timezone)
+            ranks[d, valid] = forecaster.model.predict(forecaster.prepare_features(slots))
+        return ranks
+
+
+DEFAULT_POLICIES = (ChargeOnPlugIn(), CheapestContiguous(), CheapestSlots(), ForecastSlots())
+
+
+def evaluate(sessions, policy, baseline=None):
+    """Per-day cost, savings against the baseline policy, and carbon for one policy.
+
+    `carbon_coverage` is the share of the day's energy drawn in slots with
+    a carbon figure; `carbon_g` is NaN unless that share is complete.
+    """
+    baseline = baseline or ChargeOnPlugIn()
+    prices = np.nan_to_num(sessions.prices)
+    energy = policy.plan(sessions)
+    cost = (energy * prices).sum(axis=1)
+    baseline_cost = (baseline.plan(sessions) * prices).sum(axis=1)
+    result = pd.DataFrame({"day": sessions.days, "cost": cost, "savings": baseline_cost - cost})
+    if sessions.carbon is not None:
+        known = ~np.isnan(sessions.carbon)
+        charged = energy.sum(axis=1)
+        covered = (energy * known).sum(axis=1)
+        result["carbon_g"] = np.where(covered >= charged - 1e-9,
+                                      (energy * np.where(known, sessions.carbon, 0)).sum(axis=1), np.nan)
+        result["carbon_coverage"] = np.divide(covered, charged, out=np.ones_like(charged), where=charged > 0)
+    return result
+
+
+def _run_one(task):
+    root, product_code, region_code, policy, carbon, session_kwargs = task
+    prices = PriceStore(root).load(product_code, region_code)
+    result = evaluate(Sessions(prices, carbon=carbon, **session_kwargs), policy)
+    result.insert(0, "policy", policy.name)
+    result.insert(0, "region", region_code)
+    return result
+
+
+def run_backtest(product_code, region_codes, start_date, end_date, policies=DEFAULT_POLICIES,
+                 root=DEFAULT_STORE_DIR, max_workers=None, carbon=None, **session_kwargs):
+    """Replay stored prices for every region x policy in a process pool.
+
+    Returns (daily, summary): one row per region/policy/day, and cost,
+    savings and carbon distributions per region and policy. `carbon` maps
+    region codes to PriceSeries of gCO₂/kWh; regions with a series get
+    `carbon_g` and `carbon_coverage` columns, the rest are costed on price
+    alone. Extra keyword arguments (plug_in, departure, kwh_needed,
+    charger_kw) go to Sessions.
+    """
+    session_kwargs.update(start_date=start_date, end_date=end_date)
+    carbon = carbon or {}
+    tasks = [(root, product_code, code, policy, carbon.get(code), session_kwargs)
+             for code in region_codes for policy in policies]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        daily = pd.concat(pool.map(_run_one, tasks), ignore_index=True)
+
+    metrics = [c for c in ("cost", "savings", "carbon_g", "carbon_coverage") if c in daily]
+    summary = daily.groupby(["region", "policy"])[metrics].describe(percentiles=[0.1, 0.5, 0.9])
+    return daily, summary
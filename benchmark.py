@@ -0,0 +1,206 @@
+"""Benchmarks for the hot paths: normalization, window search and forecasting.
+
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json --tolerance 0.25
+
+Timings are the median of --repeat runs; memory is measured in a
+separate run so it doesn't skew the timings. `python_heap_mib` is the
+tracemalloc peak, which only sees allocations made through Python (numpy
+and pandas buffers included, XGBoost's native ones not); `rss_peak_mib`
+is the growth of the resident set over the run, sampled every
+millisecond from /proc in a fresh process so memory freed by earlier
+benchmarks can't hide it (None where /proc isn't available). With
+--baseline the script exits non-zero if any benchmark got slower than
+the tolerance.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from price_calculator import PriceCalculator
+from tomorrow_window_finder import TomorrowWindowFinder
+
+SIZES = {"1d": 1, "1m": 30, "1y": 365, "10y": 3650}
+
+
+def synthetic_prices(n_days, seed=0, tz="Europe/London"):
+    """Agile-like half-hourly prices ending at the end of tomorrow.
+
+    Returns the frame shape the app has always worked with: tz-aware
+    valid_from_bst/valid_to_bst and price_gbp, with a daily peak,
+    weekly cycle and noise.
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.now(tz="UTC").floor("D") + pd.Timedelta(days=2)
+    starts = pd.date_range(end=end - pd.Timedelta(minutes=30), periods=(n_days + 1) * 48, freq="30min")
+    hours = starts.hour + starts.minute / 60
+    daily = 0.12 * np.exp(-((hours - 17.5) ** 2) / 4)
+    weekly = 0.02 * (starts.dayofweek < 5)
+    prices = 0.15 + daily + weekly + rng.normal(0, 0.03, len(starts))
+    local = starts.tz_convert(tz)
+    return pd.DataFrame({
+        "valid_from_bst": local,
+        "valid_to_bst": local + pd.Timedelta(minutes=30),
+        "price_gbp": prices.round(4),
+    })
+
+
+def benchmarks(df, include_forecast):
+    """(name, setup, fn) triples; setup runs untimed and its result is passed to fn."""
+    calculator = lambda: PriceCalculator(df, 60, 20, 80, 4)
+    cases = [
+        ("calculator_init", lambda: None, lambda _: PriceCalculator(df, 60, 20, 80, 4)),
+        ("find_cheapest_window", calculator, lambda c: c.find_cheapest_window()),
+        ("find_cheapest_window_today", calculator, lambda c: c.find_cheapest_window_today()),
+        ("find_cheapest_window_from_now", calculator, lambda c: c.find_cheapest_window_from_now()),
+        ("tomorrow_window_finder", lambda: None,
+         lambda _: TomorrowWindowFinder(df, 4).find_cheapest_window_tomorrow()),
+    ]
+    if include_forecast:
+        from price_prediction import PriceForecaster
+
+        def fitted():
+            forecaster = PriceForecaster()
+            forecaster.fit(df)
+            return forecaster
+
+        cases += [
+            ("forecaster_fit", PriceForecaster, lambda f: f.fit(df)),
+            ("forecaster_predict_next_day", fitted, lambda f: f.predict_next_day(df)),
+        ]
+    return cases
+
+
+def _rss_bytes():
+    """Current resident set size, or None off Linux."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_growth(fn, state, interval=0.001):
+    """Peak RSS above the starting RSS while fn(state) runs, sampled on a side thread."""
+    base = _rss_bytes()
+    if base is None:
+        fn(state)
+        return None
+    peak = [base]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], _rss_bytes())
+            done.wait(interval)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        fn(state)
+    finally:
+        done.set()
+        sampler.join()
+    return max(peak[0], _rss_bytes()) - base
+
+
+def _rss_growth_of(size, name, include_forecast):
+    df = synthetic_prices(SIZES[size])
+    setup, fn = {n: (s, f) for n, s, f in benchmarks(df, include_forecast)}[name]
+    return peak_rss_growth(fn, setup())
+
+
+def fresh_rss_mib(size, name, include_forecast):
+    """peak_rss_growth of one benchmark in a newly spawned process, so it starts from a clean heap."""
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        rss = pool.submit(_rss_growth_of, size, name, include_forecast).result()
+    return None if rss is None else rss / 2**20
+
+
+def measure(setup, fn, repeat):
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        fn(state)
+        times.append(time.perf_counter() - start)
+    state = setup()
+    tracemalloc.start()
+    fn(state)
+    heap = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds_median": float(np.median(times)), "seconds_min": min(times), "python_heap_mib": heap / 2**20}
+
+
+def run(sizes, repeat, include_forecast):
+    results = []
+    for size in sizes:
+        df = synthetic_prices(SIZES[size])
+        for name, setup, fn in benchmarks(df, include_forecast):
+            result = {"name": name, "size": size, "slots": len(df)}
+            result.update(measure(setup, fn, repeat))
+            result["rss_peak_mib"] = fresh_rss_mib(size, name, include_forecast)
+            results.append(result)
+            rss = "n/a" if result["rss_peak_mib"] is None else f"{result['rss_peak_mib']:.2f}"
+            print(f"{name:32s} {size:>4s} {result['seconds_median'] * 1000:10.3f} ms "
+                  f"heap {result['python_heap_mib']:8.2f} MiB  rss {rss:>8s} MiB")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Regressions: benchmarks whose median is more than `tolerance` slower than baseline."""
+    previous = {(r["name"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        before = previous.get((r["name"], r["size"]))
+        if before is None or before["seconds_median"] <= 0:
+            continue
+        ratio = r["seconds_median"] / before["seconds_median"]
+        r["baseline_ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append(r)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["1d", "1m", "1y"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-forecast", action="store_true", help="skip the XGBoost benchmarks")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="JSON from a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, not args.no_forecast)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['name']} [{r['size']}]: {r['baseline_ratio']:.2f}x baseline")
+
+    if args.output:
+        report = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,158 @@
+import logging
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
 import requests
-import streamlit as st
+from instrumentation import incr, timer
+
+CARBON_API_URL = os.environ.get("CARBON_API_URL", "https://api.carbonintensity.org.uk")
+SLOT_SECONDS = 1800  # the API's half-hour periods line up with Agile slots
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value):
+    """Epoch seconds for the API's '2018-05-15T11:30Z' timestamps."""
+    return int(datetime.strptime(value, "%Y-%m-%dT%H:%MZ").replace(tzinfo=timezone.utc).timestamp())
+
 
 class CarbonIntensity:
-    def __init__(self):
-        self.api_url = "https://api.carbonintensity.org.uk/regional"
+    """Regional carbon intensity: the current period plus a 48h forecast.
+
+    The forward forecast is held as a float32 (region id, slot) array whose
+    column 0 starts at `first_start` (UTC epoch seconds), so a region/slot
+    lookup is two dict/array indexes and a whole price series can be
+    aligned with one fancy-index. Data older than `ttl` seconds is
+    refetched on the next lookup (never, with ttl=None).
+    """
+
+    def __init__(self, ttl=1800, base_url=None, session=None, timeout=10):
+        self.api_url = f"{base_url or CARBON_API_URL}/regional"
+        self.ttl = ttl
+        self.http = session or requests
+        self.timeout = timeout
         self.cached_data = None
+        self.fetched_at = None
+        self.last_error = None
+        self._region_ids = {}  # dnoregion or shortname -> regionid
+        self._current = {}  # regionid -> current-period record
+        self.first_start = None
+        self.forecast = np.empty((0, 0), dtype=np.float32)
 
+    @timer("carbon.fetch_data")
     def fetch_data(self):
+        """Fetch the current period and forecast; on any failure keep the last good pair."""
         try:
-            response = requests.get(self.api_url)
+            incr("carbon.requests")
+            response = self.http.get(self.api_url, timeout=self.timeout)
+            response.raise_for_status()
+            cached_data = response.json()
+            region_ids, current = self._index_current(cached_data)
+
+            period = cached_data['data'][0]['from']
+            incr("carbon.requests")
+            response = self.http.get(f"{self.api_url}/intensity/{period}/fw48h", timeout=self.timeout)
             response.raise_for_status()
-            self.cached_data = response.json()
+            first_start, forecast = self._index_forecast(response.json())
         except Exception as e:
-            st.warning(f"Carbon intensity data not available: {e}")
-            self.cached_data = None
+            logger.warning("Carbon intensity data not available: %s", e)
+            self.last_error = e
+        else:
+            # Swap everything at once so lookups never mix two fetches
+            self.cached_data, self._current, self.first_start, self.forecast = cached_data, current, first_start, forecast
+            self._region_ids.update(region_ids)
+            self.last_error = None
+        self.fetched_at = time.time()
 
-    def get_intensity_by_dnoregion(self, dnoregion_name):
-        if not self.cached_data:
+    # --- Indexing ---
+    @staticmethod
+    def _index_current(payload):
+        """({dnoregion or shortname: regionid}, {regionid: record}) for the current period."""
+        region_ids, current = {}, {}
+        for region in payload['data'][0]['regions']:
+            region_id = region['regionid']
+            region_ids[region['dnoregion']] = region_id
+            region_ids[region['shortname']] = region_id
+            current[region_id] = region
+        return region_ids, current
+
+    @staticmethod
+    def _index_forecast(payload):
+        """(first_start, (region id, slot) float32 forecast) for a fw48h payload."""
+        periods = payload['data']
+        if not periods:
+            return None, np.empty((0, 0), dtype=np.float32)
+        starts = np.array([_parse_time(p['from']) for p in periods], dtype=np.int64)
+        first_start = int(starts.min())
+        n_slots = int((starts.max() - first_start) // SLOT_SECONDS) + 1
+        n_regions = max(r['regionid'] for p in periods for r in p['regions']) + 1
+        forecast = np.full((n_regions, n_slots), np.nan, dtype=np.float32)
+        for start, period in zip(starts, periods):
+            col = (start - first_start) // SLOT_SECONDS
+            for region in period['regions']:
+                forecast[region['regionid'], col] = region['intensity'].get('forecast', np.nan)
+        return first_start, forecast
+
+    # --- Lookups ---
+    def is_stale(self):
+        # ttl=None leaves refreshing to the owner (e.g. the DataService)
+        if self.fetched_at is None:
+            return True
+        return self.ttl is not None and time.time() - self.fetched_at > self.ttl
+
+    def _ensure_fresh(self):
+        if not self.cached_data or self.is_stale():
+            incr("carbon.cache_miss")
             self.fetch_data()
-        if not self.cached_data:
+        else:
+            incr("carbon.cache_hit")
+
+    def region_id(self, region):
+        """Region id for a dnoregion/shortname, or the id itself."""
+        return region if isinstance(region, (int, np.integer)) else self._region_ids.get(region)
+
+    @timer("carbon.get_intensity_by_dnoregion")
+    def get_intensity_by_dnoregion(self, dnoregion_name):
+        self._ensure_fresh()
+        region = self._current.get(self.region_id(dnoregion_name))
+        if region is None:
             return None, None
+        return region['intensity'].get('actual'), region['intensity'].get('forecast')
+
+    @timer("carbon.current")
+    def current(self):
+        """One record per region for the current period: dnoregion, forecast, index."""
+        self._ensure_fresh()
+        return [{
+            "dnoregion": r['dnoregion'],
+            "carbon": r['intensity'].get('forecast'),
+            "index": r['intensity'].get('index'),
+        } for r in self._current.values()]
+
+    @timer("carbon.forecast_at")
+    def forecast_at(self, region, epoch_seconds):
+        """Forecast gCO₂/kWh for the slot covering `epoch_seconds`, or None."""
+        self._ensure_fresh()
+        region_id = self.region_id(region)
+        if region_id is None or self.first_start is None or region_id >= len(self.forecast):
+            return None
+        col = (int(epoch_seconds) - self.first_start) // SLOT_SECONDS
+        if not 0 <= col < self.forecast.shape[1]:
+            return None
+        value = self.forecast[region_id, col]
+        return None if np.isnan(value) else float(value)
 
-        regions = self.cached_data['data'][0]['regions']
-        for region in regions:
-            if region['dnoregion'] == dnoregion_name:
-                actual = region['intensity'].get('actual')
-                forecast = region['intensity'].get('forecast')
-                return actual, forecast
-        return None, None
+    @timer("carbon.aligned")
+    def aligned(self, region, starts):
+        """Forecasts for an array of slot starts (e.g. PriceSeries.starts); NaN where unknown."""
+        self._ensure_fresh()
+        starts = np.asarray(starts, dtype=np.int64)
+        out = np.full(len(starts), np.nan, dtype=np.float32)
+        region_id = self.region_id(region)
+        if region_id is None or self.first_start is None or region_id >= len(self.forecast):
+            return out
+        cols = (starts - self.first_start) // SLOT_SECONDS
+        inside = (cols >= 0) & (cols < self.forecast.shape[1])
+        out[inside] = self.forecast[region_id, cols[inside]]
+        return out
@@ -0,0 +1,127 @@
+"""What each ev.py view computes, without Streamlit.
+
+ev.py wraps these in st.cache_resource/st.cache_data and renders the
+results; load_test.py replays the same calls under its own cache, so the
+load test measures exactly what a dashboard rerun does.
+"""
+from datetime import datetime, time, timedelta
+import pytz
+from price_calculator import PriceCalculator
+from price_series import PriceSeries
+from scenarios import ScenarioForecaster, ScenarioPlanner
+from sensitivity import SensitivityGrid
+from slot_scheduler import SLOT_HOURS
+from tomorrow_window_finder import TomorrowWindowFinder
+from window_index import WindowIndex
+from downsample import PriceViews
+from window_optimizer import WindowCandidates
+
+TODAY_WINDOW_HOURS = 4  # the advisor's "cheapest slot today" window
+
+
+def price_views(prices, today, timezone="Europe/London"):
+    """Per-prices, per-day structures every view reads: frame, tomorrow, window index and chart."""
+    midnight = pytz.timezone(timezone).localize(datetime.combine(today, time()))
+    return {
+        "frame": prices.to_frame(),
+        "tomorrow": prices.day(today + timedelta(days=1)),
+        # Index today onwards: every slider move becomes a lookup
+        "index": WindowIndex(prices.after(midnight)),
+        # Hourly/daily/weekly aggregates so long chart ranges stay within a point budget
+        "chart": PriceViews(prices),
+    }
+
+
+def sensitivity_grid(prices, slot_start):
+    """What-if grid for the half-hour starting at `slot_start` (epoch seconds)."""
+    # slot_start + 1 picks the same slots as any `now` inside the half-hour does
+    return SensitivityGrid(prices, slot_start + 1)
+
+
+def next_day_forecast(registry, key, prices):
+    """(forecast frame, held-out metrics) from the registry's model for `key`."""
+    forecaster = registry.get(key, prices)
+    return forecaster.predict_next_day(prices), forecaster.metrics.get("test")
+
+
+def scenario_windows(registry, key, prices, day, window_hours, timezone="Europe/London"):
+    """Best window on `day` by expected cost and by CVaR over forecast scenarios."""
+    forecaster = registry.get(key, prices)
+    start = pytz.timezone(timezone).localize(datetime.combine(day, time()))
+    starts, matrix = ScenarioForecaster(forecaster).fit(prices).scenarios(prices, start, start + timedelta(days=1))
+    planner = ScenarioPlanner(starts, matrix)
+    slots = int(window_hours * 2)
+    return planner.best_window(slots, window_hours), planner.best_window(slots, window_hours, risk="cvar")
+
+
+def live_prices(snapshot, region_codes, slot_start):
+    """Price of the slot starting at `slot_start` in every region (None where not stored)."""
+    values = []
+    for code in region_codes:
+        stored = snapshot.prices.get(code, PriceSeries([], []))
+        i = stored.slot_at(slot_start)
+        values.append(float(stored.prices[i]) if i is not None else None)
+    return values
+
+
+def advise(prices, views, now, battery_capacity, current_soc, target_soc, available_hours,
+           charging_power=7.4, carbon=None, dnoregion=None):
+    """Everything the advisor view shows for one set of inputs.
+
+    Windows are frames of their slots, None when nothing fits; `green` is
+    (frame, avg price, avg carbon) for the greenest window within 5% of
+    the cheapest, when carbon forecasts are available.
+    """
+    df = views["frame"]
+    kwh_needed = battery_capacity * max(0, target_soc - current_soc) / 100
+    deadline = now + timedelta(hours=available_hours)
+
+    # What fits before the deadline: the same half-hours the smart schedule may use
+    calculator = PriceCalculator(prices, battery_capacity, current_soc, target_soc, available_hours)
+    charge_slots = calculator.charging_slots(deadline, plug_in=now)
+    energy_to_charge = min(kwh_needed, len(charge_slots) * charging_power * SLOT_HOURS)
+    user_window = charge_slots.to_frame().copy()
+    if not user_window.empty:
+        user_window["energy_kwh"] = energy_to_charge / len(user_window)
+        user_window["cost"] = user_window["price_gbp"] * user_window["energy_kwh"]
+
+    index = views["index"]
+    horizon = index.prices
+
+    def window(start, slots):
+        return None if start is None else horizon.slice(start, start + slots).to_frame()
+
+    today_start, _ = index.cheapest_on_day(TODAY_WINDOW_HOURS, now.date())
+    now_start, _ = index.cheapest_within(available_hours, now)
+    slots_needed = int(available_hours * 2)
+
+    green = None
+    if carbon is not None:
+        future = prices.after(now)
+        candidates = WindowCandidates(future.prices, carbon.aligned(dnoregion, future.starts), [slots_needed])
+        green_idx = candidates.greenest_within(0.05)
+        if green_idx is not None:
+            green_start, green_slots, green_price, green_carbon = candidates.window(green_idx)
+            green = (future.slice(green_start, green_start + green_slots).to_frame(), green_price, green_carbon)
+
+    return {
+        "current": df[(df["valid_from_bst"] <= now) & (df["valid_to_bst"] > now)],
+        "deadline": deadline,
+        "charge_slots": len(charge_slots),
+        "energy_to_charge": energy_to_charge,
+        "user_window": user_window,
+        # Cheapest (possibly non-contiguous) half-hours before you need the car
+        "plan": calculator.schedule_charging(charging_power, deadline, plug_in=now),
+        "today_window": window(today_start, TODAY_WINDOW_HOURS * 2),
+        "now_window": window(now_start, slots_needed),
+        "green": green,
+    }
+
+
+def plan_tomorrow(views, window_hours):
+    """TomorrowWindowFinder's result over the cached index, plus tomorrow's chart line (None if not out)."""
+    index = views["index"]
+    result = TomorrowWindowFinder(index.prices, window_hours, index=index).find_cheapest_window_tomorrow()
+    tomorrow = views["tomorrow"]
+    line = None if tomorrow.empty else views["chart"].line(int(tomorrow.starts[0]), int(tomorrow.starts[-1]) + 1)
+    return result, line
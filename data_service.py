@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pytz
+from carbon import CarbonIntensity
+from instrumentation import incr, timer
+from octopus import make_session
+from price_store import PriceStore
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait for and share its result (or exception). `do_many` claims
+    several keys at once, so a batch and single-key calls for any key in
+    it still collapse.
+    """
+
+    class _Call:
+        __slots__ = ("done", "result", "error")
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn(*args)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def do_many(self, keys, fn):
+        """Run `fn(free_keys)` once for the keys nobody else is running, then wait for the rest."""
+        with self._lock:
+            waiting = {id(c): c for c in (self._calls.get(k) for k in keys) if c is not None}
+            mine = [k for k in dict.fromkeys(keys) if k not in self._calls]
+            call = self._Call()
+            for key in mine:
+                self._calls[key] = call
+        if mine:
+            try:
+                call.result = fn(mine)
+            except Exception as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in mine:
+                        del self._calls[key]
+                call.done.set()
+        for other in waiting.values():
+            other.done.wait()
+            if other.error is not None:
+                raise other.error
+
+
+class Snapshot:
+    """Immutable view of everything the service has fetched so far.
+
+    `version` moves only when some region's prices changed and
+    `carbon_version` only when new carbon data was published, so caches
+    keyed on them survive refreshes that found nothing new.
+    """
+    __slots__ = ("version", "carbon_version", "prices", "carbon", "errors", "updated_at")
+
+    def __init__(self, version=0, prices=None, carbon=None, errors=None, updated_at=None, carbon_version=0):
+        self.version = version
+        self.carbon_version = carbon_version
+        self.prices = prices or {}
+        self.carbon = carbon
+        self.errors = errors or {}
+        self.updated_at = updated_at
+
+
+class DataService:
+    """Process-wide price and carbon data refreshed on a background thread.
+
+    Sessions read `snapshot()` (or `prices()`/`carbon()`), which never touch
+    the network once a region has been loaded. The refresh runs every
+    `interval` seconds, and every `release_interval` seconds inside
+    `release_window` (local time) until tomorrow's Agile prices are in.
+    """
+
+    def __init__(self, product_code, region_codes=(), store=None, session=None,
+                 interval=900, release_interval=120, release_window=("15:45", "17:30"),
+                 timezone="Europe/London"):
+        self.product_code = product_code
+        self.store = store or PriceStore()
+        self.session = session or make_session()
+        self.interval = interval
+        self.release_interval = release_interval
+        self.release_window = release_window
+        self.timezone = timezone
+        self._regions = list(region_codes)
+        self._snapshot = Snapshot()
+        self._publish_lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._stop = threading.Event()
+        self._thread = None
+        self._carbon_attempted = False
+
+    # --- Reading ---
+    def snapshot(self):
+        return self._snapshot
+
+    def prices(self, region_code):
+        """PriceSeries for a region; blocks only the first time a region is seen."""
+        series = self._snapshot.prices.get(region_code)
+        if series is not None:
+            incr("data_service.prices_hit")
+            return series
+        return self.prices_for([region_code])[region_code]
+
+    def prices_for(self, region_codes):
+        """{code: PriceSeries} for several regions; the ones not loaded yet are fetched in one pooled batch."""
+        missing = [code for code in region_codes if code not in self._snapshot.prices]
+        if missing:
+            incr("data_service.prices_miss", len(missing))
+            for code in missing:
+                if code not in self._regions:
+                    self._regions.append(code)
+            self._load(missing)
+        prices = self._snapshot.prices
+        return {code: prices[code] for code in region_codes}
+
+    def carbon(self):
+        """CarbonIntensity with data loaded, or None if no fetch has succeeded yet."""
+        # Only the very first read waits; after that failures are retried in the background
+        if self._snapshot.carbon is None and not self._carbon_attempted:
+            self._flight.do("carbon", self._refresh_carbon)
+        return self._snapshot.carbon
+
+    # --- Refreshing ---
+    def _load(self, region_codes):
+        # One key per region, so a region already being fetched (by a refresh or a reader) is joined, not refetched
+        self._flight.do_many([("prices", code) for code in region_codes],
+                             lambda keys: self._refresh_regions([code for _, code in keys]))
+
+    def _publish(self, prices=None, carbon=None, errors=None, cleared=()):
+        with self._publish_lock:
+            old = self._snapshot
+            merged_errors = {k: v for k, v in old.errors.items() if k not in cleared}
+            merged_errors.update(errors or {})
+            self._snapshot = Snapshot(
+                version=old.version + 1 if prices else old.version,
+                prices={**old.prices, **(prices or {})},
+                carbon=carbon if carbon is not None else old.carbon,
+                errors=merged_errors,
+                updated_at=time.time(),
+                carbon_version=old.carbon_version + 1 if carbon is not None else old.carbon_version,
+            )
+
+    @timer("data_service.refresh_regions")
+    def _refresh_regions(self, region_codes):
+        added, errors = self.store.update_regions(self.product_code, region_codes, session=self.session)
+        # Failed regions still serve whatever history the store already has. A series is
+        # replaced (and the version moved) only when its contents changed, which also picks
+        # up slots another process added to the shared store; unchanged ones keep their object
+        old = self._snapshot.prices
+        prices = {}
+        for code in region_codes:
+            series = self.store.load(self.product_code, code)
+            if code not in old or added.get(code) or series.fingerprint() != old[code].fingerprint():
+                prices[code] = series
+        self._publish(prices=prices, errors=errors, cleared=added.keys())
+
+    @timer("data_service.refresh_carbon")
+    def _refresh_carbon(self):
+        self._carbon_attempted = True
+        carbon = CarbonIntensity(ttl=None, session=self.session)
+        carbon.fetch_data()
+        old = self._snapshot.carbon
+        if carbon.cached_data and old is not None and carbon.cached_data == old.cached_data \
+                and carbon.first_start == old.first_start and np.array_equal(carbon.forecast, old.forecast, equal_nan=True):
+            self._publish(cleared=("carbon",))
+        elif carbon.cached_data:
+            self._publish(carbon=carbon, cleared=("carbon",))
+        else:
+            self._publish(errors={"carbon": carbon.last_error})
+
+    def refresh(self):
+        """Refresh every known region and the carbon data (single-flight)."""
+        self._load(list(self._regions))
+        self._flight.do("carbon", self._refresh_carbon)
+
+    def _awaiting_release(self, now):
+        start, end = (datetime.strptime(t, "%H:%M").time() for t in self.release_window)
+        if not start <= now.time() <= end:
+            return False
+        tomorrow = (now + timedelta(days=1)).date()
+        return any(s.empty or s.day(tomorrow).empty for s in self._snapshot.prices.values())
+
+    def next_interval(self, now=None):
+        now = now or datetime.now(pytz.timezone(self.timezone))
+        return self.release_interval if self._awaiting_release(now) else self.interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                # Fetch errors are on the snapshot; anything else (store, carbon parsing) only shows here
+                logger.exception("Data refresh failed; retrying next round")
+            self._stop.wait(self.next_interval())
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="data-service", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from price_series import PriceSeries
+
+MAX_POINTS = 1500  # points per trace sent to the browser
+LEVELS = (("1h", 3600), ("1D", 86400), ("1W", 7 * 86400))
+_WEEK_OFFSET = 3 * 86400  # the epoch was a Thursday; shift so weeks start on Monday
+
+
+def lttb(x, y, n_out):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the next bucket's average, so spikes survive.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        if b + 2 < len(edges):
+            cx, cy = x[hi:edges[b + 2]].mean(), y[hi:edges[b + 2]].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return keep
+
+
+class PriceViews:
+    """Chart-ready views of a PriceSeries at whatever resolution fits a point budget.
+
+    Hourly, daily and weekly min/mean/max aggregates (on local-time
+    boundaries, each clock hour once even when the clocks go back) are built once with reduceat; `view` returns raw slots when
+    the visible range fits in `max_points` and otherwise the finest
+    aggregate that does. `line` is the LTTB-downsampled raw trace.
+    """
+
+    def __init__(self, prices, max_points=MAX_POINTS):
+        self.prices = PriceSeries.coerce(prices)
+        self.max_points = max_points
+        self._levels = {}
+        if self.prices.empty:
+            return
+        local = self.prices.local_starts().tz_localize(None)
+        local_s = ((local - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+        values = self.prices.prices.astype(np.float64)
+        for name, seconds in LEVELS:
+            if name == "1h":
+                # Local hours are UTC hours shifted, and UTC keeps the repeated autumn hour apart
+                key = self.prices.starts // seconds
+            else:
+                key = (local_s + (_WEEK_OFFSET if name == "1W" else 0)) // seconds
+            first = np.concatenate([[0], np.flatnonzero(np.diff(key)) + 1])
+            counts = np.diff(np.append(first, len(values)))
+            self._levels[name] = (
+                first,
+                np.minimum.reduceat(values, first),
+                np.add.reduceat(values, first) / counts,
+                np.maximum.reduceat(values, first),
+            )
+
+    def _range(self, start, end):
+        first = 0 if start is None else self.prices.index_of(start)
+        stop = len(self.prices) if end is None else self.prices.index_of(end)
+        return first, stop
+
+    def view(self, start=None, end=None):
+        """Frame for [start, end): valid_from_bst, price_gbp (mean), price_min, price_max.
+
+        `resolution` in the frame's attrs is "30min" for raw slots or the
+        aggregate level used.
+        """
+        first, stop = self._range(start, end)
+        if stop - first <= self.max_points or not self._levels:
+            frame = self.prices.slice(first, stop).to_frame()[["valid_from_bst", "price_gbp"]].copy()
+            frame["price_min"] = frame["price_max"] = frame["price_gbp"]
+            frame.attrs["resolution"] = "30min"
+            return frame
+        for name, _ in LEVELS:
+            buckets, low, mean, high = self._levels[name]
+            lo, hi = np.searchsorted(buckets, [first, stop])
+            if hi - lo <= self.max_points or name == LEVELS[-1][0]:
+                break
+        frame = pd.DataFrame({
+            "valid_from_bst": pd.to_datetime(self.prices.starts[buckets[lo:hi]], unit="s", utc=True).tz_convert(self.prices.timezone),
+            "price_gbp": mean[lo:hi],
+            "price_min": low[lo:hi],
+            "price_max": high[lo:hi],
+        })
+        frame.attrs["resolution"] = name
+        return frame
+
+    def line(self, start=None, end=None):
+        """Raw slots in [start, end), LTTB-downsampled to at most `max_points`."""
+        window = self.prices.slice(*self._range(start, end))
+        keep = lttb(window.starts, window.prices, self.max_points)
+        return window.to_frame().iloc[keep][["valid_from_bst", "price_gbp"]]
@@ -1,37 +1,19 @@
 import streamlit as st
 from datetime import datetime, timedelta
 import pandas as pd
-import requests
-from carbon import CarbonIntensity
-from price_prediction import PriceForecaster
-from price_calculator import PriceCalculator
-from tomorrow_window_finder import TomorrowWindowFinder
+from model_registry import ForecastRegistry
+import dashboard
+from data_service import DataService
+from regions import region_df
+from price_series import SLOT_SECONDS, to_epoch
+from instrumentation import metrics, timer, start_metrics_server
+import os
 import pytz
 import plotly.express as px
 import plotly.graph_objects as go
 
 st.set_page_config(layout="wide", page_title="Smart EV Charging Scheduler")
 
-# --- Region DataFrame ---
-region_df = pd.DataFrame({
-    "region": [
-        "East Midlands", "Eastern England", "London", "Merseyside and North Wales",
-        "Midlands", "North East England", "North Scotland", "North West England",
-        "South East England", "South Scotland", "South Wales", "South West England",
-        "Southern England", "Yorkshire"
-    ],
-    "code": ["E", "F", "A", "D", "M", "C", "P", "B", "J", "N", "K", "G", "H", "Y"],
-    "lat": [52.8, 52.4, 51.5, 53.4, 52.5, 54.9, 57.5, 53.8, 51.3, 55.9, 51.6, 50.8, 51.0, 53.9],
-    "lon": [-1.3, 0.9, -0.1, -3.0, -1.9, -1.5, -4.0, -2.6, 0.9, -3.9, -3.6, -3.5, -1.3, -1.3],
-    "price": [0.18, 0.19, 0.20, 0.17, 0.18, 0.19, 0.21, 0.18, 0.19, 0.20, 0.17, 0.16, 0.18, 0.19],
-    "dnoregion": [
-        "WPD East Midlands", "UKPN East", "UKPN London", "SP Manweb", "WPD West Midlands",
-        "NPG North East", "Scottish Hydro Electric Power Distribution", "Electricity North West",
-        "UKPN South East", "SP Distribution", "WPD South Wales", "WPD South West",
-        "SSE South", "NPG Yorkshire"
-    ]
-})
-
 selected_region = st.selectbox("Select your UK region", region_df["region"])
 selected_row = region_df[region_df["region"] == selected_region].iloc[0]
 region_code = selected_row["code"]
@@ -39,38 +21,77 @@ dnoregion_name = selected_row["dnoregion"]
 
 OCTOPUS_PRODUCT_CODE = "AGILE-18-02-21"
 
-@st.cache_data(ttl=3600)
-def fetch_octopus_prices(product_code, region_code):
-    url = f"https://api.octopus.energy/v1/products/{product_code}/electricity-tariffs/E-1R-{product_code}-{region_code}/standard-unit-rates/"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        df = pd.DataFrame(data['results'])
-        df['valid_from'] = pd.to_datetime(df['valid_from'], utc=True)
-        df['valid_to'] = pd.to_datetime(df['valid_to'], utc=True)
-        df['price_gbp'] = df['value_inc_vat'] / 100
-        uk_tz = pytz.timezone('Europe/London')
-        df['valid_from_bst'] = df['valid_from'].dt.tz_convert(uk_tz)
-        df['valid_to_bst'] = df['valid_to'].dt.tz_convert(uk_tz)
-        return df
-    except:
-        st.error("Failed to fetch Octopus Energy prices.")
-        return pd.DataFrame()
+@st.cache_resource
+def get_data_service():
+    # One background refresher per process, shared by every session and rerun
+    return DataService(OCTOPUS_PRODUCT_CODE, list(region_df["code"])).start()
+
+data_service = get_data_service()
 
-carbon = CarbonIntensity()
-carbon.fetch_data()
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus scrape endpoint, opt-in via METRICS_PORT
+    port = os.environ.get("METRICS_PORT")
+    return start_metrics_server(int(port)) if port else None
 
-# NEW TAB STRUCTURE
-tab1, tab2, tab3, tab4 = st.tabs([
-    "🔌 Smart Charging Advisor",
-    "📆 Plan Ahead & Save",
-    "🔮 Price Forecast",
-    "📊 Regional Comparison"
-])
+get_metrics_server()
+
+@timer("ev.fetch_octopus_prices")
+def fetch_octopus_prices(region_code):
+    # Read from the shared snapshot; only a region's very first load waits on the network
+    data_service.prices(region_code)
+    # Prices and errors from one snapshot, so they can't come from different refreshes
+    snap = data_service.snapshot()
+    if region_code in snap.errors:
+        st.error("Failed to fetch Octopus Energy prices.")
+    return snap.prices[region_code]
+
+@st.cache_resource(max_entries=64)
+def _build_price_views(region_code, data_hash, today, _prices):
+    # Keyed on the data hash, so built once per region, prices and day and shared by every view and session
+    metrics.incr("price_views.cache_miss")
+    return dashboard.price_views(_prices, today)
+
+@st.cache_resource(max_entries=64)
+def get_sensitivity(region_code, data_hash, slot_start, _prices):
+    # What-if grid per region, prices and half-hour; slider moves and heatmaps only index it
+    return dashboard.sensitivity_grid(_prices, slot_start)
+
+def get_price_views(region_code):
+    prices = fetch_octopus_prices(region_code)
+    today = datetime.now(pytz.timezone("Europe/London")).date()
+    return prices, _build_price_views(region_code, prices.fingerprint(), today, prices)
+
+# How far back the tab 1 price chart reaches (None = all stored history)
+CHART_RANGES = {
+    "Today": timedelta(0),
+    "Week": timedelta(days=7),
+    "Month": timedelta(days=30),
+    "Year": timedelta(days=365),
+    "All": None,
+}
+
+@st.cache_resource
+def get_forecast_registry():
+    return ForecastRegistry()
+
+@st.cache_data(max_entries=64)
+def get_forecast(region_code, data_hash, _prices):
+    # Retrains only when the stored prices changed; otherwise a cache lookup
+    return dashboard.next_day_forecast(get_forecast_registry(), f"{OCTOPUS_PRODUCT_CODE}-{region_code}", _prices)
+
+@st.cache_data(max_entries=64)
+def get_scenario_windows(region_code, data_hash, day, window_hours, _prices):
+    # Before the day's prices are out: best window by expected cost and by CVaR over forecast scenarios
+    return dashboard.scenario_windows(get_forecast_registry(), f"{OCTOPUS_PRODUCT_CODE}-{region_code}", _prices, day, window_hours)
+
+@st.cache_data(max_entries=8)
+def get_live_prices(data_version, slot_start, _snapshot):
+    # Current price of every region, once per data version and half-hour (both from `_snapshot`)
+    return dashboard.live_prices(_snapshot, region_df["code"], slot_start)
 
 # --- Tab 1: Smart Scheduler ---
-with tab1:
+def render_advisor():
     st.title("🔌 Smart Charging Advisor")
 
     # --- EV Charging Input ---
@@ -93,24 +114,18 @@ with tab1:
 
     # --- User-defined charging window ---
     available_hours = st.slider("How many hours are you available to charge?", min_value=1, max_value=12, value=min(6, int(hours_needed) + 1))
-    energy_possible = available_hours * charging_power
-    energy_to_charge = min(kwh_needed, energy_possible)
-    st.info(f"🔋 You can actually charge {energy_to_charge:.2f} kWh in {available_hours} hours.")
-
     # --- Fetch price data ---
-    df = fetch_octopus_prices(OCTOPUS_PRODUCT_CODE, region_code)
-    if df.empty:
+    prices, views = get_price_views(region_code)
+    if prices.empty:
         st.warning("No price data available.")
     else:
-        import pandas as pd
-        import plotly.graph_objects as go
-        import pytz
-        from datetime import datetime, timedelta
-
+        df = views["frame"]
         now = datetime.now(pytz.timezone("Europe/London"))
+        advice = dashboard.advise(prices, views, now, battery_capacity, current_soc, target_soc, available_hours,
+                                  charging_power, data_service.carbon(), dnoregion_name)
 
         # --- Show current electricity price ---
-        current_row = df[(df['valid_from_bst'] <= now) & (df['valid_to_bst'] > now)]
+        current_row = advice["current"]
         if not current_row.empty:
             current_price = current_row.iloc[0]['price_gbp']
             current_time = current_row.iloc[0]['valid_from_bst']
@@ -120,16 +135,19 @@ with tab1:
             current_time = None
             st.warning("No current price available.")
 
-        # --- Calculate slot-by-slot cost for user window ---
-        slots_needed = int(available_hours * 2)
-        df_future = df[df['valid_from_bst'] >= now].head(slots_needed)
-        if len(df_future) < slots_needed:
+        # --- What fits before the deadline: the same half-hours the smart schedule may use ---
+        deadline = advice["deadline"]
+        energy_to_charge = advice["energy_to_charge"]
+        st.info(
+            f"🔋 You can actually charge {energy_to_charge:.2f} kWh in {available_hours} hours "
+            f"({advice['charge_slots']} whole half-hours before {deadline.strftime('%H:%M')})."
+        )
+
+        # --- Slot-by-slot cost for user window ---
+        df_future = advice["user_window"]
+        if df_future.empty:
             st.warning("Not enough future price slots available.")
         else:
-            energy_per_slot = energy_to_charge / slots_needed if slots_needed > 0 else 0
-            df_future = df_future.copy()
-            df_future['energy_kwh'] = energy_per_slot
-            df_future['cost'] = df_future['price_gbp'] * df_future['energy_kwh']
             total_cost = df_future['cost'].sum()
             st.success(
                 f"💰 **Estimated cost to charge {energy_to_charge:.2f} kWh over {available_hours} hours:** £{total_cost:.2f}"
@@ -139,21 +157,44 @@ with tab1:
                 df_show.columns = ['Start Time', 'Price (£/kWh)', 'Energy (kWh)', 'Cost (£)']
                 st.dataframe(df_show, hide_index=True)
 
-        # --- Find today's cheapest 4-hour slot (with correct time logic) ---
-        default_window_hours = 4
-        default_window_slots = default_window_hours * 2
-        df_today = df[df['valid_from_bst'].dt.date == now.date()].sort_values('valid_from_bst').reset_index(drop=True)
-        df_today['rolling_avg'] = df_today['price_gbp'].rolling(window=default_window_slots).mean()
-        best_today_idx = df_today['rolling_avg'].idxmin()
+        # --- Cheapest (possibly non-contiguous) half-hours before you need the car ---
+        plan = advice["plan"]
+        if plan["delivered_kwh"] > 0:
+            st.success(
+                f"🧠 **Smart schedule:** {plan['delivered_kwh']:.2f} kWh in the {len(plan['schedule_df'])} cheapest half-hours "
+                f"before {deadline.strftime('%H:%M')} at {charging_power} kW: £{plan['cost']:.2f}"
+            )
+            if plan["shortfall_kwh"] > 0:
+                st.warning(f"⚠️ {plan['shortfall_kwh']:.2f} kWh short of your target by {deadline.strftime('%H:%M')}.")
+            with st.expander("Show smart schedule"):
+                df_show = plan["schedule_df"][['valid_from_bst', 'price_gbp', 'energy_kwh', 'cost']]
+                df_show.columns = ['Start Time', 'Price (£/kWh)', 'Energy (kWh)', 'Cost (£)']
+                st.dataframe(df_show, hide_index=True)
+
+        # --- What-if: the smart schedule over a grid of inputs, from one cached pass ---
+        slot_start = to_epoch(now) // SLOT_SECONDS * SLOT_SECONDS
+        grid = get_sensitivity(region_code, prices.fingerprint(), slot_start, prices)
+        with st.expander("📊 What-if: cost and savings across inputs"):
+            point = grid.at(battery_capacity, current_soc, target_soc, available_hours, charging_power)
+            st.caption(
+                f"Smart schedule saves £{point['savings']:.2f} against plugging in now at {charging_power} kW."
+                + (f" Best uninterrupted start: {point['best_start'].strftime('%H:%M')}." if point["best_start"] is not None else "")
+            )
+            whatif_value = st.radio("Show", ["savings", "cost"], horizontal=True, key="whatif_value")
+            heat = grid.heatmap(whatif_value, "capacity", "hours", soc=(current_soc, target_soc), charger_kw=charging_power)
+            nearest = grid.soc[abs(grid.soc - (current_soc, target_soc)).sum(axis=1).argmin()]
+            fig = px.imshow(
+                heat, aspect="auto", color_continuous_scale="Greens" if whatif_value == "savings" else "Reds",
+                labels=dict(x="Hours available", y="Battery Capacity (kWh)", color="£"),
+                title=f"{whatif_value.capitalize()} at {nearest[0]:.0f}→{nearest[1]:.0f}% charge, {charging_power} kW"
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        # --- Today's cheapest 4-hour slot ---
+        default_window_hours = dashboard.TODAY_WINDOW_HOURS
         window_start = window_end = None
-        best_today_window = None
-        if (
-            not pd.isna(best_today_idx)
-            and best_today_idx - default_window_slots + 1 >= 0
-        ):
-            start_idx = best_today_idx - default_window_slots + 1
-            end_idx = best_today_idx
-            best_today_window = df_today.iloc[start_idx:end_idx + 1]
+        best_today_window = advice["today_window"]
+        if best_today_window is not None:
             window_start = best_today_window['valid_from_bst'].iloc[0]
             window_end = best_today_window['valid_to_bst'].iloc[-1]
             today_cost = best_today_window['price_gbp'].mean() * default_window_hours
@@ -161,20 +202,10 @@ with tab1:
                 f"🟢 Cheapest 4-hour slot today: {window_start.strftime('%H:%M')} – {window_end.strftime('%H:%M')}, £{today_cost:.2f} (for 4 hours at 1kW)"
             )
 
-        # --- Find best (cheapest) charging window from now onwards for available_hours ---
-        slots_needed = int(available_hours * 2)
-        df_future_all = df[df['valid_from_bst'] >= now].sort_values('valid_from_bst').reset_index(drop=True)
-        df_future_all['rolling_avg'] = df_future_all['price_gbp'].rolling(window=slots_needed).mean()
-        best_now_idx = df_future_all['rolling_avg'].idxmin()
+        # --- Best (cheapest) charging window from now onwards for available_hours ---
         now_window_start = now_window_end = None
-        best_now_window = None
-        if (
-            not pd.isna(best_now_idx)
-            and best_now_idx - slots_needed + 1 >= 0
-        ):
-            start_idx = best_now_idx - slots_needed + 1
-            end_idx = best_now_idx
-            best_now_window = df_future_all.iloc[start_idx:end_idx + 1]
+        best_now_window = advice["now_window"]
+        if best_now_window is not None:
             now_window_start = best_now_window['valid_from_bst'].iloc[0]
             now_window_end = best_now_window['valid_to_bst'].iloc[-1]
             now_window_cost = best_now_window['price_gbp'].mean() * available_hours
@@ -182,104 +213,142 @@ with tab1:
                 f"🟠 Cheapest {available_hours}-hour slot from now: {now_window_start.strftime('%H:%M')} – {now_window_end.strftime('%H:%M')}, £{now_window_cost:.2f} (for {available_hours} hours at 1kW)"
             )
 
-        # --- Chart: Full price trend with highlights ---
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df['valid_from_bst'],
-            y=df['price_gbp'],
-            mode='lines+markers',
-            marker=dict(color='blue', size=6),
-            name='30-min Price'
-        ))
-
-        # Highlight user's charging window
-        if not df_future.empty:
-            user_start = df_future['valid_from_bst'].iloc[0]
-            user_end = df_future['valid_to_bst'].iloc[-1]
-            if pd.notnull(user_start) and pd.notnull(user_end):
-                fig.add_vrect(
-                    x0=user_start, x1=user_end,
-                    fillcolor="orange", opacity=0.15, line_width=0,
-                    annotation_text="Your Charging Window", annotation_position="top right"
-                )
-
-        # Highlight today's cheapest 4-hour slot
-        if (
-            window_start is not None and window_end is not None
-            and not pd.isnull(window_start) and not pd.isnull(window_end)
-        ):
-            fig.add_vrect(
-                x0=window_start, x1=window_end,
-                fillcolor="green", opacity=0.15, line_width=0,
-                annotation_text="Today's Cheapest 4h", annotation_position="top left"
+        # --- Greenest window from now that costs at most 5% more than the cheapest ---
+        if advice["green"] is not None:
+            green_window, green_price, green_carbon = advice["green"]
+            st.info(
+                f"🌱 Greenest {available_hours}-hour slot within 5% of the cheapest: {green_window['valid_from_bst'].iloc[0].strftime('%H:%M')} – {green_window['valid_to_bst'].iloc[-1].strftime('%H:%M')}, "
+                f"{green_carbon:.0f} gCO₂/kWh, £{green_price * available_hours:.2f} (for {available_hours} hours at 1kW)"
             )
-            if best_today_window is not None:
+
+        # --- Chart: Full price trend with highlights ---
+        chart_range = st.select_slider("Chart range", options=list(CHART_RANGES), value="Today")
+        today_midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        span = CHART_RANGES[chart_range]
+        chart_start = None if span is None else today_midnight - span
+        with timer("ev.tab1_chart"):
+            trend = views["chart"].view(chart_start)
+            resolution = trend.attrs["resolution"]
+            fig = go.Figure()
+            if resolution != "30min":
+                # Min/max band keeps peaks and troughs visible at coarse resolutions
                 fig.add_trace(go.Scatter(
-                    x=best_today_window['valid_from_bst'],
-                    y=best_today_window['price_gbp'],
-                    mode='markers',
-                    marker=dict(color='green', size=10, symbol='diamond'),
-                    name='Cheapest 4h Window'
+                    x=trend['valid_from_bst'], y=trend['price_max'],
+                    mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'
+                ))
+                fig.add_trace(go.Scatter(
+                    x=trend['valid_from_bst'], y=trend['price_min'],
+                    mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(0,0,255,0.15)',
+                    name=f'{resolution} min–max'
                 ))
-
-        # Highlight current price as a marker
-        if current_price is not None and current_time is not None:
             fig.add_trace(go.Scatter(
-                x=[current_time],
-                y=[current_price],
-                mode='markers+text',
-                marker=dict(color='red', size=14, symbol='star'),
-                text=["Current Price"],
-                textposition="top center",
-                name="Current Price"
+                x=trend['valid_from_bst'],
+                y=trend['price_gbp'],
+                mode='lines+markers' if resolution == "30min" else 'lines',
+                marker=dict(color='blue', size=6),
+                line=dict(color='blue'),
+                name='30-min Price' if resolution == "30min" else f'{resolution} mean price'
             ))
 
-        # Highlight best (cheapest) charging window from now onwards in orange
-        if (
-            now_window_start is not None and now_window_end is not None
-            and not pd.isnull(now_window_start) and not pd.isnull(now_window_end)
-        ):
-            fig.add_vrect(
-                x0=now_window_start, x1=now_window_end,
-                fillcolor="orange", opacity=0.25, line_width=0,
-                annotation_text=f"Best {available_hours}h From Now", annotation_position="top right"
-            )
-            if best_now_window is not None:
+            # Highlight user's charging window
+            if not df_future.empty:
+                user_start = df_future['valid_from_bst'].iloc[0]
+                user_end = df_future['valid_to_bst'].iloc[-1]
+                if pd.notnull(user_start) and pd.notnull(user_end):
+                    fig.add_vrect(
+                        x0=user_start, x1=user_end,
+                        fillcolor="orange", opacity=0.15, line_width=0,
+                        annotation_text="Your Charging Window", annotation_position="top right"
+                    )
+
+            # Highlight today's cheapest 4-hour slot
+            if (
+                window_start is not None and window_end is not None
+                and not pd.isnull(window_start) and not pd.isnull(window_end)
+            ):
+                fig.add_vrect(
+                    x0=window_start, x1=window_end,
+                    fillcolor="green", opacity=0.15, line_width=0,
+                    annotation_text="Today's Cheapest 4h", annotation_position="top left"
+                )
+                if best_today_window is not None:
+                    fig.add_trace(go.Scatter(
+                        x=best_today_window['valid_from_bst'],
+                        y=best_today_window['price_gbp'],
+                        mode='markers',
+                        marker=dict(color='green', size=10, symbol='diamond'),
+                        name='Cheapest 4h Window'
+                    ))
+
+            # Highlight current price as a marker
+            if current_price is not None and current_time is not None:
                 fig.add_trace(go.Scatter(
-                    x=best_now_window['valid_from_bst'],
-                    y=best_now_window['price_gbp'],
-                    mode='markers',
-                    marker=dict(color='orange', size=10, symbol='circle'),
-                    name=f'Best {available_hours}h From Now'
+                    x=[current_time],
+                    y=[current_price],
+                    mode='markers+text',
+                    marker=dict(color='red', size=14, symbol='star'),
+                    text=["Current Price"],
+                    textposition="top center",
+                    name="Current Price"
                 ))
 
-        # Set x-axis to full day
-        london_tz = pytz.timezone("Europe/London")
-        today_midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = today_midnight + timedelta(hours=23, minutes=30)
-        fig.update_xaxes(range=[today_midnight, end_of_day])
-        fig.update_layout(
-            xaxis_title="Time",
-            yaxis_title="Price (£/kWh)",
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            title="Price Trend with Highlights"
-        )
+            # Highlight best (cheapest) charging window from now onwards in orange
+            if (
+                now_window_start is not None and now_window_end is not None
+                and not pd.isnull(now_window_start) and not pd.isnull(now_window_end)
+            ):
+                fig.add_vrect(
+                    x0=now_window_start, x1=now_window_end,
+                    fillcolor="orange", opacity=0.25, line_width=0,
+                    annotation_text=f"Best {available_hours}h From Now", annotation_position="top right"
+                )
+                if best_now_window is not None:
+                    fig.add_trace(go.Scatter(
+                        x=best_now_window['valid_from_bst'],
+                        y=best_now_window['price_gbp'],
+                        mode='markers',
+                        marker=dict(color='orange', size=10, symbol='circle'),
+                        name=f'Best {available_hours}h From Now'
+                    ))
+
+            # Set x-axis to full day, or to the chosen history
+            if chart_range == "Today":
+                fig.update_xaxes(range=[today_midnight, today_midnight + timedelta(hours=23, minutes=30)])
+            else:
+                fig.update_xaxes(range=[trend['valid_from_bst'].iloc[0], df['valid_to_bst'].iloc[-1]])
+            fig.update_layout(
+                xaxis_title="Time",
+                yaxis_title="Price (£/kWh)",
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                title="Price Trend with Highlights"
+            )
         st.plotly_chart(fig, use_container_width=True)
 
 
 # --- Tab 2: Make Your Time Free ---
-with tab2:
+def render_plan_ahead():
     st.title("📅 Make Your Time Free")
     st.markdown("Find the cheapest charging window for tomorrow using Octopus Agile prices.")
 
     window_hours = st.slider("How many hours do you want to charge?", min_value=1, max_value=12, value=4)
 
-    df = fetch_octopus_prices(OCTOPUS_PRODUCT_CODE, region_code)
-    finder = TomorrowWindowFinder(df, window_hours)
-    total_cost, avg_price, start_time, end_time, window_df, tomorrow_slots = finder.find_cheapest_window_tomorrow()
+    prices, views = get_price_views(region_code)
+    (total_cost, avg_price, start_time, end_time, window_df, tomorrow_slots), line = dashboard.plan_tomorrow(views, window_hours)
 
     if tomorrow_slots == 0:
         st.warning("⚠️ Tomorrow's prices are not yet released. Please check after 4:00 PM.")
+        if not prices.empty:
+            tomorrow = (datetime.now(pytz.timezone("Europe/London")) + timedelta(days=1)).date()
+            expected, cautious = get_scenario_windows(region_code, prices.fingerprint(), tomorrow, window_hours, prices)
+            if expected is not None:
+                def clock(epoch):
+                    return pd.Timestamp(epoch, unit="s", tz="UTC").tz_convert("Europe/London").strftime("%H:%M")
+                st.info(
+                    f"🔮 **Forecast-based plan:** {clock(expected['start'])} has the lowest expected cost "
+                    f"(£{expected['expected_cost']:.2f} for {window_hours}h at 1kW); "
+                    f"{clock(cautious['start'])} is safest if prices spike "
+                    f"(worst-10% average £{cautious['cvar']:.2f})."
+                )
     elif total_cost is None:
         st.warning(f"Not enough half-hour slots for a {window_hours}-hour window tomorrow.")
     else:
@@ -290,15 +359,7 @@ with tab2:
             f"📉 **Avg price:** £{avg_price:.4f}/kWh"
         )
         # Optional: Show tomorrow's price trend with window highlighted
-        import plotly.express as px
-        import plotly.graph_objects as go
-        fig = px.line(
-            pd.concat([
-                window_df,
-                df[df['valid_from_bst'].dt.date == (datetime.now(pytz.timezone('Europe/London')) + timedelta(days=1)).date()]
-            ], ignore_index=True),
-            x='valid_from_bst', y='price_gbp', title="Tomorrow's Price Trend"
-        )
+        fig = px.line(line, x='valid_from_bst', y='price_gbp', title="Tomorrow's Price Trend")
         fig.add_trace(go.Scatter(
             x=window_df['valid_from_bst'],
             y=window_df['price_gbp'],
@@ -318,39 +379,44 @@ with tab2:
         )
         st.plotly_chart(fig, use_container_width=True)
 
-with tab3:
+def render_forecast():
     st.title("Future Price Forecast (ML)")
-    df = fetch_octopus_prices(OCTOPUS_PRODUCT_CODE, region_code)
-    if not df.empty:
-        forecaster = PriceForecaster()
-        forecaster.fit(df)
-        forecast_df = forecaster.predict_next_day(df)
+    prices = fetch_octopus_prices(region_code)
+    if not prices.empty:
+        forecast_df, test_metrics = get_forecast(region_code, prices.fingerprint(), prices)
         st.subheader("Next Day Price Forecast")
         st.line_chart(forecast_df.set_index("valid_from_bst")["predicted_price"])
+        if test_metrics:
+            st.caption(f"Held-out error: MAE £{test_metrics['mae']:.4f}/kWh, RMSE £{test_metrics['rmse']:.4f}/kWh ({test_metrics['n']} slots)")
         st.dataframe(forecast_df)
     else:
         st.warning("No price data available.")
 
-with tab4:
+def render_regional():
     st.title("📊 Regional Comparison")
     choice = st.radio("View:", ["Electricity Price", "Carbon Intensity"])
 
     if choice == "Electricity Price":
+        data_service.prices_for(list(region_df["code"]))  # first visit fetches every region in one batch
+        snap = data_service.snapshot()
+        failed = [code for code in region_df["code"] if code in snap.errors]
+        slot_start = to_epoch(datetime.now(pytz.timezone("Europe/London"))) // SLOT_SECONDS * SLOT_SECONDS
+        live_prices = get_live_prices(snap.version, slot_start, snap)
+        price_df = region_df.assign(price=live_prices).dropna(subset=["price"])
+        if failed:
+            st.warning(f"Could not refresh prices for region(s): {', '.join(sorted(failed))}")
         fig = px.scatter_mapbox(
-            region_df, lat="lat", lon="lon", color="price", size=[10]*len(region_df),
+            price_df, lat="lat", lon="lon", color="price", size=[10]*len(price_df),
             hover_name="region", zoom=4, mapbox_style="open-street-map",
             title="Electricity Price by Region (£/kWh)"
         )
         st.plotly_chart(fig, use_container_width=True)
     else:
-        if carbon.cached_data:
-            regional_data = carbon.cached_data['data'][0]['regions']
-            c_df = pd.DataFrame([{
-                "dnoregion": r['dnoregion'],
-                "carbon": r['intensity'].get('forecast'),
-                "index": r['intensity'].get('index')
-            } for r in regional_data if r['intensity'].get('forecast') is not None])
-
+        carbon = data_service.carbon()
+        if carbon is None:
+            st.warning(f"Carbon intensity data not available: {data_service.snapshot().errors.get('carbon')}")
+        else:
+            c_df = pd.DataFrame([r for r in carbon.current() if r["carbon"] is not None])
             c_df = c_df.merge(region_df, on="dnoregion", how="left")
             fig = px.scatter_mapbox(
                 c_df,
@@ -365,5 +431,24 @@ with tab4:
             fig.update_layout(margin={"r":0,"t":40,"l":0,"b":0})
             st.plotly_chart(fig, use_container_width=True)
 
+# --- Navigation: only the selected view runs on a rerun ---
+VIEWS = {
+    "🔌 Smart Charging Advisor": render_advisor,
+    "📆 Plan Ahead & Save": render_plan_ahead,
+    "🔮 Price Forecast": render_forecast,
+    "📊 Regional Comparison": render_regional,
+}
+selected_view = st.radio("View", list(VIEWS), horizontal=True, label_visibility="collapsed", key="view")
+VIEWS[selected_view]()
+
+# --- Debug: stage timings and cache counters for this process ---
+if st.sidebar.checkbox("Show performance metrics"):
+    snap = metrics.snapshot()
+    if snap["timers"]:
+        timers_df = pd.DataFrame.from_dict(snap["timers"], orient="index").sort_values("total_s", ascending=False)
+        st.sidebar.dataframe(timers_df.style.format({"total_s": "{:.3f}", "mean_s": "{:.4f}", "max_s": "{:.4f}"}))
+    st.sidebar.json(snap["counters"])
+    st.sidebar.caption(f"Data version {data_service.snapshot().version}")
+
 st.markdown("---")
 st.markdown("Built by Ramkumar Kannan")
@@ -0,0 +1,177 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from instrumentation import incr, timer
+from price_prediction import _error_metrics
+from price_series import SLOT_SECONDS
+
+LAGS = (48, 96, 336)  # 1 day, 2 days and 1 week back, in half-hour slots
+ROLLING = 48  # mean of the day ending at the shortest lag
+
+
+def stack_regions(series_by_region):
+    """Align PriceSeries for several regions on one half-hour grid.
+
+    Returns (regions, starts, matrix): region codes in order, int64 epoch
+    slot starts, and a float32 (regions, slots) matrix with NaN where a
+    region has no price; all empty if no region has any.
+    """
+    regions = [code for code, s in series_by_region.items() if not s.empty]
+    if not regions:
+        return [], np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    first = min(int(series_by_region[code].starts[0]) for code in regions)
+    last = max(int(series_by_region[code].starts[-1]) for code in regions)
+    starts = np.arange(first, last + SLOT_SECONDS, SLOT_SECONDS, dtype=np.int64)
+    matrix = np.full((len(regions), len(starts)), np.nan, dtype=np.float32)
+    for r, code in enumerate(regions):
+        s = series_by_region[code]
+        matrix[r, (s.starts - first) // SLOT_SECONDS] = s.prices
+    return regions, starts, matrix
+
+
+def _shift(matrix, lag):
+    shifted = np.full(matrix.shape, np.nan, dtype=np.float32)
+    if lag < matrix.shape[1]:
+        shifted[:, lag:] = matrix[:, :-lag]
+    return shifted
+
+
+def _rolling_mean(matrix, window):
+    """NaN-aware trailing mean over `window` slots, via prefix sums along time."""
+    valid = ~np.isnan(matrix)
+    sums = np.zeros((matrix.shape[0], matrix.shape[1] + 1))
+    counts = np.zeros_like(sums)
+    np.cumsum(np.where(valid, matrix, 0), axis=1, out=sums[:, 1:])
+    np.cumsum(valid, axis=1, out=counts[:, 1:])
+    lo = np.maximum(np.arange(1, matrix.shape[1] + 1) - window, 0)
+    hi = np.arange(1, matrix.shape[1] + 1)
+    total = sums[:, hi] - sums[:, lo]
+    n = counts[:, hi] - counts[:, lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, total / n, np.nan).astype(np.float32)
+
+
+def build_features(starts, matrix, region_ids, lags=LAGS, rolling=ROLLING, timezone="Europe/London"):
+    """Feature tensor of shape (regions, slots, features) in one pass.
+
+    Features are region id, local slot of day, day of week, the price at
+    each lag, and the rolling mean ending at the shortest lag. Every
+    feature for slot t only looks at prices at least min(lags) slots old,
+    so one call can forecast up to min(lags) slots ahead.
+    """
+    n_regions, n_slots = matrix.shape
+    local = pd.to_datetime(starts, unit="s", utc=True).tz_convert(timezone)
+    slot_of_day = (local.hour * 2 + local.minute // 30).to_numpy(np.float32)
+    dayofweek = local.dayofweek.to_numpy(np.float32)
+    columns = [
+        np.broadcast_to(np.asarray(region_ids, dtype=np.float32)[:, None], (n_regions, n_slots)),
+        np.broadcast_to(slot_of_day, (n_regions, n_slots)),
+        np.broadcast_to(dayofweek, (n_regions, n_slots)),
+    ]
+    columns += [_shift(matrix, lag) for lag in lags]
+    columns.append(_shift(_rolling_mean(matrix, rolling), min(lags)))
+    return np.stack(columns, axis=-1)
+
+
+class GlobalForecaster:
+    """One XGBoost model for every region, with the region as a feature.
+
+    Training stacks all regions into one (regions, slots) array; `predict`
+    forecasts any horizon for all regions with one model call per block
+    of min(lags) slots (a single call for the usual 48-slot day ahead).
+    The last `test_size` of the slots is held out of training and scored,
+    like PriceForecaster's split but by time. A sample of training rows
+    is repeated with no region id, so regions the model never saw are
+    forecast from what the regions have in common.
+    """
+
+    def __init__(self, lags=LAGS, rolling=ROLLING, timezone="Europe/London", n_estimators=200, test_size=0.2):
+        from xgboost import XGBRegressor  # heavy import, deferred until a model is needed
+
+        self.lags = tuple(lags)
+        self.rolling = rolling
+        self.timezone = timezone
+        self.test_size = test_size
+        self.model = XGBRegressor(n_estimators=n_estimators, random_state=42)
+        self.regions = []
+        self.trained = False
+        self.metrics = {}
+
+    def _region_ids(self, regions):
+        # NaN (missing) for regions not seen in fit: the pooled rows taught the model that case
+        ids = {code: i for i, code in enumerate(self.regions)}
+        return [ids.get(code, np.nan) for code in regions]
+
+    @timer("global_forecaster.fit")
+    def fit(self, series_by_region):
+        regions, starts, matrix = stack_regions(series_by_region)
+        if not regions:
+            raise ValueError("no prices to train on")
+        self.regions = regions
+        features = build_features(starts, matrix, self._region_ids(regions), self.lags, self.rolling, self.timezone)
+        # Only slots with a target and at least one lagged price
+        usable = ~np.isnan(matrix) & ~np.isnan(features[..., 3:3 + len(self.lags)]).all(axis=-1)
+        test = np.zeros_like(usable)
+        test[:, int(len(starts) * (1 - self.test_size)):] = True
+        train = usable & ~test
+
+        X, y = features[train], matrix[train]
+        pick = np.random.default_rng(42).random(len(X)) < 1 / len(regions)
+        pooled = X[pick]
+        pooled[:, 0] = np.nan
+        self.model.fit(np.concatenate([X, pooled]), np.concatenate([y, y[pick]]))
+        self.trained = True
+
+        self.metrics = {"test": None, "test_by_region": {}}
+        held_out = usable & test
+        if held_out.any():
+            predicted = np.full(matrix.shape, np.nan, dtype=np.float32)
+            predicted[held_out] = self.model.predict(features[held_out])
+            self.metrics["test"] = _error_metrics(matrix[held_out], predicted[held_out])
+            self.metrics["test_by_region"] = {
+                code: _error_metrics(matrix[r, held_out[r]], predicted[r, held_out[r]])
+                for r, code in enumerate(regions) if held_out[r].any()
+            }
+
+    @timer("global_forecaster.predict")
+    def predict(self, series_by_region, horizon=48):
+        """Forecast `horizon` slots past the last known slot for every region.
+
+        Returns a frame indexed by local slot start with one column per
+        region (empty if no region has prices).
+        """
+        regions, starts, matrix = stack_regions(series_by_region)
+        if not regions:
+            return pd.DataFrame(index=pd.DatetimeIndex([], tz=self.timezone))
+        block = min(self.lags)
+        n_known = len(starts)
+        starts = np.concatenate([starts, starts[-1] + SLOT_SECONDS * np.arange(1, horizon + 1)])
+        matrix = np.concatenate([matrix, np.full((len(regions), horizon), np.nan, dtype=np.float32)], axis=1)
+        region_ids = self._region_ids(regions)
+        # Only the look-back needed by the features is kept around each block
+        history = max(self.lags) + self.rolling
+        for lo in range(n_known, n_known + horizon, block):
+            hi = min(lo + block, n_known + horizon)
+            base = max(0, lo - history)
+            features = build_features(
+                starts[base:hi], matrix[:, base:hi], region_ids, self.lags, self.rolling, self.timezone
+            )[:, lo - base:]
+            predicted = self.model.predict(features.reshape(-1, features.shape[-1]))
+            matrix[:, lo:hi] = predicted.reshape(len(regions), hi - lo)
+        index = pd.to_datetime(starts[n_known:], unit="s", utc=True).tz_convert(self.timezone)
+        return pd.DataFrame(matrix[:, n_known:].T, index=index, columns=regions)
+
+
+def global_forecaster(registry, key, series_by_region):
+    """A GlobalForecaster from a ForecastRegistry, refit whenever any region's prices change."""
+    h = hashlib.blake2b(digest_size=16)
+    for code in sorted(series_by_region):
+        h.update(f"{code}:{series_by_region[code].fingerprint()};".encode())
+
+    def build(stale):
+        incr("forecast_registry.fit")
+        forecaster = GlobalForecaster()
+        forecaster.fit(series_by_region)
+        return {"forecaster": forecaster}
+
+    return registry.cached(key, h.hexdigest(), build)
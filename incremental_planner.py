@@ -0,0 +1,233 @@
+import math
+import numpy as np
+import pandas as pd
+from price_series import PriceSeries, SLOT_SECONDS, to_epoch
+from slot_scheduler import SLOT_HOURS
+
+
+class _Buffer:
+    """Append-only numpy array with amortized O(1) growth."""
+
+    def __init__(self, dtype, values=()):
+        values = np.asarray(values, dtype=dtype)
+        self._data = np.empty(max(64, 2 * len(values)), dtype=dtype)
+        self._n = 0
+        self.extend(values)
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        need = self._n + len(values)
+        if need > len(self._data):
+            grown = np.empty(max(need, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._n] = self._data[:self._n]
+            self._data = grown
+        self._data[self._n:need] = values
+        self._n = need
+
+    @property
+    def values(self):
+        return self._data[:self._n]
+
+
+class PlanChange:
+    """One vehicle's standing window before and after an update (epoch seconds)."""
+    __slots__ = ("vehicle_id", "kind", "old_start", "new_start", "old_slots", "new_slots", "avg_price", "timezone")
+
+    def __init__(self, vehicle_id, kind, old, new, avg_price=None, timezone="Europe/London"):
+        self.vehicle_id = vehicle_id
+        self.kind = kind  # "new", "move", "resize", "charged", "unschedulable" or "removed"
+        self.old_start, self.old_slots = old
+        self.new_start, self.new_slots = new
+        self.avg_price = avg_price
+        self.timezone = timezone
+
+    def _clock(self, epoch):
+        return pd.Timestamp(epoch, unit="s", tz="UTC").tz_convert(self.timezone).strftime("%H:%M")
+
+    def __str__(self):
+        name = f"vehicle {self.vehicle_id}"
+        if self.kind == "removed":
+            return f"{name}: removed"
+        if self.kind == "charged":
+            return f"{name}: already at target, nothing to charge"
+        if self.kind == "unschedulable":
+            return f"{name}: no window before departure"
+        if self.kind == "new":
+            return f"{name}: start {self._clock(self.new_start)} ({self.new_slots} slots)"
+        if self.kind == "move":
+            return f"{name}: move start {self._clock(self.old_start)}→{self._clock(self.new_start)}"
+        return f"{name}: {self.old_slots}→{self.new_slots} slots from {self._clock(self.new_start)}"
+
+    def __repr__(self):
+        return f"PlanChange({self})"
+
+
+class IncrementalPlanner:
+    """Standing cheapest-window plans for many vehicles, updated incrementally.
+
+    Prices are held in growable arrays with a running prefix sum, and each
+    vehicle keeps its current best window (start, mean). When new slots are
+    appended only vehicles still plugged in past the old horizon are
+    touched, and for those only the newly possible window starts are
+    compared against the standing best, so the work is bounded by the new
+    data. Vehicle updates re-plan that vehicle alone. Every call returns
+    the list of PlanChange events for windows that actually changed.
+
+    Vehicles use the FleetScheduler fields: `battery_kwh`, `current_soc`,
+    `target_soc`, `max_kw`, `arrival` and `departure`.
+    """
+
+    def __init__(self, prices, timezone="Europe/London"):
+        prices = PriceSeries.coerce(prices, timezone)
+        self.timezone = timezone
+        self._starts = _Buffer(np.int64, prices.starts)
+        self._prices = _Buffer(np.float32, prices.prices)
+        self._prefix = _Buffer(np.float64, np.concatenate([[0.0], np.cumsum(prices.prices, dtype=np.float64)]))
+        self._vehicles = {}
+        self._plans = {}  # vehicle_id -> (start index or None, slots, mean)
+
+    @property
+    def prices(self):
+        return PriceSeries(self._starts.values, self._prices.values, self.timezone)
+
+    # --- Windows ---
+    def _slots_needed(self, v):
+        kwh = v["battery_kwh"] * max(0.0, v["target_soc"] - v["current_soc"]) / 100
+        return math.ceil(kwh / (v["max_kw"] * SLOT_HOURS) - 1e-9) if kwh > 0 else 0
+
+    def _range(self, v):
+        """Slot indices [first, stop) the vehicle is plugged in for."""
+        starts = self._starts.values
+        first = int(np.searchsorted(starts, v["arrival"], side="left"))
+        stop = int(np.searchsorted(starts, v["departure"] - SLOT_SECONDS, side="right"))
+        return first, stop
+
+    def _best(self, lo, hi, slots):
+        """Cheapest window of `slots` starting in [lo, hi]; (None, None) if empty."""
+        if slots == 0 or hi < lo:
+            return None, None
+        c = self._prefix.values
+        means = (c[lo + slots:hi + slots + 1] - c[lo:hi + 1]) / slots
+        i = int(np.argmin(means))
+        return lo + i, float(means[i])
+
+    def _change(self, vehicle_id, old, new):
+        """PlanChange between two (start index, slots, mean) plans, or None if equal."""
+        starts = self._starts.values
+        old_key = (None, 0) if old is None or old[0] is None else (int(starts[old[0]]), old[1])
+        new_key = (None, 0) if new is None or new[0] is None else (int(starts[new[0]]), new[1])
+        if new is None:
+            kind = "removed"
+        elif new_key[0] is None:
+            kind = "charged" if new[1] == 0 else "unschedulable"
+            if old is not None and old_key[0] is None and (old[1] == 0) == (new[1] == 0):
+                return None
+        elif old is not None and old_key == new_key:
+            return None
+        elif old is None or old_key[0] is None:
+            kind = "new"
+        elif old_key[0] != new_key[0]:
+            kind = "move"
+        else:
+            kind = "resize"
+        return PlanChange(vehicle_id, kind, old_key, new_key, None if new is None else new[2], self.timezone)
+
+    def _replan(self, vehicle_id):
+        v = self._vehicles[vehicle_id]
+        slots = self._slots_needed(v)
+        first, stop = self._range(v)
+        start, mean = self._best(first, stop - slots, slots)
+        old = self._plans.get(vehicle_id)
+        self._plans[vehicle_id] = (start, slots, mean)
+        return self._change(vehicle_id, old, self._plans[vehicle_id])
+
+    # --- Updates ---
+    def set_vehicle(self, vehicle_id, battery_kwh, current_soc, target_soc, max_kw, arrival, departure):
+        """Add or replace a vehicle and plan it; returns the resulting events."""
+        self._vehicles[vehicle_id] = {
+            "battery_kwh": float(battery_kwh),
+            "current_soc": float(current_soc),
+            "target_soc": float(target_soc),
+            "max_kw": float(max_kw),
+            "arrival": to_epoch(arrival),
+            "departure": to_epoch(departure),
+        }
+        change = self._replan(vehicle_id)
+        return [change] if change else []
+
+    def update_vehicle(self, vehicle_id, **changes):
+        """Change some fields (e.g. current_soc or departure) of a known vehicle."""
+        v = dict(self._vehicles[vehicle_id])
+        v.update(changes)
+        return self.set_vehicle(vehicle_id, **v)
+
+    def remove_vehicle(self, vehicle_id):
+        self._vehicles.pop(vehicle_id)
+        old = self._plans.pop(vehicle_id)
+        change = self._change(vehicle_id, old, None)
+        return [change] if change else []
+
+    def append(self, prices):
+        """Add newly published slots and re-plan only the vehicles they can affect.
+
+        Slots at or before the current last slot are ignored; the rest must
+        continue the series without gaps.
+        """
+        prices = PriceSeries.coerce(prices, self.timezone)
+        old_n = len(self._starts.values)
+        if old_n:
+            prices = prices.after(int(self._starts.values[-1]) + 1)
+        if prices.empty:
+            return []
+        if old_n and prices.starts[0] != self._starts.values[-1] + SLOT_SECONDS:
+            raise ValueError("appended prices must continue the series without a gap")
+        if np.any(np.diff(prices.starts) != SLOT_SECONDS):
+            raise ValueError("appended prices must be contiguous half-hour slots")
+
+        self._starts.extend(prices.starts)
+        self._prices.extend(prices.prices)
+        self._prefix.extend(self._prefix.values[-1] + np.cumsum(prices.prices, dtype=np.float64))
+        old_end = int(self._starts.values[old_n - 1]) + SLOT_SECONDS if old_n else None
+
+        events = []
+        for vehicle_id, v in self._vehicles.items():
+            if old_end is not None and v["departure"] <= old_end:
+                continue  # gone before the new slots begin
+            start, slots, mean = self._plans[vehicle_id]
+            first, stop = self._range(v)
+            # Windows that could start before were already considered
+            lo = max(first, old_n - slots + 1)
+            new_start, new_mean = self._best(lo, stop - slots, slots)
+            if new_start is None or (start is not None and new_mean >= mean):
+                continue
+            old = self._plans[vehicle_id]
+            self._plans[vehicle_id] = (new_start, slots, new_mean)
+            change = self._change(vehicle_id, old, self._plans[vehicle_id])
+            if change:
+                events.append(change)
+        return events
+
+    # --- Reading ---
+    def plan(self, vehicle_id):
+        """Current window for a vehicle: start/end (local), slots, avg_price.
+
+        None when the vehicle has nothing to charge or no window fits.
+        """
+        start, slots, mean = self._plans[vehicle_id]
+        if start is None:
+            return None
+        prices = self.prices
+        return {
+            "vehicle_id": vehicle_id,
+            "start": prices.local_time(start),
+            "end": prices.local_time(start + slots - 1) + pd.Timedelta(seconds=SLOT_SECONDS),
+            "slots": slots,
+            "avg_price": mean,
+        }
+
+    def plans(self):
+        """One row per vehicle with its current window (NaT where there is none; slots 0 if charged)."""
+        rows = [self.plan(vid) or {"vehicle_id": vid, "start": pd.NaT, "end": pd.NaT,
+                                   "slots": self._plans[vid][1], "avg_price": None}
+                for vid in self._vehicles]
+        return pd.DataFrame(rows, columns=["vehicle_id", "start", "end", "slots", "avg_price"])
@@ -0,0 +1,134 @@
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """Thread-safe stage timers and counters for one process.
+
+    Timers keep count, total and max seconds per stage; counters are
+    plain integers (cache hits/misses, upstream calls). Both can be read
+    as a dict, JSON or Prometheus text.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            count, total, peak = self._timers.get(name, (0, 0.0, 0.0))
+            self._timers[name] = (count + 1, total + seconds, max(peak, seconds))
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def timer(self, name):
+        """Times a block (`with metrics.timer("x"):`) or a function (`@metrics.timer("x")`)."""
+        return _Timer(self, name)
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        with self._lock:
+            timers = {
+                name: {"count": count, "total_s": total, "mean_s": total / count, "max_s": peak}
+                for name, (count, total, peak) in self._timers.items()
+            }
+            return {"timers": timers, "counters": dict(self._counters)}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+    def prometheus_text(self, prefix="ev"):
+        def metric(name):
+            return f"{prefix}_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+        snap = self.snapshot()
+        lines = []
+        for name, t in sorted(snap["timers"].items()):
+            base = metric(name) + "_seconds"
+            lines += [
+                f"# TYPE {base} summary",
+                f"{base}_count {t['count']}",
+                f"{base}_sum {t['total_s']:.6f}",
+                f"# TYPE {base}_max gauge",
+                f"{base}_max {t['max_s']:.6f}",
+            ]
+        for name, value in sorted(snap["counters"].items()):
+            lines += [f"# TYPE {metric(name)}_total counter", f"{metric(name)}_total {value}"]
+        return "\n".join(lines) + "\n"
+
+
+class _Timer:
+    """Context manager and decorator for one named stage."""
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            # A fresh timer per call keeps decorated functions reentrant and thread-safe
+            with _Timer(self.metrics, self.name):
+                return fn(*args, **kwargs)
+
+        return timed
+
+
+metrics = Metrics()
+timer = metrics.timer
+incr = metrics.incr
+
+
+def log_metrics(level=logging.INFO):
+    """Write the current metrics as one JSON log line."""
+    logger.log(level, "metrics %s", metrics.to_json())
+
+
+def start_metrics_server(port=9108, host="0.0.0.0"):
+    """Serve /metrics (Prometheus text) and /metrics.json on a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = metrics.prometheus_text(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = metrics.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,294 @@
+"""Concurrent-session load test for the dashboard flows and the scheduling API.
+
+    python load_test.py --sessions 50 --reruns 20 --latency 0.2 --error-rate 0.05
+    python load_test.py --sessions 20 --api-requests 5000 --recordings recordings
+
+Each simulated session is a thread replaying what ev.py computes on a
+rerun of the view it is looking at (rendering aside), switching views,
+regions and the hours slider at random. All sessions share one
+DataService, ForecastRegistry and per-prices view cache, as sessions on
+one Streamlit server share its cache_resource objects. Upstream calls go
+to a local ReplayServer unless --upstream points elsewhere. The report
+gives p50/p95/p99 latency per step, throughput and upstream call counts.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+import pytz
+
+from regions import DNO_REGIONS, REGION_CODES
+
+PRODUCT_CODE = "AGILE-18-02-21"
+VIEWS = ("advisor", "plan_ahead", "forecast", "regional")
+
+
+class Recorder:
+    """Thread-safe latency samples, error counts per step name and failure reasons."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.reasons = {}
+
+    def add(self, step, seconds, error=None):
+        with self._lock:
+            self.samples.setdefault(step, []).append(seconds)
+            if error is not None:
+                self.errors[step] = self.errors.get(step, 0) + 1
+                reason = str(error) or type(error).__name__
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def summary(self):
+        rows = {}
+        for step, values in sorted(self.samples.items()):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            rows[step] = {"n": len(values), "errors": self.errors.get(step, 0),
+                          "p50_s": p50, "p95_s": p95, "p99_s": p99, "max_s": max(values)}
+        return rows
+
+    def timed(self, step, fn, *args):
+        start = time.perf_counter()
+        error = None
+        try:
+            fn(*args)
+        except Exception as e:
+            error = e
+        self.add(step, time.perf_counter() - start, error)
+
+
+def require_prices(service, region):
+    """A region's prices; raises (so the step counts as failed) if its fetch failed or nothing is stored.
+
+    ev.py shows an error for a failed region even when older history is
+    still served, so a step that hits one is not a success either.
+    """
+    prices = service.prices(region)
+    error = service.snapshot().errors.get(region)
+    if error is not None:
+        raise RuntimeError(f"region {region}: {error}")
+    if prices.empty:
+        raise RuntimeError(f"region {region}: no prices")
+    return prices
+
+
+class SessionFlows:
+    """The work each ev.py view does on a rerun (the dashboard functions), without the rendering."""
+
+    def __init__(self, product_code=PRODUCT_CODE, timezone="Europe/London"):
+        from data_service import DataService
+        from locks import KeyedLocks
+        from model_registry import ForecastRegistry
+
+        self.product_code = product_code
+        self.tz = pytz.timezone(timezone)
+        self.service = DataService(product_code, list(REGION_CODES)).start()
+        self.registry = ForecastRegistry()
+        self._cache = {}
+        self._lock = KeyedLocks()
+
+    def _cached(self, key, build):
+        # Stand-in for st.cache_resource/st.cache_data keyed on the prices' fingerprint
+        value = self._cache.get(key)
+        if value is None:
+            with self._lock(key):
+                value = self._cache.get(key)
+                if value is None:
+                    value = self._cache[key] = build()
+        return value
+
+    def _views(self, region):
+        import dashboard
+
+        prices = require_prices(self.service, region)
+        today = datetime.now(self.tz).date()
+        views = self._cached(("views", region, prices.fingerprint(), today),
+                             lambda: dashboard.price_views(prices, today, self.tz.zone))
+        return prices, views
+
+    def advisor(self, region, hours):
+        import dashboard
+        from price_series import SLOT_SECONDS, to_epoch
+
+        prices, views = self._views(region)
+        now = datetime.now(self.tz)
+        dashboard.advise(prices, views, now, 60, 20, 80, hours, 7.4, self.service.carbon(), DNO_REGIONS[region])
+        slot_start = to_epoch(now) // SLOT_SECONDS * SLOT_SECONDS
+        grid = self._cached(("sensitivity", region, prices.fingerprint(), slot_start),
+                            lambda: dashboard.sensitivity_grid(prices, slot_start))
+        grid.at(60, 20, 80, hours, 7.4)
+        grid.heatmap("savings", "capacity", "hours", soc=(20, 80), charger_kw=7.4)
+        views["chart"].view(now.replace(hour=0, minute=0, second=0, microsecond=0))
+
+    def plan_ahead(self, region, hours):
+        import dashboard
+
+        prices, views = self._views(region)
+        result, _ = dashboard.plan_tomorrow(views, hours)
+        if result[-1] == 0:
+            # Tomorrow not published yet: the forecast-based plan
+            tomorrow = (datetime.now(self.tz) + timedelta(days=1)).date()
+            self._cached(("scenarios", region, prices.fingerprint(), tomorrow, hours),
+                         lambda: dashboard.scenario_windows(self.registry, f"{self.product_code}-{region}",
+                                                            prices, tomorrow, hours, self.tz.zone))
+
+    def forecast(self, region, hours):
+        import dashboard
+
+        prices = require_prices(self.service, region)
+        self._cached(("forecast", region, prices.fingerprint()),
+                     lambda: dashboard.next_day_forecast(self.registry, f"{self.product_code}-{region}", prices))
+
+    def regional(self, region, hours):
+        import dashboard
+        from price_series import SLOT_SECONDS, to_epoch
+
+        prices = self.service.prices_for(REGION_CODES)  # first visit fetches every region in one batch
+        snap = self.service.snapshot()
+        failed = [code for code in REGION_CODES if code in snap.errors or prices[code].empty]
+        if failed:
+            raise RuntimeError(f"map regions failed: {', '.join(failed)}")
+        slot_start = to_epoch(datetime.now(self.tz)) // SLOT_SECONDS * SLOT_SECONDS
+        self._cached(("live", snap.version, slot_start), lambda: dashboard.live_prices(snap, REGION_CODES, slot_start))
+        carbon = self.service.carbon()
+        if carbon is not None:
+            carbon.current()
+
+
+def run_session(flows, recorder, reruns, views, seed):
+    """One browser session: the first load, then `reruns` random interactions."""
+    rng = random.Random(seed)
+    view, region, hours = "advisor", rng.choice(REGION_CODES), 4
+    recorder.timed("first_load", getattr(flows, view), region, hours)
+    for _ in range(reruns):
+        action = rng.choice(("view", "region", "slider"))
+        if action == "view":
+            view = rng.choice(views)
+        elif action == "region":
+            region = rng.choice(REGION_CODES)
+        else:
+            hours = rng.randint(1, 12)
+        recorder.timed(f"{view}:{action}", getattr(flows, view), region, hours)
+
+
+def run_api(recorder, api, n_requests, workers, seed):
+    """Scheduling-function calls through SchedulingAPI from `workers` threads."""
+    from api import call
+
+    rng = random.Random(seed)
+    requests = [(rng.choice(("current", "cheapest-window", "tomorrow", "savings")), rng.choice(REGION_CODES),
+                 rng.randint(1, 12)) for _ in range(n_requests)]
+
+    def checked(endpoint, region, params):
+        call(api, endpoint, params)
+        require_prices(api.service, region)
+
+    def one(req):
+        endpoint, region, hours = req
+        params = {"region": region}
+        if endpoint != "current":
+            params["hours"] = str(hours)
+        if endpoint == "savings":
+            params.update(battery_capacity="60", current_soc="20", target_soc="80")
+        recorder.timed(f"api:{endpoint}", checked, endpoint, region, params)
+
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(one, requests))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent simulated sessions")
+    parser.add_argument("--reruns", type=int, default=20, help="interactions per session after the first load")
+    parser.add_argument("--no-forecast", action="store_true", help="never open the forecast view")
+    parser.add_argument("--api-requests", type=int, default=0, help="scheduling API calls to make after the sessions")
+    parser.add_argument("--api-workers", type=int, default=16)
+    parser.add_argument("--upstream", help="base URL of an already running stand-in server")
+    parser.add_argument("--recordings", help="replay this recordings dir instead of synthetic data")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean upstream delay, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of upstream requests that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    # Fresh stores so first loads really go upstream (set before the modules read them)
+    os.environ.setdefault("PRICE_STORE_DIR", tempfile.mkdtemp(prefix="price_data_"))
+    os.environ.setdefault("MODEL_DIR", tempfile.mkdtemp(prefix="models_"))
+    replay = None
+    if args.upstream:
+        base_url = args.upstream.rstrip("/")
+    else:
+        from replay_server import Recordings, ReplayServer
+
+        recordings = Recordings.load(args.recordings) if args.recordings else Recordings.synthetic(PRODUCT_CODE)
+        replay = ReplayServer(recordings, latency=args.latency, error_rate=args.error_rate, seed=args.seed).start()
+        base_url = replay.url
+    import carbon
+    import octopus
+    from instrumentation import metrics
+
+    octopus.OCTOPUS_API_URL = f"{base_url}/v1"
+    carbon.CARBON_API_URL = base_url
+
+    recorder = Recorder()
+    flows = SessionFlows()
+    views = [v for v in VIEWS if not (args.no_forecast and v == "forecast")]
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run_session, args=(flows, recorder, args.reruns, views, args.seed + i))
+               for i in range(args.sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    session_elapsed = time.perf_counter() - started
+
+    api_elapsed = 0.0
+    if args.api_requests:
+        from api import SchedulingAPI
+
+        started = time.perf_counter()
+        run_api(recorder, SchedulingAPI(service=flows.service), args.api_requests, args.api_workers, args.seed)
+        api_elapsed = time.perf_counter() - started
+    flows.service.stop()
+
+    summary = recorder.summary()
+    reruns = sum(r["n"] for step, r in summary.items() if not step.startswith("api:"))
+    counters = metrics.snapshot()["counters"]
+    report = {
+        "sessions": args.sessions,
+        "steps": summary,
+        "failures": recorder.reasons,
+        "rerun_throughput_per_s": reruns / session_elapsed,
+        "api_throughput_per_s": args.api_requests / api_elapsed if api_elapsed else None,
+        "upstream": dict(replay.stats) if replay else {
+            "octopus": counters.get("octopus.requests", 0), "carbon": counters.get("carbon.requests", 0)},
+        "counters": counters,
+    }
+
+    print(f"{'step':28s} {'n':>6s} {'err':>5s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for step, r in summary.items():
+        print(f"{step:28s} {r['n']:6d} {r['errors']:5d} {r['p50_s'] * 1000:9.1f} {r['p95_s'] * 1000:9.1f} {r['p99_s'] * 1000:9.1f}")
+    print(f"session throughput: {report['rerun_throughput_per_s']:.1f} reruns/s")
+    if report["api_throughput_per_s"]:
+        print(f"api throughput: {report['api_throughput_per_s']:.1f} requests/s")
+    print(f"upstream calls: {report['upstream']}")
+    for reason, count in sorted(recorder.reasons.items(), key=lambda item: -item[1]):
+        print(f"failed {count}x: {reason}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if replay:
+        replay.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
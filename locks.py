@@ -0,0 +1,15 @@
+import threading
+
+
+class KeyedLocks:
+    """One lock per key, created on first use; `with locks(key):` serializes work on that key only."""
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def __call__(self, key):
+        with self._guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
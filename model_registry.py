@@ -0,0 +1,82 @@
+import os
+import pickle
+from instrumentation import incr
+from locks import KeyedLocks
+from price_prediction import PriceForecaster
+
+DEFAULT_MODEL_DIR = os.environ.get("MODEL_DIR", "models")
+
+
+class ForecastRegistry:
+    """Trained PriceForecasters keyed by region and training-data hash.
+
+    One entry per key (e.g. "AGILE-18-02-21-A") is kept in memory and
+    pickled under `root`, so every session in the process and any later
+    process reuse it. `get` returns the stored model untouched when the
+    data hash matches, warm-starts it when only new slots were appended,
+    and falls back to a full fit after `max_updates` warm starts or when
+    the history no longer lines up. `cached` is the underlying lookup
+    for any other model kept the same way.
+    """
+
+    def __init__(self, root=DEFAULT_MODEL_DIR, max_updates=7):
+        self.root = root
+        self.max_updates = max_updates
+        self._entries = {}
+        self._lock = KeyedLocks()
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _save(self, key, entry):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._path(key) + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp, self._path(key))
+
+    def cached(self, key, data_hash, build):
+        """The model stored under `key` if it was built from `data_hash`, else a new one.
+
+        `build(stale)` gets the outdated entry (or None) and returns a new
+        entry dict with a "forecaster"; it is stored with the hash.
+        """
+        with self._lock(key):
+            entry = self._entries.get(key) or self._load(key)
+            if entry is not None and entry["data_hash"] == data_hash:
+                self._entries[key] = entry
+                incr("forecast_registry.hit")
+                return entry["forecaster"]
+            entry = dict(build(entry), data_hash=data_hash)
+            self._entries[key] = entry
+            self._save(key, entry)
+            return entry["forecaster"]
+
+    def get(self, key, prices):
+        """A forecaster trained on `prices` (a PriceSeries), training only if needed."""
+        first, last = int(prices.starts[0]), int(prices.starts[-1])
+
+        def build(entry):
+            if (
+                entry is not None
+                and entry.get("first_start") == first
+                and entry["last_start"] < last
+                and entry["forecaster"].metrics.get("updates", 0) < self.max_updates
+            ):
+                incr("forecast_registry.update")
+                forecaster = entry["forecaster"]
+                forecaster.update(prices.slice(prices.index_of(entry["last_start"] + 1), len(prices)))
+            else:
+                incr("forecast_registry.fit")
+                forecaster = PriceForecaster()
+                forecaster.fit(prices)
+            return {"forecaster": forecaster, "first_start": first, "last_start": last}
+
+        return self.cached(key, prices.fingerprint(), build)
@@ -0,0 +1,54 @@
+import os
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from instrumentation import incr, timer
+from price_series import to_epoch
+
+# Override (e.g. with a local replay server) via the environment or by setting this attribute
+OCTOPUS_API_URL = os.environ.get("OCTOPUS_API_URL", "https://api.octopus.energy/v1")
+PAGE_SIZE = 1500  # largest page the API will serve
+
+
+def make_session(pool_size=16):
+    """A keep-alive session whose connection pool fits `pool_size` threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def unit_rates_url(product_code, region_code, base_url=None):
+    base_url = base_url or OCTOPUS_API_URL
+    return (
+        f"{base_url}/products/{product_code}/electricity-tariffs/"
+        f"E-1R-{product_code}-{region_code}/standard-unit-rates/"
+    )
+
+
+@timer("octopus.fetch_unit_rates")
+def fetch_unit_rates(product_code, region_code, period_from=None, session=None, timeout=10, base_url=None):
+    """All unit-rate results from `period_from` onwards, following `next` pages.
+
+    `period_from` may be a datetime or epoch seconds; None fetches whatever
+    the API returns by default. Raises on any HTTP error.
+    """
+    http = session or requests
+    url = unit_rates_url(product_code, region_code, base_url)
+    params = {"page_size": PAGE_SIZE}
+    if period_from is not None:
+        period_from = pd.Timestamp(to_epoch(period_from), unit="s", tz="UTC")
+        params["period_from"] = period_from.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    results = []
+    while url:
+        incr("octopus.requests")
+        response = http.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        results.extend(data["results"])
+        # The `next` link already carries the query string
+        url = data.get("next")
+        params = None
+    return results
@@ -1,23 +1,16 @@
-import pandas as pd
 from datetime import datetime
+import numpy as np
 import pytz
+from instrumentation import timer
+from price_series import PriceSeries, SLOT_SECONDS, to_epoch
+from window_engine import cheapest_window
+from slot_scheduler import cheapest_slots, tapered_slots, SLOT_HOURS
 
 class PriceCalculator:
-    def __init__(self, df, battery_capacity, current_soc, target_soc, window_hours, timezone="Europe/London"):
-        self.df = df.copy()
-        # Ensure datetime columns are timezone-aware and in Europe/London
-        london_tz = pytz.timezone(timezone)
-        for col in ['valid_from_bst', 'valid_to_bst']:
-            if pd.api.types.is_datetime64_any_dtype(self.df[col]):
-                if self.df[col].dt.tz is None:
-                    # Naive: localize to UTC then convert
-                    self.df[col] = self.df[col].dt.tz_localize('UTC').dt.tz_convert(london_tz)
-                else:
-                    self.df[col] = self.df[col].dt.tz_convert(london_tz)
-            else:
-                # Not datetime yet
-                self.df[col] = pd.to_datetime(self.df[col], utc=True).dt.tz_convert(london_tz)
-        self.df = self.df.sort_values('valid_from_bst').reset_index(drop=True)
+    def __init__(self, df, battery_capacity, current_soc, target_soc, window_hours, timezone="Europe/London", index=None):
+        self.prices = PriceSeries.coerce(df, timezone)
+        # Optional WindowIndex over the same series turns window searches into lookups
+        self.index = index
         self.battery_capacity = battery_capacity
         self.current_soc = current_soc
         self.target_soc = target_soc
@@ -25,18 +18,20 @@ class PriceCalculator:
         self.timezone = timezone
 
         self.kwh_needed = self._calculate_kwh_needed()
-        self.now = datetime.now(london_tz)
+        self.now = datetime.now(pytz.timezone(timezone))
+
+    @property
+    def df(self):
+        return self.prices.to_frame()
 
     def _calculate_kwh_needed(self):
         soc_delta = max(0, self.target_soc - self.current_soc)
         return self.battery_capacity * soc_delta / 100
 
     def get_current_price(self):
-        current_row = self.df[
-            (self.df['valid_from_bst'] <= self.now) & (self.df['valid_to_bst'] > self.now)
-        ]
-        if not current_row.empty:
-            return current_row.iloc[0]['price_gbp'], current_row.iloc[0]['valid_from_bst']
+        i = self.prices.slot_at(self.now)
+        if i is not None:
+            return float(self.prices.prices[i]), self.prices.local_time(i)
         return None, None
 
     def cost_to_charge_now(self):
@@ -45,85 +40,81 @@ class PriceCalculator:
             return self.kwh_needed * price, price, price_time
         return None, None, None
 
-    def find_cheapest_window(self):
-        slots_needed = int(self.window_hours * 2)  # 30-min slots
-        if len(self.df) < slots_needed:
-            return None, None, None, None, None
-
-        min_avg = None
-        min_start = None
-        for i in range(0, len(self.df) - slots_needed + 1):
-            window = self.df.iloc[i:i + slots_needed]
-            avg = window['price_gbp'].mean()
-            if (min_avg is None) or (avg < min_avg):
-                min_avg = avg
-                min_start = i
-
-        if min_start is None:
-            return None, None, None, None, None
-
-        window_df = self.df.iloc[min_start:min_start + slots_needed]
-        avg_price = window_df['price_gbp'].mean()
+    def _window_result(self, start, slots_needed):
+        window = self.prices.slice(start, start + slots_needed)
+        window_df = window.to_frame()
+        avg_price = float(window.prices.mean(dtype='float64'))
         cost = self.kwh_needed * avg_price
         start_time = window_df.iloc[0]['valid_from_bst']
         end_time = window_df.iloc[-1]['valid_to_bst']
         return cost, avg_price, start_time, end_time, window_df
 
-    def find_cheapest_window_today(self):
-        """Cheapest window for the whole day."""
-        slots_needed = int(self.window_hours * 2)
-        if len(self.df) < slots_needed:
+    def _cheapest_window(self, first_start=0):
+        slots_needed = int(self.window_hours * 2)  # 30-min slots
+        if len(self.prices) < slots_needed:
             return None, None, None, None, None
 
-        min_avg = None
-        min_start = None
-        for i in range(0, len(self.df) - slots_needed + 1):
-            window = self.df.iloc[i:i + slots_needed]
-            avg = window['price_gbp'].mean()
-            if (min_avg is None) or (avg < min_avg):
-                min_avg = avg
-                min_start = i
-
+        if self.index is not None and self.index.covers(self.prices, self.window_hours):
+            min_start, _ = self.index.cheapest_between(self.window_hours, first_start, len(self.prices) - slots_needed)
+        else:
+            min_start, _ = cheapest_window(self.prices.prices, slots_needed, first_start)
         if min_start is None:
             return None, None, None, None, None
+        return self._window_result(min_start, slots_needed)
 
-        window_df = self.df.iloc[min_start:min_start + slots_needed]
-        avg_price = window_df['price_gbp'].mean()
-        cost = self.kwh_needed * avg_price
-        start_time = window_df.iloc[0]['valid_from_bst']
-        end_time = window_df.iloc[-1]['valid_to_bst']
-        return cost, avg_price, start_time, end_time, window_df
+    @timer("price_calculator.find_cheapest_window")
+    def find_cheapest_window(self):
+        return self._cheapest_window()
 
+    @timer("price_calculator.find_cheapest_window_today")
+    def find_cheapest_window_today(self):
+        """Cheapest window for the whole day."""
+        return self._cheapest_window()
+
+    @timer("price_calculator.find_cheapest_window_from_now")
     def find_cheapest_window_from_now(self):
         """Cheapest window starting at or after now."""
-        slots_needed = int(self.window_hours * 2)
-        if len(self.df) < slots_needed:
-            return None, None, None, None, None
-
-        # Only consider windows starting at or after now
-        now = self.now
-        valid_starts = self.df[self.df['valid_from_bst'] >= now].index
-        min_avg = None
-        min_start = None
-        for i in valid_starts:
-            if i + slots_needed > len(self.df):
-                break
-            window = self.df.iloc[i:i + slots_needed]
-            avg = window['price_gbp'].mean()
-            if (min_avg is None) or (avg < min_avg):
-                min_avg = avg
-                min_start = i
-
-        if min_start is None:
-            return None, None, None, None, None
-
-        window_df = self.df.iloc[min_start:min_start + slots_needed]
-        avg_price = window_df['price_gbp'].mean()
-        cost = self.kwh_needed * avg_price
-        start_time = window_df.iloc[0]['valid_from_bst']
-        end_time = window_df.iloc[-1]['valid_to_bst']
-        return cost, avg_price, start_time, end_time, window_df
-
+        # Slots are sorted, so windows starting at or after now form a suffix
+        return self._cheapest_window(self.prices.index_of(self.now))
+
+    def charging_slots(self, deadline, plug_in=None):
+        """Slots starting at or after `plug_in` (default now) that end by `deadline`."""
+        first = self.prices.index_of(self.now if plug_in is None else plug_in)
+        last = self.prices.index_of(to_epoch(deadline) - SLOT_SECONDS + 1)
+        return self.prices.slice(first, max(first, last))
+
+    @timer("price_calculator.schedule_charging")
+    def schedule_charging(self, charger_kw, deadline, plug_in=None, taper=None):
+        """Cheapest set of (possibly non-contiguous, partial) slots before a deadline.
+
+        Uses the charging_slots between `plug_in` and `deadline`. With
+        `taper` ((soc %, ...), (kW, ...)) the charge rate follows the
+        battery's state of charge, never above `charger_kw`.
+        """
+        window = self.charging_slots(deadline, plug_in)
+        if taper is None:
+            energy = cheapest_slots(window.prices, self.kwh_needed, charger_kw * SLOT_HOURS)
+        else:
+            # The car may accept more than the charger can give
+            soc_points, kw_points = taper
+            taper = (soc_points, np.minimum(np.asarray(kw_points, dtype=np.float64), charger_kw))
+            energy = tapered_slots(window.prices, self.kwh_needed, self.battery_capacity, self.current_soc, taper)
+
+        schedule_df = window.to_frame().assign(energy_kwh=energy)
+        schedule_df['cost'] = schedule_df['price_gbp'] * schedule_df['energy_kwh']
+        schedule_df = schedule_df[schedule_df['energy_kwh'] > 0].reset_index(drop=True)
+        delivered = float(energy.sum())
+        cost = float(schedule_df['cost'].sum())
+        return {
+            "kwh_needed": self.kwh_needed,
+            "delivered_kwh": delivered,
+            "shortfall_kwh": max(0.0, self.kwh_needed - delivered),
+            "cost": cost,
+            "avg_price": cost / delivered if delivered > 0 else None,
+            "schedule_df": schedule_df
+        }
+
+    @timer("price_calculator.calculate_savings")
     def calculate_savings(self):
         cost_now, price_now, price_time = self.cost_to_charge_now()
         cost_cheapest, avg_price, start_time, end_time, window_df = self.find_cheapest_window()
@@ -142,4 +133,4 @@ class PriceCalculator:
             "end_time": end_time,
             "savings": savings,
             "window_df": window_df
-        }
\ No newline at end of file
+        }
@@ -1,32 +1,72 @@
 import pandas as pd
 import numpy as np
-from xgboost import XGBRegressor
-from sklearn.model_selection import train_test_split
+from instrumentation import timer
+from price_series import PriceSeries
+
+def _regressor(n_estimators):
+    # xgboost takes most of a second to import, so only load it once a model is built
+    from xgboost import XGBRegressor
+    return XGBRegressor(n_estimators=n_estimators, random_state=42)
+
+def _error_metrics(y_true, y_pred):
+    err = np.asarray(y_pred, dtype=np.float64) - np.asarray(y_true, dtype=np.float64)
+    return {"mae": float(np.abs(err).mean()), "rmse": float(np.sqrt((err ** 2).mean())), "n": len(err)}
 
 class PriceForecaster:
     def __init__(self):
-        self.model = XGBRegressor(n_estimators=100, random_state=42)
+        self.model = _regressor(100)
         self.trained = False
+        self.metrics = {}
 
-    def prepare_features(self, df):
+    def prepare_features(self, data):
         # Feature engineering: hour, day of week, etc.
-        df = df.copy()
-        df['hour'] = df['valid_from_bst'].dt.hour
-        df['dayofweek'] = df['valid_from_bst'].dt.dayofweek
-        return df[['hour', 'dayofweek']]
-
-    def fit(self, df):
-        df = df.sort_values('valid_from_bst')
-        X = self.prepare_features(df)
-        y = df['price_gbp']
+        if isinstance(data, PriceSeries):
+            times = data.local_starts()
+        else:
+            times = pd.DatetimeIndex(data['valid_from_bst'])
+        return pd.DataFrame({'hour': times.hour, 'dayofweek': times.dayofweek})
+
+    def _training_data(self, data):
+        if isinstance(data, PriceSeries):
+            return self.prepare_features(data), data.prices
+        df = data.sort_values('valid_from_bst')
+        return self.prepare_features(df), df['price_gbp'].to_numpy()
+
+    @timer("price_forecaster.fit")
+    def fit(self, data):
+        from sklearn.model_selection import train_test_split
+
+        X, y = self._training_data(data)
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         self.model.fit(X_train, y_train)
         self.trained = True
+        # Held-out error on the 20% split
+        self.metrics = {"test": _error_metrics(y_test, self.model.predict(X_test)), "updates": 0}
+
+    @timer("price_forecaster.update")
+    def update(self, data, n_estimators=20):
+        """Warm-start refit on newly arrived slots only.
+
+        The current model is first scored on the new slots (true out-of-sample
+        error), then `n_estimators` trees are added on top of its booster.
+        """
+        if not self.trained:
+            return self.fit(data)
+        X, y = self._training_data(data)
+        self.metrics["last_update"] = _error_metrics(y, self.model.predict(X))
+        model = _regressor(n_estimators)
+        model.fit(X, y, xgb_model=self.model.get_booster())
+        self.model = model
+        self.metrics["updates"] = self.metrics.get("updates", 0) + 1
 
-    def predict_next_day(self, df):
+    @timer("price_forecaster.predict_next_day")
+    def predict_next_day(self, data):
         # Predict for next 24 hours
-        last_date = df['valid_from_bst'].max()
-        next_hours = pd.date_range(last_date + pd.Timedelta(minutes=30), periods=48, freq='30T')
+        if isinstance(data, PriceSeries):
+            last_date = data.local_time(len(data) - 1)
+        else:
+            last_date = data['valid_from_bst'].max()
+        next_hours = pd.date_range(last_date + pd.Timedelta(minutes=30), periods=48, freq='30min')
         pred_df = pd.DataFrame({
             'valid_from_bst': next_hours,
             'hour': next_hours.hour,
@@ -34,4 +74,4 @@ class PriceForecaster:
         })
         X_pred = pred_df[['hour', 'dayofweek']]
         pred_df['predicted_price'] = self.model.predict(X_pred)
-        return pred_df
\ No newline at end of file
+        return pred_df
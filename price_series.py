@@ -0,0 +1,156 @@
+import hashlib
+import numpy as np
+import pandas as pd
+import pytz
+from datetime import datetime, time, timedelta
+from instrumentation import timer
+
+SLOT_SECONDS = 1800  # Agile half-hour slots
+_EPOCH = pd.Timestamp(0, tz="UTC")
+
+
+def to_epoch(ts):
+    """Seconds since the Unix epoch for a datetime/Timestamp (naive means UTC).
+
+    Integers are taken to be epoch seconds already and returned as-is.
+    """
+    if isinstance(ts, (int, np.integer)):
+        return int(ts)
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int((ts - _EPOCH) // pd.Timedelta(seconds=1))
+
+
+def to_epochs(values):
+    """Epoch seconds for a column of timestamps (numbers are taken as epoch seconds)."""
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(np.int64)
+    values = pd.to_datetime(values, utc=True)
+    return ((values - _EPOCH) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+
+
+class PriceSeries:
+    """Half-hourly unit prices held as two flat arrays.
+
+    `starts` are int64 UTC epoch seconds of each slot start (sorted) and
+    `prices` are float32 £/kWh. Slicing returns views onto the same arrays;
+    local (Europe/London) timestamps are only built when something needs
+    to display them.
+    """
+    __slots__ = ("starts", "prices", "timezone", "_frame", "_fingerprint")
+
+    def __init__(self, starts, prices, timezone="Europe/London"):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.prices = np.asarray(prices, dtype=np.float32)
+        self.timezone = timezone
+        self._frame = None
+        self._fingerprint = None
+
+    # --- Construction ---
+    @classmethod
+    def _sorted(cls, starts, prices, timezone):
+        if len(starts) > 1 and np.any(np.diff(starts) < 0):
+            order = np.argsort(starts, kind="stable")
+            starts, prices = starts[order], prices[order]
+        return cls(starts, prices, timezone)
+
+    @classmethod
+    @timer("price_series.from_frame")
+    def from_frame(cls, df, timezone="Europe/London"):
+        """Build from a frame with `valid_from_bst` and `price_gbp` columns."""
+        if df.empty:
+            return cls([], [], timezone)
+        # Naive timestamps are taken as UTC, as the calculators always did
+        valid_from = pd.to_datetime(df["valid_from_bst"], utc=True)
+        starts = ((valid_from - _EPOCH) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+        return cls._sorted(starts, df["price_gbp"].to_numpy(np.float32), timezone)
+
+    @classmethod
+    @timer("price_series.from_octopus_results")
+    def from_octopus_results(cls, results, timezone="Europe/London"):
+        """Build from the `results` list of an Octopus standard-unit-rates page."""
+        if not results:
+            return cls([], [], timezone)
+        valid_from = pd.to_datetime([r["valid_from"] for r in results], utc=True)
+        starts = ((valid_from - _EPOCH) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+        prices = np.array([r["value_inc_vat"] for r in results], dtype=np.float32) / 100
+        return cls._sorted(starts, prices, timezone)
+
+    @classmethod
+    def coerce(cls, data, timezone="Europe/London"):
+        """Return `data` unchanged if it is a PriceSeries, else normalize a frame (UTC, sorted) once.
+
+        Callers take either and pay for the conversion only at the boundary.
+        """
+        if isinstance(data, cls):
+            return data
+        return cls.from_frame(data, timezone)
+
+    def fingerprint(self):
+        """Short hash of the slot starts and prices, for cache keys (computed once per series)."""
+        if self._fingerprint is None:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(np.ascontiguousarray(self.starts))
+            h.update(np.ascontiguousarray(self.prices))
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    # --- Views ---
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def empty(self):
+        return len(self.starts) == 0
+
+    def slice(self, start, stop):
+        """Zero-copy view of slots [start, stop)."""
+        return PriceSeries(self.starts[start:stop], self.prices[start:stop], self.timezone)
+
+    def index_of(self, ts):
+        """Index of the first slot starting at or after `ts`."""
+        return int(np.searchsorted(self.starts, to_epoch(ts), side="left"))
+
+    def between(self, start_ts, end_ts):
+        """Slots starting in [start_ts, end_ts)."""
+        return self.slice(self.index_of(start_ts), self.index_of(end_ts))
+
+    def after(self, ts):
+        """Slots starting at or after `ts`."""
+        return self.slice(self.index_of(ts), len(self))
+
+    def day(self, date):
+        """Slots starting on the given local calendar date."""
+        tz = pytz.timezone(self.timezone)
+        start = tz.localize(datetime.combine(date, time()))
+        end = tz.localize(datetime.combine(date + timedelta(days=1), time()))
+        return self.between(start, end)
+
+    def slot_at(self, ts):
+        """Index of the slot covering `ts`, or None."""
+        t = to_epoch(ts)
+        i = int(np.searchsorted(self.starts, t, side="right")) - 1
+        if i >= 0 and t < self.starts[i] + SLOT_SECONDS:
+            return i
+        return None
+
+    # --- Display ---
+    def local_time(self, i):
+        """Local start time of slot i as a Timestamp."""
+        return pd.Timestamp(int(self.starts[i]), unit="s", tz="UTC").tz_convert(self.timezone)
+
+    def local_starts(self):
+        return pd.to_datetime(self.starts, unit="s", utc=True).tz_convert(self.timezone)
+
+    def to_frame(self):
+        """The familiar valid_from_bst/valid_to_bst/price_gbp frame, built once."""
+        if self._frame is None:
+            valid_from = self.local_starts()
+            self._frame = pd.DataFrame({
+                "valid_from_bst": valid_from,
+                "valid_to_bst": valid_from + pd.Timedelta(seconds=SLOT_SECONDS),
+                "price_gbp": self.prices.astype(np.float64),
+            })
+        return self._frame
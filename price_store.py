@@ -0,0 +1,138 @@
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from locks import KeyedLocks
+from octopus import fetch_unit_rates, make_session
+from price_series import PriceSeries, SLOT_SECONDS
+
+DEFAULT_STORE_DIR = os.environ.get("PRICE_STORE_DIR", "price_data")
+
+
+class PriceStore:
+    """Local Agile price history, partitioned by product code and region.
+
+    Each partition is a directory of generations, each holding two column
+    files, `starts.npy` (int64 UTC epoch seconds) and `prices.npy`
+    (float32 £/kWh), which are loaded memory-mapped. A write fills a new
+    generation and then repoints the `CURRENT` file at it with one
+    rename, so readers in any process see both columns from the same
+    write. `update` backfills `backfill_days` of history on first use and
+    afterwards only asks Octopus for slots newer than the last one stored.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, backfill_days=365, timezone="Europe/London"):
+        self.root = root
+        self.backfill_days = backfill_days
+        self.timezone = timezone
+        self._lock = KeyedLocks()
+
+    def _partition(self, product_code, region_code):
+        for name in (product_code, region_code):
+            # Codes become directory names; never let one climb out of the store
+            if not name or name in (".", "..") or os.sep in name or (os.altsep and os.altsep in name):
+                raise ValueError(f"invalid product or region code {name!r}")
+        return os.path.join(self.root, product_code, region_code)
+
+    @staticmethod
+    def _current(path):
+        """Directory holding the live generation, or None if nothing was written yet."""
+        try:
+            with open(os.path.join(path, "CURRENT")) as f:
+                return os.path.join(path, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def _read(self, path, attempts=3):
+        for attempt in range(attempts):
+            current = self._current(path)
+            if current is None:
+                return PriceSeries([], [], self.timezone)
+            try:
+                starts = np.load(os.path.join(current, "starts.npy"), mmap_mode="r")
+                prices = np.load(os.path.join(current, "prices.npy"), mmap_mode="r")
+                return PriceSeries(starts, prices, self.timezone)
+            except FileNotFoundError:
+                # Writers pruned this generation after we read CURRENT; look again
+                if attempt == attempts - 1:
+                    raise
+
+    def _write(self, path, starts, prices):
+        current = self._current(path)
+        generation = f"gen-{time.time_ns():020d}-{os.getpid()}"
+        os.makedirs(os.path.join(path, generation))
+        np.save(os.path.join(path, generation, "starts.npy"), starts)
+        np.save(os.path.join(path, generation, "prices.npy"), prices)
+        tmp = os.path.join(path, f".CURRENT.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            f.write(generation)
+        os.replace(tmp, os.path.join(path, "CURRENT"))
+        if current is None:
+            return
+        # Keep the previous generation for readers that looked up CURRENT just before the swap
+        previous = os.path.basename(current)
+        for name in os.listdir(path):
+            if name.startswith("gen-") and name < previous:
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    def load(self, product_code, region_code):
+        """Everything stored for a partition as a (memory-mapped) PriceSeries."""
+        with self._lock((product_code, region_code)):
+            return self._read(self._partition(product_code, region_code))
+
+    def last_start(self, product_code, region_code):
+        """Epoch seconds of the newest stored slot, or None if empty."""
+        stored = self.load(product_code, region_code)
+        return None if stored.empty else int(stored.starts[-1])
+
+    def append(self, product_code, region_code, series):
+        """Merge new slots into a partition; returns how many slots were new."""
+        if series.empty:
+            return 0
+        path = self._partition(product_code, region_code)
+        with self._lock((product_code, region_code)):
+            stored = self._read(path)
+            starts = np.concatenate([stored.starts, series.starts])
+            prices = np.concatenate([stored.prices, series.prices])
+            # Keep the latest value for any slot fetched twice
+            order = np.argsort(starts, kind="stable")
+            starts, prices = starts[order], prices[order]
+            keep = np.ones(len(starts), dtype=bool)
+            keep[:-1] = starts[1:] != starts[:-1]
+            starts, prices = starts[keep], prices[keep]
+            added = len(starts) - len(stored)
+
+            self._write(path, starts, prices)
+        return added
+
+    def update(self, product_code, region_code, session=None, timeout=10):
+        """Fetch only the slots we don't have yet; returns how many were added."""
+        last = self.last_start(product_code, region_code)
+        if last is None:
+            period_from = int(time.time()) - self.backfill_days * 86400
+        else:
+            period_from = last + SLOT_SECONDS
+        results = fetch_unit_rates(product_code, region_code, period_from, session=session, timeout=timeout)
+        return self.append(product_code, region_code, PriceSeries.from_octopus_results(results, self.timezone))
+
+    def update_regions(self, product_code, region_codes, max_workers=16, timeout=10, session=None):
+        """Update several regions concurrently over one pooled session.
+
+        Returns (added, errors): slots added per region that succeeded, and
+        the exception per region that failed. One region failing does not
+        stop the others.
+        """
+        session = session or make_session(max_workers)
+        added, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                code: pool.submit(self.update, product_code, code, session, timeout)
+                for code in region_codes
+            }
+            for code, future in futures.items():
+                try:
+                    added[code] = future.result()
+                except Exception as e:
+                    errors[code] = e
+        return added, errors
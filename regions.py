@@ -0,0 +1,25 @@
+import pandas as pd
+
+# --- UK electricity regions ---
+# `code` is Octopus's region letter (the GSP group, the suffix of E-1R-<product>-<code>),
+# `dnoregion` the Carbon Intensity API's name for the same area
+region_df = pd.DataFrame({
+    "region": [
+        "East Midlands", "Eastern England", "London", "Merseyside and North Wales",
+        "Midlands", "North East England", "North Scotland", "North West England",
+        "South East England", "South Scotland", "South Wales", "South West England",
+        "Southern England", "Yorkshire"
+    ],
+    "code": ["B", "A", "C", "D", "E", "F", "P", "G", "J", "N", "K", "L", "H", "M"],
+    "lat": [52.8, 52.4, 51.5, 53.4, 52.5, 54.9, 57.5, 53.8, 51.3, 55.9, 51.6, 50.8, 51.0, 53.9],
+    "lon": [-1.3, 0.9, -0.1, -3.0, -1.9, -1.5, -4.0, -2.6, 0.9, -3.9, -3.6, -3.5, -1.3, -1.3],
+    "dnoregion": [
+        "WPD East Midlands", "UKPN East", "UKPN London", "SP Manweb", "WPD West Midlands",
+        "NPG North East", "Scottish Hydro Electric Power Distribution", "Electricity North West",
+        "UKPN South East", "SP Distribution", "WPD South Wales", "WPD South West",
+        "SSE South", "NPG Yorkshire"
+    ]
+})
+
+REGION_CODES = tuple(sorted(region_df["code"]))
+DNO_REGIONS = dict(zip(region_df["code"], region_df["dnoregion"]))
@@ -0,0 +1,247 @@
+"""Local stand-in for the Octopus and Carbon Intensity APIs.
+
+    python replay_server.py record --dir recordings --regions A B C
+    python replay_server.py serve --dir recordings --port 8090 --latency 0.2 --error-rate 0.05
+    OCTOPUS_API_URL=http://localhost:8090/v1 CARBON_API_URL=http://localhost:8090 streamlit run ev.py
+
+`serve` replays recorded responses (or, with --synthetic, generated
+Agile-like prices and carbon data), honouring period_from and page_size,
+after a random delay of about --latency seconds and failing --error-rate
+of requests with a 503. GET /_stats returns request counts.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import numpy as np
+import pandas as pd
+from regions import REGION_CODES
+
+RATES_PATH = re.compile(r"^/v1/products/([^/]+)/electricity-tariffs/E-1R-[^/]+-([A-Z])/standard-unit-rates/?$")
+FORECAST_PATH = re.compile(r"^/regional/intensity/([^/]+)/fw48h/?$")
+# Carbon Intensity dnoregions in the API's regionid order
+CARBON_REGIONS = (
+    "Scottish Hydro Electric Power Distribution", "SP Distribution", "Electricity North West",
+    "NPG North East", "NPG Yorkshire", "SP Manweb", "WPD South Wales", "WPD West Midlands",
+    "WPD East Midlands", "UKPN East", "WPD South West", "SSE South", "UKPN London", "UKPN South East",
+)
+
+
+def _iso(ts):
+    return ts.strftime("%Y-%m-%dT%H:%MZ")
+
+
+# --- Recordings ---
+class Recordings:
+    """Octopus results per (product, region) and the two Carbon Intensity payloads."""
+
+    def __init__(self, rates=None, regional=None, forecast=None):
+        self.rates = rates or {}  # (product, region) -> results, newest first like the API
+        self.regional = regional
+        self.forecast = forecast
+
+    @classmethod
+    def load(cls, root):
+        rates = {}
+        for name in os.listdir(os.path.join(root, "octopus")):
+            product, region = name[:-len(".json")].rsplit("_", 1)
+            with open(os.path.join(root, "octopus", name)) as f:
+                rates[(product, region)] = json.load(f)
+        carbon = {}
+        for name in ("regional", "fw48h"):
+            path = os.path.join(root, "carbon", f"{name}.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    carbon[name] = json.load(f)
+        return cls(rates, carbon.get("regional"), carbon.get("fw48h"))
+
+    def save(self, root):
+        os.makedirs(os.path.join(root, "octopus"), exist_ok=True)
+        os.makedirs(os.path.join(root, "carbon"), exist_ok=True)
+        for (product, region), results in self.rates.items():
+            with open(os.path.join(root, "octopus", f"{product}_{region}.json"), "w") as f:
+                json.dump(results, f)
+        for name, payload in (("regional", self.regional), ("fw48h", self.forecast)):
+            if payload is not None:
+                with open(os.path.join(root, "carbon", f"{name}.json"), "w") as f:
+                    json.dump(payload, f)
+
+    @classmethod
+    def record(cls, product_code, region_codes, days=30):
+        """Fetch the real APIs once (honours OCTOPUS_API_URL / CARBON_API_URL)."""
+        import requests
+        from carbon import CARBON_API_URL
+        from octopus import fetch_unit_rates, make_session
+
+        session = make_session()
+        since = pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=days)
+        rates = {(product_code, code): fetch_unit_rates(product_code, code, since, session=session)
+                 for code in region_codes}
+        regional = requests.get(f"{CARBON_API_URL}/regional", timeout=10).json()
+        period = regional["data"][0]["from"]
+        forecast = requests.get(f"{CARBON_API_URL}/regional/intensity/{period}/fw48h", timeout=10).json()
+        return cls(rates, regional, forecast)
+
+    @classmethod
+    def synthetic(cls, product_code, region_codes=REGION_CODES, days=30, seed=0):
+        """Agile-like prices through tomorrow and flat-ish carbon data, for fully offline runs."""
+        rng = np.random.default_rng(seed)
+        end = pd.Timestamp.now(tz="UTC").floor("D") + pd.Timedelta(days=2)
+        starts = pd.date_range(end=end - pd.Timedelta(minutes=30), periods=(days + 2) * 48, freq="30min")
+        hours = starts.hour + starts.minute / 60
+        rates = {}
+        for i, code in enumerate(region_codes):
+            pence = 15 + 12 * np.exp(-((hours - 17.5) ** 2) / 4) + i * 0.3 + rng.normal(0, 3, len(starts))
+            rates[(product_code, code)] = [
+                {"value_exc_vat": round(p / 1.05, 4), "value_inc_vat": round(p, 4),
+                 "valid_from": s.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                 "valid_to": (s + pd.Timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%SZ")}
+                for s, p in zip(starts[::-1], pence[::-1])
+            ]
+        now = pd.Timestamp.now(tz="UTC").floor("30min")
+
+        def regions(shift):
+            return [{"regionid": i + 1, "dnoregion": name, "shortname": name,
+                     "intensity": {"forecast": int(150 + 60 * np.sin(i + shift)), "index": "moderate"}}
+                    for i, name in enumerate(CARBON_REGIONS)]
+
+        regional = {"data": [{"from": _iso(now), "to": _iso(now + pd.Timedelta(minutes=30)), "regions": regions(0)}]}
+        forecast = {"data": [
+            {"from": _iso(now + k * pd.Timedelta(minutes=30)), "to": _iso(now + (k + 1) * pd.Timedelta(minutes=30)),
+             "regions": regions(k / 8)}
+            for k in range(96)
+        ]}
+        return cls(rates, regional, forecast)
+
+
+# --- Server ---
+class ReplayServer:
+    """Threaded HTTP server replaying `recordings` with injected latency and errors."""
+
+    def __init__(self, recordings, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, seed=None):
+        self.recordings = recordings
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.stats = {"octopus": 0, "carbon": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _rates_page(self, product, region, query):
+        results = self.recordings.rates.get((product, region))
+        if results is None:
+            return 404, {"detail": "Not found."}
+        if "period_from" in query:
+            since = pd.Timestamp(query["period_from"])
+            results = [r for r in results if pd.Timestamp(r["valid_to"]) > since]
+        size = int(query.get("page_size", 100))
+        page = int(query.get("page", 1))
+        chunk = results[(page - 1) * size:page * size]
+        next_url = None
+        if page * size < len(results):
+            next_url = f"{self.url}/v1/products/{product}/electricity-tariffs/E-1R-{product}-{region}/standard-unit-rates/?" + \
+                urlencode({**query, "page": page + 1})
+        return 200, {"count": len(results), "next": next_url, "results": chunk}
+
+    def _respond(self, path, query):
+        match = RATES_PATH.match(path)
+        if match:
+            self._count("octopus")
+            return self._rates_page(match.group(1), match.group(2), query)
+        if path.rstrip("/") == "/regional" and self.recordings.regional is not None:
+            self._count("carbon")
+            return 200, self.recordings.regional
+        if FORECAST_PATH.match(path) and self.recordings.forecast is not None:
+            self._count("carbon")
+            return 200, self.recordings.forecast
+        if path == "/_stats":
+            with self._lock:
+                return 200, dict(self.stats)
+        return 404, {"detail": "Not found."}
+
+    def _handler(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != "/_stats":
+                    if replay.latency:
+                        time.sleep(replay.latency * replay.rng.uniform(0.5, 1.5))
+                    if replay.rng.random() < replay.error_rate:
+                        replay._count("errors")
+                        status, payload = 503, {"detail": "Injected failure"}
+                    else:
+                        status, payload = replay._respond(url.path, dict(parse_qsl(url.query)))
+                else:
+                    status, payload = replay._respond(url.path, {})
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="replay-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="save live API responses for replay")
+    record.add_argument("--dir", default="recordings")
+    record.add_argument("--product", default="AGILE-18-02-21")
+    record.add_argument("--regions", nargs="+", default=list(REGION_CODES))
+    record.add_argument("--days", type=int, default=30)
+    serve = commands.add_parser("serve", help="replay recorded (or synthetic) responses")
+    serve.add_argument("--dir", default="recordings")
+    serve.add_argument("--synthetic", action="store_true", help="generate data instead of reading --dir")
+    serve.add_argument("--product", default="AGILE-18-02-21")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8090)
+    serve.add_argument("--latency", type=float, default=0.0, help="mean delay per request, seconds")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        Recordings.record(args.product, args.regions, args.days).save(args.dir)
+        return 0
+    recordings = Recordings.synthetic(args.product) if args.synthetic else Recordings.load(args.dir)
+    server = ReplayServer(recordings, args.host, args.port, args.latency, args.error_rate)
+    print(f"Replaying on {server.url} (OCTOPUS_API_URL={server.url}/v1 CARBON_API_URL={server.url})")
+    server.server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+from price_series import PriceSeries, SLOT_SECONDS, to_epoch
+from slot_scheduler import fill_in_order
+
+
+def cvar(costs, alpha=0.9, axis=0):
+    """Mean of the worst (1 - alpha) share of `costs` along `axis` (the scenarios)."""
+    costs = np.moveaxis(np.asarray(costs, dtype=np.float64), axis, -1)
+    tail = max(1, int(np.ceil((1 - alpha) * costs.shape[-1])))
+    return np.sort(costs, axis=-1)[..., -tail:].mean(axis=-1)
+
+
+class ScenarioForecaster:
+    """Price scenarios from a point forecaster plus bootstrapped residual paths.
+
+    Residuals of the fitted PriceForecaster on its history are resampled as
+    whole blocks starting at the same local time of day, so a scenario keeps the
+    day's shape of errors rather than independent noise per slot. In-sample
+    residuals understate the error, so they are scaled up to the
+    forecaster's held-out RMSE when that is larger.
+    """
+
+    def __init__(self, forecaster=None, n_scenarios=200, seed=0):
+        if forecaster is None:
+            from price_prediction import PriceForecaster
+
+            forecaster = PriceForecaster()
+        self.forecaster = forecaster
+        self.n_scenarios = n_scenarios
+        self.rng = np.random.default_rng(seed)
+        self.history_clock = None
+        self.timezone = None
+        self.residuals = None
+
+    def fit(self, prices):
+        """Fit the forecaster if needed and record its residuals on `prices`."""
+        prices = PriceSeries.coerce(prices)
+        if not self.forecaster.trained:
+            self.forecaster.fit(prices)
+        fitted = self.forecaster.model.predict(self.forecaster.prepare_features(prices))
+        residuals = prices.prices.astype(np.float64) - fitted
+        rmse = float(np.sqrt(np.mean(residuals ** 2)))
+        test_rmse = self.forecaster.metrics.get("test", {}).get("rmse", 0.0)
+        if rmse > 0 and test_rmse > rmse:
+            residuals *= test_rmse / rmse
+        self.timezone = prices.timezone
+        self.history_clock = self._clock(prices.starts)
+        self.residuals = residuals
+        return self
+
+    def _clock(self, starts):
+        """Local time of day in seconds, so blocks line up with the day's shape across clock changes."""
+        local = pd.to_datetime(starts, unit="s", utc=True).tz_convert(self.timezone)
+        return np.asarray(local.hour * 3600 + local.minute * 60, dtype=np.int64)
+
+    def sample(self, starts):
+        """(n_scenarios, len(starts)) forecast price paths for contiguous slot `starts`."""
+        starts = np.asarray(starts, dtype=np.int64)
+        point = self.forecaster.model.predict(
+            self.forecaster.prepare_features(PriceSeries(starts, np.zeros(len(starts)))))
+        horizon = len(starts)
+        if horizon == 0:
+            return np.empty((self.n_scenarios, 0))
+        # Blocks of history starting at the same local time of day as the first slot
+        candidates = np.flatnonzero(self.history_clock[:len(self.residuals) - horizon + 1] == self._clock(starts[:1])[0])
+        if len(candidates) == 0:
+            candidates = np.arange(max(1, len(self.residuals) - horizon + 1))
+        picks = self.rng.choice(candidates, size=self.n_scenarios)
+        blocks = self.residuals[np.minimum(picks[:, None] + np.arange(horizon), len(self.residuals) - 1)]
+        return point[None, :] + blocks
+
+    def scenarios(self, prices, start, end):
+        """(starts, matrix) for slots in [start, end): published prices where known, forecasts after.
+
+        Published slots are identical in every scenario; only the slots
+        beyond the last published one vary.
+        """
+        prices = PriceSeries.coerce(prices)
+        first, stop = to_epoch(start) // SLOT_SECONDS * SLOT_SECONDS, to_epoch(end)
+        starts = np.arange(first, stop, SLOT_SECONDS, dtype=np.int64)
+        matrix = np.empty((self.n_scenarios, len(starts)))
+        cols = np.minimum(np.searchsorted(prices.starts, starts), max(len(prices) - 1, 0))
+        known = (prices.starts[cols] == starts) if len(prices) else np.zeros(len(starts), dtype=bool)
+        matrix[:, known] = prices.prices[cols[known]]
+        if (~known).any():
+            matrix[:, ~known] = self.sample(starts[~known])
+        return starts, matrix
+
+
+class ScenarioPlanner:
+    """Charging choices scored against every price scenario at once.
+
+    `scenarios` is (n_scenarios, slots) £/kWh for contiguous slot `starts`.
+    Each candidate (a window, or a set of slots) is costed in every
+    scenario with one array operation, then ranked by expected cost or by
+    CVaR (the mean of the worst 1 - alpha share of scenarios).
+    """
+
+    def __init__(self, starts, scenarios):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.scenarios = np.asarray(scenarios, dtype=np.float64)
+
+    def _pick(self, costs, risk, alpha):
+        """costs is (candidates, scenarios)."""
+        expected = costs.mean(axis=1)
+        tail = cvar(costs, alpha, axis=1)
+        best = int(np.argmin(expected if risk == "expected" else tail))
+        return best, float(expected[best]), float(tail[best])
+
+    def window_costs(self, slots, kwh_needed):
+        """(windows, scenarios) cost of spreading `kwh_needed` evenly over each window."""
+        c = np.concatenate([np.zeros((len(self.scenarios), 1)), np.cumsum(self.scenarios, axis=1)], axis=1)
+        return ((c[:, slots:] - c[:, :-slots]) * (kwh_needed / slots)).T
+
+    def best_window(self, slots, kwh_needed, risk="expected", alpha=0.9):
+        """Cheapest contiguous window of `slots` by expected cost or CVaR; None if it doesn't fit."""
+        if slots > len(self.starts) or slots < 1:
+            return None
+        start, expected, tail = self._pick(self.window_costs(slots, kwh_needed), risk, alpha)
+        return {"start": int(self.starts[start]), "slots": slots, "expected_cost": expected, "cvar": tail}
+
+    def best_slots(self, kwh_needed, max_kwh_per_slot, risk="expected", alpha=0.9):
+        """Cheapest set of (partial) slots by expected cost or CVaR.
+
+        Candidates are the cheapest-slots plans for the mean prices and for
+        every individual scenario; all of them are costed in all scenarios
+        with one matrix product.
+        """
+        rankings = np.vstack([self.scenarios.mean(axis=0), self.scenarios])
+        order = np.argsort(rankings, axis=1, kind="stable")
+        energy = fill_in_order(order, np.full(order.shape, float(max_kwh_per_slot)), kwh_needed)
+        best, expected, tail = self._pick(energy @ self.scenarios.T, risk, alpha)
+        return {"energy_kwh": energy[best], "expected_cost": expected, "cvar": tail}
@@ -0,0 +1,153 @@
+from functools import cached_property
+import numpy as np
+import pandas as pd
+from instrumentation import timer
+from price_series import PriceSeries, SLOT_SECONDS, to_epoch
+from slot_scheduler import SLOT_HOURS
+
+AXES = ("capacity", "soc", "hours", "charger_kw")
+
+
+def soc_pairs(currents=range(0, 101, 10), targets=range(10, 101, 10)):
+    """(current, target) pairs with target above current, for the `soc` axis."""
+    return [(c, t) for c in currents for t in targets if t > c]
+
+
+class SensitivityGrid:
+    """Advisor outcomes over a whole grid of inputs, from one set of prices and one `now`.
+
+    Axes are battery capacities (kWh), (current, target) SoC pairs (%),
+    available hours and charger powers (kW). For each point, `cost` is
+    the PriceCalculator.schedule_charging cost (cheapest half-hours before
+    now + hours), `savings` that cost against charging straight away at
+    full power, `delivered` the kWh that fit, and `best_start` the start
+    (epoch seconds, -1 if nothing to charge) of the cheapest contiguous
+    full-power run that fits before the deadline.
+
+    Every output depends on the inputs only through the energy needed, so
+    the per (hours, power) price tables are built once and any energies
+    are then costed in one broadcast pass. `at` evaluates a single point
+    (any slider value, on the grid or not); `tensors` evaluates the whole
+    grid once per instance, and `heatmap` slices two axes out of it.
+    """
+
+    def __init__(self, prices, now, capacities=range(10, 151, 10), soc=None,
+                 hours=range(1, 13), charger_kws=(3.6, 7.4, 11.0, 22.0), timezone="Europe/London"):
+        prices = PriceSeries.coerce(prices, timezone)
+        self.timezone = timezone
+        self.capacities = np.asarray(capacities, dtype=np.float64)
+        self.soc = np.asarray(soc_pairs() if soc is None else soc, dtype=np.float64).reshape(-1, 2)
+        self.hours = np.asarray(hours, dtype=np.float64)
+        self.charger_kws = np.asarray(charger_kws, dtype=np.float64)
+
+        # Slots each deadline allows, as schedule_charging picks them (start at or after now, end by the deadline)
+        now = to_epoch(now)
+        first = prices.index_of(now)
+        lasts = np.searchsorted(prices.starts, now + self.hours * 3600 - SLOT_SECONDS + 1, side="left")
+        self.n_slots = np.maximum(lasts - first, 0).astype(np.int64)
+        n_max = int(self.n_slots.max()) if len(self.n_slots) else 0
+        self.starts = prices.starts[first:first + n_max]
+        future = prices.prices[first:first + n_max].astype(np.float64)
+
+        # (hours, n_max + 1) prefix sums: slots cheapest first, and in time order; slots past a deadline price at 0
+        allowed = np.arange(n_max)[None, :] < self.n_slots[:, None]
+        ranked = np.sort(np.where(allowed, future[None, :], np.inf), axis=1)
+        pad = np.zeros((len(self.hours), 1))
+        self._sorted = np.concatenate([np.where(np.isfinite(ranked), ranked, 0.0), pad], axis=1)
+        self._chrono = np.concatenate([np.where(allowed, future[None, :], 0.0), pad], axis=1)
+        self._sorted_sum = np.concatenate([np.zeros((len(self.hours), 1)), np.cumsum(self._sorted[:, :-1], axis=1)], axis=1)
+        self._chrono_sum = np.concatenate([np.zeros((len(self.hours), 1)), np.cumsum(self._chrono[:, :-1], axis=1)], axis=1)
+
+        # best[k, last]: cheapest window of k slots starting at or before `last`
+        c = np.concatenate([[0.0], np.cumsum(future)])
+        self._best = np.full((n_max + 1, max(n_max, 1)), -1, dtype=np.int64)
+        for k in range(1, n_max + 1):
+            sums = c[k:] - c[:-k]
+            # Index of the last strict improvement is the first occurrence of the running minimum
+            improves = np.concatenate([[True], sums[1:] < np.minimum.accumulate(sums)[:-1]])
+            self._best[k, :len(sums)] = np.maximum.accumulate(np.where(improves, np.arange(len(sums)), 0))
+
+    # --- Evaluation ---
+    def _fill(self, energy, cumulative, per_slot):
+        """Cost of `energy` (..., hours, power) taking slots in the given order at full power."""
+        h = np.arange(len(self.hours))[:, None]
+        cap = self.charger_kws[None, :] * SLOT_HOURS
+        full = np.minimum(np.floor(energy / cap), self.n_slots[:, None]).astype(np.int64)
+        return cap * cumulative[h, full] + (energy - full * cap) * per_slot[h, full]
+
+    def _evaluate(self, kwh_needed):
+        """Outputs for energies `kwh_needed` (any shape), adding (hours, power) axes."""
+        kwh = np.asarray(kwh_needed, dtype=np.float64)[..., None, None]
+        cap = self.charger_kws * SLOT_HOURS
+        delivered = np.minimum(kwh, self.n_slots[:, None] * cap)
+        cost = self._fill(delivered, self._sorted_sum, self._sorted)
+        savings = self._fill(delivered, self._chrono_sum, self._chrono) - cost
+        k = np.ceil(delivered / cap - 1e-9).astype(np.int64)
+        last = np.where(k > 0, self.n_slots[:, None] - k, 0)
+        index = self._best[k, last]  # row 0 is all -1: nothing to charge
+        return {"cost": cost, "savings": savings, "delivered": delivered, "best_start": np.append(self.starts, -1)[index]}
+
+    def _kwh(self, capacity, current_soc, target_soc):
+        return np.asarray(capacity) * np.clip(np.asarray(target_soc) - np.asarray(current_soc), 0, None) / 100
+
+    def at(self, capacity, current_soc, target_soc, hours, charger_kw):
+        """Outputs for one point; hours and charger_kw must be on the grid."""
+        h = int(np.flatnonzero(self.hours == hours)[0])
+        p = int(np.flatnonzero(self.charger_kws == charger_kw)[0])
+        out = self._evaluate(self._kwh(capacity, current_soc, target_soc))
+        result = {name: values[h, p].item() for name, values in out.items()}
+        result["best_start"] = (None if result["best_start"] < 0 else
+                                pd.Timestamp(result["best_start"], unit="s", tz="UTC").tz_convert(self.timezone))
+        return result
+
+    @cached_property
+    def tensors(self):
+        """{"cost", "savings", "delivered", "best_start"}, each (capacity, soc, hours, charger_kw)."""
+        return self._grid()
+
+    @timer("sensitivity.grid")
+    def _grid(self):
+        kwh = self._kwh(self.capacities[:, None], self.soc[None, :, 0], self.soc[None, :, 1])
+        unique, inverse = np.unique(kwh, return_inverse=True)
+        return {name: values[inverse.reshape(kwh.shape)] for name, values in self._evaluate(unique).items()}
+
+    @property
+    def cost(self):
+        return self.tensors["cost"]
+
+    @property
+    def savings(self):
+        return self.tensors["savings"]
+
+    @property
+    def best_start(self):
+        return self.tensors["best_start"]
+
+    # --- Slicing ---
+    def labels(self, axis):
+        if axis == "soc":
+            return [f"{c:.0f}→{t:.0f}%" for c, t in self.soc]
+        return list({"capacity": self.capacities, "hours": self.hours, "charger_kw": self.charger_kws}[axis])
+
+    def heatmap(self, value="savings", rows="capacity", columns="hours", **fixed):
+        """Frame of `value` over two axes, the others fixed at the nearest grid value.
+
+        `fixed` takes capacity, hours or charger_kw values and soc as a
+        (current, target) pair; unspecified axes default to their first entry.
+        """
+        tensor = self.tensors[value]
+        index = []
+        for axis in AXES:
+            if axis in (rows, columns):
+                index.append(slice(None))
+            elif axis not in fixed:
+                index.append(0)
+            elif axis == "soc":
+                index.append(int(np.argmin(np.abs(self.soc - np.asarray(fixed[axis], dtype=np.float64)).sum(axis=1))))
+            else:
+                grid = {"capacity": self.capacities, "hours": self.hours, "charger_kw": self.charger_kws}[axis]
+                index.append(int(np.argmin(np.abs(grid - fixed[axis]))))
+        values = tensor[tuple(index)]
+        if AXES.index(rows) > AXES.index(columns):
+            values = values.T
+        return pd.DataFrame(values, index=self.labels(rows), columns=self.labels(columns))
@@ -0,0 +1,89 @@
+import numpy as np
+from price_series import SLOT_SECONDS, to_epochs
+
+SLOT_HOURS = 0.5
+
+
+def plugged_in(starts, vehicles):
+    """(vehicles, slots) mask of the slots each car is plugged in for, whole slots only.
+
+    `vehicles` has `arrival` and `departure` columns (timestamps or epoch seconds).
+    """
+    arrival = to_epochs(vehicles['arrival'])[:, None]
+    departure = to_epochs(vehicles['departure'])[:, None]
+    starts = np.asarray(starts)[None, :]
+    return (starts >= arrival) & (starts + SLOT_SECONDS <= departure)
+
+
+def fill_in_order(order, caps, kwh_needed):
+    """Energy per slot when slots are filled at full rate in `order`, row by row.
+
+    `order` and `caps` (kWh per slot) are (rows, slots); `kwh_needed` is a
+    scalar or one value per row. cheapest_slots is this with the slots in
+    price order.
+    """
+    caps_sorted = np.take_along_axis(caps, order, axis=1)
+    before = np.cumsum(caps_sorted, axis=1) - caps_sorted
+    energy_sorted = np.clip(np.reshape(kwh_needed, (-1, 1)) - before, 0, caps_sorted)
+    energy = np.zeros_like(caps, dtype=np.float64)
+    np.put_along_axis(energy, order, energy_sorted, axis=1)
+    return energy
+
+
+def cheapest_slots(prices, kwh_needed, max_kwh_per_slot):
+    """Energy per slot that delivers `kwh_needed` as cheaply as possible.
+
+    Slots may be used in any order and the last one picked may be partial,
+    so this is a sort plus a cumulative sum. `max_kwh_per_slot` is a scalar
+    or per-slot array. Returns a float64 array aligned with `prices`.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    caps = np.broadcast_to(np.asarray(max_kwh_per_slot, dtype=np.float64), prices.shape)
+    order = np.argsort(prices, kind="stable")
+    filled_before = np.concatenate([[0.0], np.cumsum(caps[order])[:-1]])
+    energy = np.zeros_like(prices)
+    energy[order] = np.clip(kwh_needed - filled_before, 0, caps[order])
+    return energy
+
+
+def tapered_slots(prices, kwh_needed, battery_capacity, current_soc, taper, energy_step=0.1):
+    """Cheapest schedule when the charge rate falls as the battery fills.
+
+    `taper` is ((soc %, ...), (kW, ...)) breakpoints for the maximum rate at
+    each state of charge. A DP over delivered energy (in `energy_step` kWh
+    steps) walks the slots in time order; in each slot the car either rests
+    or charges as hard as the taper allows (topping up to the target in the
+    final step). Returns energy per slot, like cheapest_slots.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    soc_points, kw_points = (np.asarray(v, dtype=np.float64) for v in taper)
+    n_states = int(round(kwh_needed / energy_step)) + 1
+    delivered = np.arange(n_states) * energy_step
+    soc = current_soc + delivered / battery_capacity * 100
+    # Steps the charger can add from each state in one slot, never past the target
+    steps = np.floor(np.interp(soc, soc_points, kw_points) * SLOT_HOURS / energy_step + 1e-9).astype(int)
+    target = np.minimum(np.arange(n_states) + steps, n_states - 1)
+
+    cost = np.full(n_states, np.inf)
+    cost[0] = 0.0
+    history = []
+    for price in prices:
+        history.append(cost)
+        charged = cost + price * (target - np.arange(n_states)) * energy_step
+        cost = cost.copy()
+        np.minimum.at(cost, target, charged)
+
+    # Walk back from the fullest reachable state
+    state = int(np.flatnonzero(np.isfinite(cost))[-1])
+    energy = np.zeros(len(prices))
+    for t in range(len(prices) - 1, -1, -1):
+        before = history[t]
+        if before[state] > cost[state]:
+            # Charged in slot t: find the cheapest state it came from
+            sources = np.flatnonzero((target == state) & (np.arange(n_states) != state))
+            charged = before[sources] + prices[t] * (state - sources) * energy_step
+            source = int(sources[np.argmin(charged)])
+            energy[t] = (state - source) * energy_step
+            state = source
+        cost = before
+    return energy
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from price_series import SLOT_SECONDS
+from price_store import PriceStore
+
+
+def _regional(value, regions):
+    """(regions,) array from a scalar or a {region code: value} dict."""
+    if isinstance(value, dict):
+        return np.array([value[code] for code in regions], dtype=np.float64)
+    return np.full(len(regions), value, dtype=np.float64)
+
+
+def _minutes(clock):
+    hours, minutes = clock.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class FlatTariff:
+    """One unit rate all day (a fixed or price-capped tariff). Rates in £/kWh, standing charge in £/day."""
+
+    def __init__(self, name, rate, standing_charge=0.0):
+        self.name = name
+        self.rate = rate
+        self.standing_charge = standing_charge
+
+    def rates(self, starts, local_minutes, regions):
+        return np.broadcast_to(_regional(self.rate, regions)[:, None], (len(regions), len(starts)))
+
+
+class TimeOfUseTariff(FlatTariff):
+    """A cheap rate inside a local-time window (e.g. Go's 00:30–05:30) and a day rate otherwise."""
+
+    def __init__(self, name, day_rate, night_rate, night=("00:30", "05:30"), standing_charge=0.0):
+        super().__init__(name, day_rate, standing_charge)
+        self.night_rate = night_rate
+        self.night = night
+
+    def rates(self, starts, local_minutes, regions):
+        start, end = (_minutes(t) for t in self.night)
+        if start <= end:
+            night = (local_minutes >= start) & (local_minutes < end)
+        else:
+            night = (local_minutes >= start) | (local_minutes < end)
+        return np.where(night[None, :],
+                        _regional(self.night_rate, regions)[:, None],
+                        _regional(self.rate, regions)[:, None])
+
+
+class AgileTariff:
+    """Half-hourly prices from the PriceStore; NaN where a slot isn't stored."""
+
+    def __init__(self, name, product_code, store=None, standing_charge=0.0):
+        self.name = name
+        self.product_code = product_code
+        self.store = store or PriceStore()
+        self.standing_charge = standing_charge
+
+    def rates(self, starts, local_minutes, regions):
+        out = np.full((len(regions), len(starts)), np.nan)
+        for r, code in enumerate(regions):
+            prices = self.store.load(self.product_code, code)
+            if prices.empty:
+                continue
+            cols = np.minimum(np.searchsorted(prices.starts, starts), len(prices) - 1)
+            found = prices.starts[cols] == starts
+            out[r, found] = prices.prices[cols[found]]
+        return out
+
+
+# Illustrative rates; edit to match the current price cap and product sheets
+DEFAULT_TARIFFS = (
+    FlatTariff("Flexible (price cap)", 0.245, standing_charge=0.60),
+    FlatTariff("Fixed 12M", 0.225, standing_charge=0.55),
+    TimeOfUseTariff("Go-style", day_rate=0.27, night_rate=0.085, night=("00:30", "05:30"), standing_charge=0.60),
+    AgileTariff("Agile", "AGILE-18-02-21", standing_charge=0.60),
+)
+
+
+def demand_from_sessions(sessions, energy):
+    """(starts, kwh) for a backtest: Sessions plus a policy's (days, slots) energy plan."""
+    valid = ~np.isnan(sessions.prices) & (energy > 0)
+    starts, kwh = sessions.starts[valid], energy[valid]
+    order = np.argsort(starts, kind="stable")
+    return starts[order], kwh[order]
+
+
+class TariffComparison:
+    """Costs of one charging pattern under every tariff in every region at once.
+
+    The (tariffs, regions, slots) rate tensor is built once for the slot
+    grid `starts` (int64 epoch seconds); `costs` is then a single
+    einsum of that tensor against the demand, so comparing another demand
+    on the same grid takes milliseconds. Standing charges are added per
+    day the grid spans.
+    """
+
+    def __init__(self, starts, regions, tariffs=DEFAULT_TARIFFS, timezone="Europe/London"):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.regions = list(regions)
+        self.tariffs = list(tariffs)
+        local = pd.to_datetime(self.starts, unit="s", utc=True).tz_convert(timezone)
+        local_minutes = np.asarray(local.hour * 60 + local.minute)
+        self.rates = np.stack([
+            np.asarray(t.rates(self.starts, local_minutes, self.regions), dtype=np.float64) for t in self.tariffs
+        ])
+        self._missing = np.isnan(self.rates)
+        self._filled = np.nan_to_num(self.rates)
+        span = (self.starts[-1] + SLOT_SECONDS - self.starts[0]) if len(self.starts) else 0
+        self.days = int(np.ceil(span / 86400))
+        self._standing = np.array([t.standing_charge for t in self.tariffs]) * self.days
+
+    def costs(self, kwh, include_standing=True):
+        """Total £ per tariff (rows) and region (columns) for `kwh` per slot.
+
+        `kwh` is (slots,) for one pattern everywhere or (regions, slots).
+        A tariff/region is NaN if it lacks a price for any slot with demand.
+        """
+        kwh = np.broadcast_to(np.asarray(kwh, dtype=np.float64), self.rates.shape[1:])
+        total = np.einsum("trs,rs->tr", self._filled, kwh)
+        missing = np.einsum("trs,rs->tr", self._missing, kwh > 0) > 0
+        if include_standing:
+            total = total + self._standing[:, None]
+        total[missing] = np.nan
+        return pd.DataFrame(total, index=[t.name for t in self.tariffs], columns=self.regions)
+
+    def cheapest(self, kwh, include_standing=True):
+        """Cheapest tariff per region: a frame with tariff, cost and saving vs the runner-up."""
+        costs = self.costs(kwh, include_standing)
+        rows = []
+        for region in self.regions:
+            ranked = costs[region].dropna().sort_values()
+            if ranked.empty:
+                rows.append({"region": region, "tariff": None, "cost": None, "saving_vs_next": None})
+                continue
+            rows.append({
+                "region": region,
+                "tariff": ranked.index[0],
+                "cost": ranked.iloc[0],
+                "saving_vs_next": ranked.iloc[1] - ranked.iloc[0] if len(ranked) > 1 else None,
+            })
+        return pd.DataFrame(rows)
@@ -1 +0,0 @@
-from xgboot import XGBoost
@@ -0,0 +1,29 @@
+import os
+import sys
+
+# Modules live flat at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+from price_series import PriceSeries
+
+
+@pytest.fixture(scope="session")
+def make_series():
+    """Factory for half-hourly PriceSeries starting at `start` (UTC unless it carries a zone).
+
+    `values` is the prices, or a count of prices drawn uniformly from
+    [low, high) with `seed`.
+    """
+    def make(values, start="2024-01-01", seed=0, low=0.05, high=0.4):
+        if np.ndim(values) == 0:
+            values = np.random.default_rng(seed).uniform(low, high, int(values))
+        start = pd.Timestamp(start)
+        start = start.tz_localize("UTC") if start.tzinfo is None else start.tz_convert("UTC")
+        starts = pd.date_range(start, periods=len(values), freq="30min")
+        epochs = (starts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+        return PriceSeries(epochs, np.asarray(values, dtype=np.float32))
+
+    return make
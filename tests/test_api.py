@@ -0,0 +1,79 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+import pandas as pd
+import pytest
+from api import SchedulingAPI, call, make_server
+from price_store import PriceStore
+from regions import REGION_CODES
+
+
+class FakeService:
+    """Serves one fixed series for every region, like a loaded DataService."""
+
+    def __init__(self, prices):
+        self._prices = prices
+        self.requested = []
+
+    def prices(self, region):
+        self.requested.append(region)
+        return self._prices
+
+    def prices_for(self, regions):
+        return {region: self.prices(region) for region in regions}
+
+    def snapshot(self):
+        return None
+
+
+@pytest.fixture
+def api(make_series):
+    prices = make_series(np.linspace(0.1, 0.3, 96), pd.Timestamp.now(tz="UTC").floor("D"))
+    return SchedulingAPI(service=FakeService(prices))
+
+
+@pytest.mark.parametrize("region", ["Y", "../../etc", "", "a"])
+def test_unknown_region_rejected_before_any_fetch(api, region):
+    with pytest.raises(ValueError):
+        call(api, "current", {"region": region})
+    assert api.service.requested == []
+
+
+def test_unknown_region_is_a_400(api):
+    server = make_server(api, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/current?region=..%2F..%2Fetc"
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(url, timeout=5)
+        assert e.value.code == 400
+        assert "unknown region" in json.loads(e.value.read())["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_naive_deadline_is_local_time(api):
+    day = pd.Timestamp.now(tz="Europe/London").normalize() + pd.Timedelta(days=1)
+    naive = (day + pd.Timedelta(hours=1)).tz_localize(None).isoformat()
+    aware = (day + pd.Timedelta(hours=1)).isoformat()
+    assert api.schedule("C", 60, 20, 80, deadline=naive) == api.schedule("C", 60, 20, 80, deadline=aware)
+
+
+def test_store_rejects_path_like_codes(tmp_path):
+    store = PriceStore(str(tmp_path))
+    for code in ("..", "../x", "a/b", ""):
+        with pytest.raises(ValueError):
+            store.load("AGILE-18-02-21", code)
+
+
+def test_forecast_all_uses_one_global_model(api, tmp_path):
+    from model_registry import ForecastRegistry
+
+    api._registry = ForecastRegistry(root=str(tmp_path))
+    result = call(api, "forecast-all", {})
+    assert set(result["regions"]) == set(REGION_CODES)
+    assert all(len(rows) == 48 for rows in result["regions"].values())
+    assert result["metrics"]["n"] > 0
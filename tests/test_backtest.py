@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from backtest import CheapestSlots, ChargeOnPlugIn, Sessions, evaluate, run_backtest
+from price_series import PriceSeries
+from price_store import PriceStore
+
+
+def test_empty_carbon_means_no_carbon_metrics(make_series):
+    sessions = Sessions(make_series(10 * 48), "2024-01-02", "2024-01-05", carbon=PriceSeries([], []))
+    assert sessions.carbon is None
+    assert "carbon_g" not in evaluate(sessions, CheapestSlots())
+
+
+def test_carbon_is_summed_per_day(make_series):
+    prices = make_series(10 * 48)
+    carbon = PriceSeries(prices.starts, np.full(len(prices), 200.0))
+    result = evaluate(Sessions(prices, "2024-01-02", "2024-01-05", kwh_needed=30, carbon=carbon), CheapestSlots())
+    np.testing.assert_allclose(result["carbon_g"], 30 * 200.0)
+
+
+def test_missing_carbon_is_not_counted_as_zero(make_series):
+    prices = make_series(10 * 48)
+    values = np.full(len(prices), 200.0)
+    values[prices.index_of(pd.Timestamp("2024-01-03 18:00", tz="UTC"))] = np.nan
+    carbon = PriceSeries(prices.starts, values)
+    result = evaluate(Sessions(prices, "2024-01-02", "2024-01-05", kwh_needed=30, carbon=carbon), ChargeOnPlugIn())
+    gap = result["day"] == pd.Timestamp("2024-01-03")
+    assert result.loc[gap, "carbon_g"].isna().all()
+    np.testing.assert_allclose(result.loc[gap, "carbon_coverage"], 1 - 3.7 / 30)
+    np.testing.assert_allclose(result.loc[~gap, "carbon_g"], 30 * 200.0)
+    np.testing.assert_allclose(result.loc[~gap, "carbon_coverage"], 1.0)
+
+
+def test_run_backtest_passes_carbon_per_region(tmp_path, make_series):
+    store = PriceStore(str(tmp_path))
+    for code in ("A", "B"):
+        store.append("AGILE-TEST", code, make_series(10 * 48, seed=ord(code)))
+    carbon = {"A": PriceSeries(store.load("AGILE-TEST", "A").starts, np.full(480, 100.0))}
+    daily, summary = run_backtest("AGILE-TEST", ["A", "B"], "2024-01-02", "2024-01-05",
+                                  policies=(ChargeOnPlugIn(), CheapestSlots()), root=str(tmp_path),
+                                  max_workers=2, carbon=carbon)
+    assert daily.loc[daily["region"] == "A", "carbon_g"].notna().all()
+    assert daily.loc[daily["region"] == "B", "carbon_g"].isna().all()
+    assert ("carbon_g", "mean") in summary
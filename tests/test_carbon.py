@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+from carbon import CarbonIntensity
+
+NOW = pd.Timestamp("2024-01-01 12:00", tz="UTC")
+
+
+class FakeHTTP:
+    """Serves fixed carbon payloads; `fail` names the URLs that error."""
+
+    def __init__(self, regional, forecast):
+        self.regional, self.forecast = regional, forecast
+        self.fail = ()
+
+    def get(self, url, timeout=None):
+        response = requests.Response()
+        if any(part in url for part in self.fail):
+            response.status_code = 503
+            response._content = b"{}"
+        else:
+            response.status_code = 200
+            response._content = requests.compat.json.dumps(self.forecast if "fw48h" in url else self.regional).encode()
+        return response
+
+
+def period(k, shift=0):
+    """One half-hour of the regional API's payload, k slots after NOW, for three regions."""
+    start = NOW + pd.Timedelta(minutes=30 * k)
+    return {
+        "from": start.strftime("%Y-%m-%dT%H:%MZ"),
+        "to": (start + pd.Timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%MZ"),
+        "regions": [{"regionid": i, "dnoregion": f"DNO {i}", "shortname": f"Region {i}",
+                     "intensity": {"forecast": 100 + 10 * i + shift, "index": "moderate"}} for i in (1, 2, 3)],
+    }
+
+
+@pytest.fixture
+def http():
+    return FakeHTTP({"data": [period(0)]}, {"data": [period(k, shift=k) for k in range(8)]})
+
+
+def test_failed_forecast_keeps_the_last_good_data(http):
+    carbon = CarbonIntensity(ttl=None, base_url="http://carbon", session=http)
+    carbon.fetch_data()
+    state = (carbon.cached_data, carbon.first_start, carbon.forecast.copy(), dict(carbon._current))
+
+    http.regional = {"data": [{**http.regional["data"][0], "from": "2030-01-01T00:00Z"}]}
+    http.fail = ("fw48h",)
+    carbon.fetch_data()
+    assert isinstance(carbon.last_error, requests.HTTPError)
+    assert carbon.cached_data is state[0]
+    assert carbon.first_start == state[1]
+    np.testing.assert_array_equal(carbon.forecast, state[2])
+    assert carbon._current == state[3]
+
+
+def test_failure_before_any_data_leaves_nothing_cached(http):
+    http.fail = ("regional",)
+    carbon = CarbonIntensity(ttl=None, base_url="http://carbon", session=http)
+    carbon.fetch_data()
+    assert carbon.cached_data is None and carbon.first_start is None
+    assert carbon.forecast_at(1, 0) is None
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+import pytest
+import pytz
+import dashboard
+from price_calculator import PriceCalculator
+
+TZ = pytz.timezone("Europe/London")
+NOW = TZ.localize(datetime(2024, 1, 2, 3, 10))
+
+
+@pytest.fixture
+def prices(make_series):
+    return make_series(48 * 2 + 30, seed=5)
+
+
+def test_advise_matches_the_calculator(prices):
+    views = dashboard.price_views(prices, NOW.date())
+    advice = dashboard.advise(prices, views, NOW, 60, 20, 80, 5)
+    assert advice["current"]["valid_from_bst"].iloc[0] == TZ.localize(datetime(2024, 1, 2, 3, 0))
+    assert advice["charge_slots"] == 9  # 03:30 up to 08:00
+    assert advice["energy_to_charge"] == pytest.approx(9 * 3.7)
+    assert advice["user_window"]["energy_kwh"].sum() == pytest.approx(advice["energy_to_charge"])
+
+    calculator = PriceCalculator(prices, 60, 20, 80, 5)
+    plan = calculator.schedule_charging(7.4, NOW + timedelta(hours=5), plug_in=NOW)
+    assert advice["plan"]["cost"] == pytest.approx(plan["cost"])
+    assert len(advice["now_window"]) == 10 and len(advice["today_window"]) == 8
+    assert advice["green"] is None
+
+
+def test_plan_tomorrow_without_published_prices(prices):
+    views = dashboard.price_views(prices, datetime.now(TZ).date())
+    result, line = dashboard.plan_tomorrow(views, 4)
+    assert result[-1] == 0 and line is None
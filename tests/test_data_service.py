@@ -0,0 +1,131 @@
+import threading
+import time
+import numpy as np
+import pytest
+from data_service import DataService, SingleFlight
+from price_series import PriceSeries
+
+
+class FakeStore:
+    """Per-region series in memory; update_regions can be held open with `gate`."""
+
+    def __init__(self, series):
+        self.series = dict(series)
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def update_regions(self, product_code, region_codes, session=None):
+        self.calls.append(tuple(region_codes))
+        self.gate.wait(5)
+        return {code: 0 for code in region_codes}, {}
+
+    def load(self, product_code, region_code):
+        return self.series.get(region_code, PriceSeries([], []))
+
+
+@pytest.fixture
+def store(make_series):
+    return FakeStore({code: make_series(np.full(10, 0.2)) for code in "ABC"})
+
+
+@pytest.fixture
+def service(store):
+    return DataService("AGILE-TEST", ["A", "B", "C"], store=store, session=object())
+
+
+def run_all(*targets):
+    threads = [threading.Thread(target=t) for t in targets]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def test_single_flight_runs_concurrent_calls_once():
+    flight, gate, calls = SingleFlight(), threading.Event(), []
+
+    def slow():
+        calls.append(1)
+        gate.wait(5)
+        return "done"
+
+    results = []
+    threads = run_all(*[lambda: results.append(flight.do("k", slow))] * 5)
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert calls == [1] and results == ["done"] * 5
+
+
+def test_single_flight_shares_errors_and_forgets_finished_keys():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("k", lambda: 1) == 1
+
+
+def test_batch_and_single_keys_collapse():
+    flight, gate, ran = SingleFlight(), threading.Event(), []
+
+    def batch(keys):
+        ran.append(tuple(keys))
+        gate.wait(5)
+
+    threads = run_all(lambda: flight.do_many(["A", "B"], batch))
+    time.sleep(0.1)
+    threads += run_all(lambda: flight.do("A", lambda: ran.append("single")),
+                       lambda: flight.do_many(["B", "C"], batch))
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert sorted(ran) == [("A", "B"), ("C",)]
+
+
+def test_reader_joins_an_in_flight_refresh(service, store):
+    store.gate.clear()
+    threads = run_all(service.refresh)
+    time.sleep(0.1)
+    threads += run_all(lambda: service.prices("A"))
+    time.sleep(0.1)
+    store.gate.set()
+    for t in threads:
+        t.join()
+    assert store.calls == [("A", "B", "C")]
+
+
+def test_missing_regions_load_in_one_batch(service, store):
+    service.prices("A")
+    prices = service.prices_for(["A", "B", "C"])
+    assert store.calls == [("A",), ("B", "C")]
+    assert sorted(prices) == ["A", "B", "C"]
+
+
+def test_version_moves_only_when_prices_change(service, store, make_series):
+    service.refresh()
+    first = service.snapshot()
+    assert first.version == 1
+
+    service.refresh()
+    again = service.snapshot()
+    assert again.version == 1
+    assert all(again.prices[code] is first.prices[code] for code in "ABC")
+
+    store.series["B"] = make_series(np.full(11, 0.2))
+    service.refresh()
+    changed = service.snapshot()
+    assert changed.version == 2
+    assert changed.prices["A"] is first.prices["A"] and len(changed.prices["B"]) == 11
+
+
+def test_background_errors_are_logged(service, store, caplog):
+    def broken(product_code, region_code):
+        raise OSError("disk gone")
+
+    store.load = broken
+    service.interval = 60
+    service.start()
+    time.sleep(0.2)
+    service.stop()
+    assert "Data refresh failed" in caplog.text
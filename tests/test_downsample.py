@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from downsample import PriceViews, lttb
+
+
+@pytest.fixture
+def prices(make_series):
+    # Five weeks across the October clock change
+    return make_series(48 * 35 + 2, pd.Timestamp("2024-10-07", tz="Europe/London"), seed=4, low=-0.05, high=0.5)
+
+
+@pytest.mark.parametrize("n_out", [3, 10, 100, 999])
+def test_lttb_keeps_endpoints_within_budget(n_out):
+    rng = np.random.default_rng(n_out)
+    x = np.arange(1000)
+    y = rng.normal(size=1000)
+    y[500] = 50  # a spike must survive
+    keep = lttb(x, y, n_out)
+    assert len(keep) == n_out
+    assert keep[0] == 0 and keep[-1] == 999
+    assert (np.diff(keep) > 0).all()
+    if n_out >= 10:
+        assert 500 in keep
+
+
+def test_lttb_returns_everything_when_it_fits():
+    assert lttb(np.arange(5), np.zeros(5), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("max_points, rule, resolution", [(1000, "h", "1h"), (100, "D", "1D"), (10, "W-MON", "1W")])
+def test_aggregates_match_pandas_resample(prices, max_points, rule, resolution):
+    frame = PriceViews(prices, max_points=max_points).view()
+    assert frame.attrs["resolution"] == resolution
+    series = pd.Series(prices.prices.astype(np.float64), index=prices.local_starts())
+    expected = series.resample(rule, label="left", closed="left").agg(["min", "mean", "max"]).dropna()
+    np.testing.assert_allclose(frame["price_min"], expected["min"])
+    np.testing.assert_allclose(frame["price_gbp"], expected["mean"])
+    np.testing.assert_allclose(frame["price_max"], expected["max"])
+
+
+def test_small_ranges_are_raw_slots(prices):
+    views = PriceViews(prices, max_points=100)
+    frame = views.view(prices.local_time(10), prices.local_time(60))
+    assert frame.attrs["resolution"] == "30min"
+    assert len(frame) == 50
+    assert len(views.line()) == 100
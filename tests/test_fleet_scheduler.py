@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fleet_scheduler import FleetScheduler
+
+START = pd.Timestamp("2024-01-01", tz="UTC")
+
+
+def fleet(n, max_kw=7.4, needed_soc=60, hours=4):
+    return pd.DataFrame({
+        "vehicle_id": range(n), "battery_kwh": 60.0, "current_soc": 20.0, "target_soc": 20.0 + needed_soc,
+        "max_kw": max_kw, "arrival": START, "departure": START + pd.Timedelta(hours=hours),
+    })
+
+
+def test_missing_carbon_is_not_treated_as_clean(make_series):
+    # Equal prices; slot 0 has no carbon figure and must not be picked first
+    scheduler = FleetScheduler(make_series([0.2] * 4), 100, carbon=[np.nan, 300, 100, 200], carbon_weight=0.001)
+    power, _ = scheduler.schedule(fleet(1, needed_soc=6.1))
+    assert np.flatnonzero(power[0]).tolist() == [2]
+
+
+def test_site_limit_holds_exactly(make_series):
+    rng = np.random.default_rng(0)
+    scheduler = FleetScheduler(make_series(rng.uniform(0.05, 0.4, 8)), 15000)
+    vehicles = fleet(3000, max_kw=rng.uniform(3.0, 22.0, 3000), hours=4)
+    power, summary = scheduler.schedule(vehicles)
+    assert power.dtype == np.float64
+    assert scheduler.site_load_kw(power).max() <= 15000 + 1e-6
+    assert np.allclose(summary["delivered_kwh"], power.sum(axis=1) * 0.5)
+
+
+def lp_schedule(prices, vehicles, site_limit_kw, delivered):
+    """Cheapest (vehicles, slots) kWh delivering exactly `delivered` per car under the same limits (scipy LP)."""
+    from scipy.optimize import linprog
+    from slot_scheduler import plugged_in
+
+    n, m = len(vehicles), len(prices)
+    caps = plugged_in(prices.starts, vehicles) * vehicles["max_kw"].to_numpy()[:, None] * 0.5
+    site = np.kron(np.ones((1, n)), np.eye(m))
+    per_car = np.kron(np.eye(n), np.ones((1, m)))
+    result = linprog(np.tile(prices.prices.astype(np.float64), n), A_ub=site, b_ub=np.full(m, site_limit_kw * 0.5),
+                     A_eq=per_car, b_eq=delivered, bounds=np.column_stack([np.zeros(n * m), caps.ravel()]))
+    assert result.success
+    return result.fun, -linprog(-np.ones(n * m), A_ub=site, b_ub=np.full(m, site_limit_kw * 0.5),
+                                bounds=np.column_stack([np.zeros(n * m), caps.ravel()])).fun
+
+
+def small_fleet(rng, n=6, slots=12):
+    arrival = rng.integers(0, slots // 2, n)
+    return pd.DataFrame({
+        "vehicle_id": range(n), "battery_kwh": 60.0, "current_soc": 20.0,
+        "target_soc": rng.uniform(30, 60, n).round(), "max_kw": rng.choice([3.6, 7.4, 11.0], n),
+        "arrival": START + pd.to_timedelta(arrival * 30, unit="min"),
+        "departure": START + pd.to_timedelta((arrival + rng.integers(3, slots // 2, n)) * 30, unit="min"),
+    })
+
+
+def test_without_a_binding_limit_the_greedy_plan_is_optimal(make_series):
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        prices, vehicles = make_series(rng.uniform(0.05, 0.4, 12)), small_fleet(rng)
+        power, summary = FleetScheduler(prices, 1000).schedule(vehicles)
+        optimum, _ = lp_schedule(prices, vehicles, 1000, summary["delivered_kwh"])
+        assert summary["cost"].sum() == pytest.approx(optimum)
+
+
+def test_with_a_binding_limit_the_lp_is_a_lower_bound(make_series):
+    # A heuristic: never cheaper than the LP for the same energy, and the LP can deliver at least as much
+    rng = np.random.default_rng(2)
+    gaps = []
+    for _ in range(10):
+        prices, vehicles = make_series(rng.uniform(0.05, 0.4, 12)), small_fleet(rng)
+        scheduler = FleetScheduler(prices, 12)
+        power, summary = scheduler.schedule(vehicles)
+        assert scheduler.site_load_kw(power).max() <= 12 + 1e-9
+        optimum, most = lp_schedule(prices, vehicles, 12, summary["delivered_kwh"])
+        assert summary["cost"].sum() >= optimum - 1e-9
+        assert summary["delivered_kwh"].sum() <= most + 1e-9
+        gaps.append(most - summary["delivered_kwh"].sum())
+    # ...and on some of these instances it really does leave energy undelivered
+    assert max(gaps) > 1
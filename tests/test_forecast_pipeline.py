@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from forecast_pipeline import GlobalForecaster, global_forecaster, stack_regions
+from model_registry import ForecastRegistry
+from price_series import PriceSeries
+
+
+@pytest.fixture(scope="module")
+def series(make_series):
+    """`days` of prices from midnight with an evening peak, `offset` above the base."""
+    def make(days, offset=0.0, seed=0):
+        hours = np.arange(days * 48) % 48 / 2
+        noise = np.random.default_rng(seed).normal(0, 0.01, len(hours))
+        return make_series(0.15 + offset + 0.1 * np.exp(-((hours - 17.5) ** 2) / 4) + noise)
+    return make
+
+
+@pytest.fixture(scope="module")
+def regions(series):
+    return {code: series(20, offset=0.02 * i, seed=i) for i, code in enumerate("ABC")}
+
+
+@pytest.fixture(scope="module")
+def forecaster(regions):
+    model = GlobalForecaster(n_estimators=50)
+    model.fit(regions)
+    return model
+
+
+def test_empty_input():
+    regions, starts, matrix = stack_regions({})
+    assert regions == [] and len(starts) == 0 and matrix.shape == (0, 0)
+    assert stack_regions({"A": PriceSeries([], [])})[0] == []
+    with pytest.raises(ValueError):
+        GlobalForecaster(n_estimators=5).fit({})
+
+
+def test_fit_records_held_out_error(forecaster):
+    test = forecaster.metrics["test"]
+    assert test["n"] == 3 * (20 * 48 - int(20 * 48 * 0.8))
+    assert test["mae"] < 0.05
+    assert sorted(forecaster.metrics["test_by_region"]) == ["A", "B", "C"]
+
+
+def test_predict_covers_unseen_regions(forecaster, regions, series):
+    forecast = forecaster.predict({**regions, "Z": series(20, offset=0.01, seed=9)})
+    assert list(forecast.columns) == ["A", "B", "C", "Z"]
+    assert len(forecast) == 48 and np.isfinite(forecast.to_numpy()).all()
+    assert forecaster.predict({}).empty
+
+
+def test_registry_reuses_until_prices_change(tmp_path, regions, series):
+    registry = ForecastRegistry(root=str(tmp_path))
+    first = global_forecaster(registry, "global", regions)
+    assert global_forecaster(registry, "global", dict(regions)) is first
+    assert global_forecaster(ForecastRegistry(root=str(tmp_path)), "global", regions).regions == first.regions
+    changed = {**regions, "C": series(21, offset=0.04, seed=2)}
+    assert global_forecaster(registry, "global", changed) is not first
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from incremental_planner import IncrementalPlanner
+from price_series import PriceSeries, SLOT_SECONDS
+
+
+@pytest.fixture
+def prices(make_series):
+    return make_series(48 * 3, seed=3)
+
+
+def add_fleet(planner, prices, n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    base = int(prices.starts[0])
+    for vid in range(n):
+        arrival = base + int(rng.integers(0, len(prices) - 40)) * SLOT_SECONDS + int(rng.integers(0, SLOT_SECONDS))
+        departure = arrival + int(rng.integers(2, 60)) * SLOT_SECONDS
+        planner.set_vehicle(vid, 60, int(rng.integers(0, 70)), 80, 7.4, arrival, departure)
+
+
+def test_appending_matches_planning_from_scratch(prices):
+    cut = len(prices) - 48
+    incremental = IncrementalPlanner(prices.slice(0, cut))
+    add_fleet(incremental, prices)
+    # Overlapping and split deliveries of the new day
+    incremental.append(prices.slice(cut - 10, cut + 20))
+    incremental.append(prices.slice(cut + 20, len(prices)))
+
+    full = IncrementalPlanner(prices)
+    add_fleet(full, prices)
+    pd.testing.assert_frame_equal(incremental.plans(), full.plans())
+
+
+def test_events_report_only_changed_windows(prices):
+    cut = len(prices) - 48
+    planner = IncrementalPlanner(prices.slice(0, cut))
+    add_fleet(planner, prices)
+    before = planner.plans().set_index("vehicle_id")
+    events = planner.append(prices.slice(cut, len(prices)))
+    after = planner.plans().set_index("vehicle_id")
+    same = (before["start"] == after["start"]) | (before["start"].isna() & after["start"].isna())
+    changed = before.index[~same]
+    assert sorted(e.vehicle_id for e in events) == sorted(changed)
+
+
+def test_gap_in_appended_prices_is_rejected(prices):
+    planner = IncrementalPlanner(prices)
+    with pytest.raises(ValueError):
+        planner.append(PriceSeries([int(prices.starts[-1]) + 4 * SLOT_SECONDS], [0.1]))
+
+
+def test_vehicle_at_target_has_nothing_to_charge(prices):
+    planner = IncrementalPlanner(prices)
+    arrival, departure = int(prices.starts[0]), int(prices.starts[4])
+    [event] = planner.set_vehicle("full", 60, 80, 80, 7.4, arrival, departure)
+    assert event.kind == "charged"
+    assert "nothing to charge" in str(event)
+    assert planner.plan("full") is None
+    assert planner.update_vehicle("full", current_soc=85) == []
+
+    [event] = planner.update_vehicle("full", current_soc=70)
+    assert event.kind == "new"
+    [event] = planner.update_vehicle("full", current_soc=0, target_soc=100)
+    assert event.kind == "unschedulable"
+    [event] = planner.update_vehicle("full", current_soc=100)
+    assert event.kind == "charged"
@@ -0,0 +1,100 @@
+import json
+import re
+import threading
+import urllib.error
+import urllib.request
+import pytest
+import instrumentation
+from instrumentation import Metrics, start_metrics_server
+
+
+def test_timers_and_counters():
+    metrics = Metrics()
+    with metrics.timer("stage"):
+        pass
+    metrics.observe("stage", 2.0)
+    metrics.incr("hits")
+    metrics.incr("hits", 4)
+    snap = metrics.snapshot()
+    stage = snap["timers"]["stage"]
+    assert stage["count"] == 2 and stage["max_s"] == 2.0
+    assert stage["total_s"] == pytest.approx(2.0, abs=0.01)
+    assert stage["mean_s"] == pytest.approx(stage["total_s"] / 2)
+    assert snap["counters"] == {"hits": 5}
+    assert json.loads(metrics.to_json()) == snap
+    metrics.reset()
+    assert metrics.snapshot() == {"timers": {}, "counters": {}}
+
+
+def test_decorator_keeps_the_function_and_times_every_call():
+    metrics = Metrics()
+
+    @metrics.timer("work")
+    def work(n):
+        """Doubles n, one call per step."""
+        return work(n - 1) + 2 if n else 0
+
+    assert work.__name__ == "work" and work.__doc__ == "Doubles n, one call per step."
+    threads = [threading.Thread(target=work, args=(3,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert work(3) == 6
+    assert metrics.snapshot()["timers"]["work"]["count"] == 5 * 4
+
+
+def test_errors_are_timed_and_raised():
+    metrics = Metrics()
+    with pytest.raises(KeyError):
+        with metrics.timer("fails"):
+            raise KeyError
+    assert metrics.snapshot()["timers"]["fails"]["count"] == 1
+
+
+def test_prometheus_exposition_format():
+    metrics = Metrics()
+    metrics.observe("api.forecast-all", 0.25)
+    metrics.observe("api.forecast-all", 0.5)
+    metrics.incr("cache.hit", 3)
+    text = metrics.prometheus_text()
+    assert text.endswith("\n")
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("summary", "gauge", "counter")
+        else:
+            name, value = line.split(" ")
+            assert re.fullmatch(r"[a-zA-Z_:][a-zA-Z0-9_:]*", name)
+            samples[name] = float(value)
+    assert samples == {
+        "ev_api_forecast_all_seconds_count": 2,
+        "ev_api_forecast_all_seconds_sum": 0.75,
+        "ev_api_forecast_all_seconds_max": 0.5,
+        "ev_cache_hit_total": 3,
+    }
+    assert "# TYPE ev_cache_hit_total counter" in text
+
+
+@pytest.fixture
+def server(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(instrumentation, "metrics", metrics)
+    server = start_metrics_server(0, "127.0.0.1")
+    yield metrics, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_metrics_server(server):
+    metrics, url = server
+    metrics.incr("requests", 2)
+    with urllib.request.urlopen(f"{url}/metrics") as response:
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert "ev_requests_total 2" in response.read().decode()
+    with urllib.request.urlopen(f"{url}/metrics.json") as response:
+        assert json.load(response)["counters"] == {"requests": 2}
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"{url}/other")
+    assert error.value.code == 404
@@ -0,0 +1,74 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from instrumentation import metrics
+from model_registry import ForecastRegistry
+
+START = pd.Timestamp("2024-01-01", tz="UTC")
+
+
+@pytest.fixture
+def prices(make_series):
+    """`days` of a daily sine wave starting `first_day` days in."""
+    def make(days, first_day=0):
+        return make_series(0.2 + 0.1 * np.sin(np.arange(48 * days) / 48 * 2 * np.pi), START + pd.Timedelta(days=first_day))
+    return make
+
+
+def counters():
+    return {k.rsplit(".", 1)[1]: v for k, v in metrics.snapshot()["counters"].items() if k.startswith("forecast_registry.")}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    metrics.reset()
+    return ForecastRegistry(root=str(tmp_path), max_updates=2)
+
+
+def test_same_prices_are_a_hit(registry, prices):
+    first = registry.get("A", prices(7))
+    assert registry.get("A", prices(7)) is first
+    assert counters() == {"fit": 1, "hit": 1}
+
+
+def test_appended_slots_warm_start_the_stored_model(registry, prices):
+    first = registry.get("A", prices(7))
+    second = registry.get("A", prices(8))
+    assert second is first
+    assert second.metrics["updates"] == 1
+    assert counters() == {"fit": 1, "update": 1}
+
+
+def test_refit_after_max_updates(registry, prices):
+    registry.get("A", prices(7))
+    registry.get("A", prices(8))
+    registry.get("A", prices(9))
+    refit = registry.get("A", prices(10))
+    assert refit.metrics["updates"] == 0
+    assert counters() == {"fit": 2, "update": 2}
+
+
+def test_refit_when_history_no_longer_lines_up(registry, prices):
+    registry.get("A", prices(7))
+    registry.get("A", prices(7, first_day=1))
+    assert counters() == {"fit": 2}
+
+
+def test_reloaded_from_disk_by_a_new_registry(registry, prices, tmp_path):
+    registry.get("A", prices(7))
+    assert os.path.exists(tmp_path / "A.pkl")
+    fresh = ForecastRegistry(root=str(tmp_path))
+    model = fresh.get("A", prices(7))
+    assert model.trained
+    assert counters() == {"fit": 1, "hit": 1}
+    # Later warm starts build on the reloaded entry
+    fresh.get("A", prices(8))
+    assert counters() == {"fit": 1, "hit": 1, "update": 1}
+
+
+def test_keys_are_independent(registry, prices):
+    a = registry.get("A", prices(7))
+    b = registry.get("B", prices(7))
+    assert a is not b
+    assert registry.get("A", prices(7)) is a
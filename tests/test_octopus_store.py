@@ -0,0 +1,194 @@
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+import octopus
+from octopus import fetch_unit_rates
+from price_series import PriceSeries, SLOT_SECONDS
+from price_store import PriceStore
+
+PRODUCT = "AGILE-TEST"
+FIRST = pd.Timestamp("2024-01-01", tz="UTC")
+
+
+def results(n, offset=0, pence=None):
+    """Octopus-style results for slots offset..offset+n, newest first like the API."""
+    rows = []
+    for k in range(offset, offset + n):
+        start = FIRST + pd.Timedelta(minutes=30 * k)
+        price = float(k % 48) if pence is None else pence
+        rows.append({"value_exc_vat": price / 1.05, "value_inc_vat": price,
+                     "valid_from": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                     "valid_to": (start + pd.Timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M:%SZ")})
+    return rows[::-1]
+
+
+class FakeOctopus:
+    """The unit-rates endpoint on a local port: paged, newest first, honouring period_from.
+
+    `rates` maps (product, region) to results; unknown ones are a 404 and
+    every request fails while `fail` is set.
+    """
+    ROUTE = re.compile(r"/v1/products/([^/]+)/electricity-tariffs/E-1R-[^/]+-([^/]+)/standard-unit-rates/")
+
+    def __init__(self, rates):
+        self.rates = rates
+        self.requests = 0
+        self.fail = False
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake.requests += 1
+                url = urlsplit(self.path)
+                match = fake.ROUTE.fullmatch(url.path)
+                if fake.fail or not match or tuple(match.groups()) not in fake.rates:
+                    self.send_error(500 if fake.fail else 404)
+                    return
+                body = json.dumps(fake.page(match.groups(), dict(parse_qsl(url.query)), url.path)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def page(self, key, query, path):
+        results = self.rates[tuple(key)]
+        if "period_from" in query:
+            since = pd.Timestamp(query["period_from"])
+            results = [r for r in results if pd.Timestamp(r["valid_from"]) >= since]
+        size, page = int(query["page_size"]), int(query.get("page", 1))
+        more = page * size < len(results)
+        return {
+            "count": len(results),
+            "next": f"{self.url}{path}?" + urlencode({**query, "page": page + 1}) if more else None,
+            "results": results[(page - 1) * size:page * size],
+        }
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class RecordingSession(requests.Session):
+    """Keeps the URL of every request it sends."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def get(self, url, **kwargs):
+        response = super().get(url, **kwargs)
+        self.sent.append(response.url)
+        return response
+
+
+@pytest.fixture
+def server(monkeypatch):
+    fake = FakeOctopus({(PRODUCT, "A"): results(250), (PRODUCT, "B"): results(10)})
+    monkeypatch.setattr(octopus, "OCTOPUS_API_URL", f"{fake.url}/v1")
+    monkeypatch.setattr(octopus, "PAGE_SIZE", 100)
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(str(tmp_path), backfill_days=365 * 100)
+
+
+def epoch(k):
+    return int((FIRST - pd.Timestamp(0, tz="UTC")).total_seconds()) + k * SLOT_SECONDS
+
+
+def test_fetch_follows_every_page(server):
+    rows = fetch_unit_rates(PRODUCT, "A")
+    assert server.requests == 3
+    assert rows == results(250)
+
+
+def test_fetch_honours_period_from(server):
+    rows = fetch_unit_rates(PRODUCT, "A", epoch(240))
+    assert [r["valid_from"] for r in rows] == [r["valid_from"] for r in results(10, offset=240)]
+
+
+def test_update_only_asks_for_newer_slots(server, store):
+    session = RecordingSession()
+    assert store.update(PRODUCT, "A", session=session) == 250
+    server.rates[(PRODUCT, "A")] = results(260)
+    session.sent.clear()
+    assert store.update(PRODUCT, "A", session=session) == 10
+
+    assert len(session.sent) == 1
+    query = dict(parse_qsl(urlsplit(session.sent[0]).query))
+    assert pd.Timestamp(query["period_from"]) == pd.Timestamp(epoch(250), unit="s", tz="UTC")
+    stored = store.load(PRODUCT, "A")
+    assert len(stored) == 260
+    np.testing.assert_array_equal(stored.starts, [epoch(k) for k in range(260)])
+    assert store.update(PRODUCT, "A", session=session) == 0
+
+
+def test_append_dedups_overlap_keeping_latest(store):
+    assert store.append(PRODUCT, "A", PriceSeries.from_octopus_results(results(20))) == 20
+    # Slots 10..29: ten repeats with revised prices, ten new
+    assert store.append(PRODUCT, "A", PriceSeries.from_octopus_results(results(20, offset=10, pence=99.0))) == 10
+    stored = store.load(PRODUCT, "A")
+    np.testing.assert_array_equal(stored.starts, [epoch(k) for k in range(30)])
+    np.testing.assert_allclose(stored.prices[:10], np.arange(10) / 100)
+    np.testing.assert_allclose(stored.prices[10:], 0.99)
+
+
+def test_fetch_raises_on_http_error(server):
+    server.fail = True
+    with pytest.raises(requests.HTTPError):
+        fetch_unit_rates(PRODUCT, "A")
+
+
+def test_failed_update_keeps_stored_prices(server, store):
+    store.update(PRODUCT, "A")
+    server.fail = True
+    with pytest.raises(requests.HTTPError):
+        store.update(PRODUCT, "A")
+    assert len(store.load(PRODUCT, "A")) == 250
+
+
+def test_update_regions_reports_failures_per_region(server, store):
+    added, errors = store.update_regions(PRODUCT, ["A", "B", "C"], max_workers=3)
+    assert added == {"A": 250, "B": 10}
+    assert list(errors) == ["C"]
+    assert isinstance(errors["C"], requests.HTTPError)
+
+
+def test_readers_in_other_processes_never_see_mixed_columns(tmp_path):
+    # Separate stores share no locks, like separate processes
+    writer, reader = PriceStore(str(tmp_path)), PriceStore(str(tmp_path))
+    done = threading.Event()
+
+    def write():
+        for k in range(40):
+            writer.append(PRODUCT, "A", PriceSeries.from_octopus_results(results(5, offset=5 * k)))
+        done.set()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    while not done.is_set():
+        stored = reader.load(PRODUCT, "A")
+        assert len(stored.starts) == len(stored.prices)
+    thread.join()
+    assert len(reader.load(PRODUCT, "A")) == 200
+    generations = [name for name in os.listdir(tmp_path / PRODUCT / "A") if name.startswith("gen-")]
+    assert len(generations) <= 2
+
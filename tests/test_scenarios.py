@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from price_series import PriceSeries
+from scenarios import ScenarioForecaster, ScenarioPlanner, cvar
+
+
+class ZeroForecaster:
+    """Predicts 0 everywhere, so scenarios are the bootstrapped residual blocks themselves."""
+    trained = True
+    metrics = {}
+
+    class model:
+        @staticmethod
+        def predict(features):
+            return np.zeros(len(features))
+
+    @staticmethod
+    def prepare_features(prices):
+        return pd.DataFrame(index=range(len(prices)))
+
+
+def local_grid(start, periods):
+    starts = pd.date_range(pd.Timestamp(start, tz="Europe/London").tz_convert("UTC"), periods=periods, freq="30min")
+    return ((starts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+
+
+def brute_cvar(costs, alpha):
+    worst = sorted(costs)[::-1][:max(1, int(np.ceil((1 - alpha) * len(costs))))]
+    return sum(worst) / len(worst)
+
+
+def test_cvar_is_the_mean_of_the_worst_tail():
+    rng = np.random.default_rng(0)
+    costs = rng.normal(size=(37, 5))
+    for alpha in (0.0, 0.5, 0.9, 0.99):
+        expected = [brute_cvar(costs[:, j], alpha) for j in range(5)]
+        np.testing.assert_allclose(cvar(costs, alpha), expected)
+        np.testing.assert_allclose(cvar(costs.T, alpha, axis=1), expected)
+
+
+def test_blocks_follow_local_time_across_the_clock_change():
+    # History of residuals equal to the local clock hour, spanning the October change
+    starts = local_grid("2024-10-20", 48 * 10)
+    clock = pd.to_datetime(starts, unit="s", utc=True).tz_convert("Europe/London")
+    history = PriceSeries(starts, (clock.hour + clock.minute / 60).to_numpy(np.float32))
+    forecaster = ScenarioForecaster(ZeroForecaster(), n_scenarios=50).fit(history)
+    tomorrow = local_grid("2024-10-30 18:00", 12)
+    paths = forecaster.sample(tomorrow)
+    expected = np.array([18 + k / 2 for k in range(12)])
+    np.testing.assert_allclose(paths, np.broadcast_to(expected, paths.shape))
+
+
+@pytest.fixture
+def planner():
+    rng = np.random.default_rng(1)
+    return ScenarioPlanner(local_grid("2024-01-01", 24), rng.uniform(0.0, 0.4, (40, 24)))
+
+
+@pytest.mark.parametrize("risk", ["expected", "cvar"])
+def test_best_window_matches_brute_force(planner, risk):
+    for slots in (1, 3, 8, 24):
+        best = planner.best_window(slots, kwh_needed=20, risk=risk, alpha=0.8)
+        scores = []
+        for i in range(24 - slots + 1):
+            costs = [row[i:i + slots].sum() * 20 / slots for row in planner.scenarios]
+            scores.append(np.mean(costs) if risk == "expected" else brute_cvar(costs, 0.8))
+        i = int(np.argmin(scores))
+        assert best["start"] == planner.starts[i]
+        assert best["expected_cost" if risk == "expected" else "cvar"] == pytest.approx(scores[i])
+    assert planner.best_window(25, 20) is None
+
+
+@pytest.mark.parametrize("risk", ["expected", "cvar"])
+def test_best_slots_matches_brute_force_over_candidates(planner, risk):
+    kwh, cap = 11.0, 3.7
+    best = planner.best_slots(kwh, cap, risk=risk, alpha=0.8)
+    scores = []
+    for ranking in [planner.scenarios.mean(axis=0), *planner.scenarios]:
+        plan, left = np.zeros(24), kwh
+        for i in np.argsort(ranking, kind="stable"):
+            plan[i], left = min(cap, left), left - min(cap, left)
+        costs = [float(plan @ row) for row in planner.scenarios]
+        scores.append((np.mean(costs) if risk == "expected" else brute_cvar(costs, 0.8), plan))
+    score, plan = min(scores, key=lambda item: item[0])
+    assert best["energy_kwh"].sum() == pytest.approx(kwh)
+    assert best["expected_cost" if risk == "expected" else "cvar"] == pytest.approx(score)
+    np.testing.assert_allclose(best["energy_kwh"], plan)
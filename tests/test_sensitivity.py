@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from price_calculator import PriceCalculator
+from instrumentation import metrics
+from sensitivity import SensitivityGrid
+from slot_scheduler import SLOT_HOURS
+
+NOW = pd.Timestamp("2024-01-02 03:10", tz="UTC")
+
+
+@pytest.fixture
+def prices(make_series):
+    return make_series(200, seed=1)
+
+
+def test_points_match_the_advisor_schedule(prices):
+    grid = SensitivityGrid(prices, NOW)
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        capacity, current, target = float(rng.integers(10, 151)), int(rng.integers(0, 100)), int(rng.integers(1, 101))
+        hours, charger_kw = int(rng.integers(1, 13)), float(rng.choice(grid.charger_kws))
+        point = grid.at(capacity, current, target, hours, charger_kw)
+
+        calculator = PriceCalculator(prices, capacity, current, target, hours)
+        calculator.now = NOW.tz_convert("Europe/London")
+        plan = calculator.schedule_charging(charger_kw, NOW + pd.Timedelta(hours=hours))
+        assert point["cost"] == pytest.approx(plan["cost"], abs=1e-5)
+        assert point["delivered"] == pytest.approx(plan["delivered_kwh"])
+
+
+def test_best_start_is_the_cheapest_full_power_run(prices):
+    grid = SensitivityGrid(prices, NOW)
+    first = prices.index_of(NOW)
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        capacity, hours, charger_kw = float(rng.integers(10, 151)), int(rng.integers(1, 13)), 7.4
+        point = grid.at(capacity, 20, 80, hours, charger_kw)
+        slots = int(np.ceil(point["delivered"] / (charger_kw * SLOT_HOURS) - 1e-9))
+        n = int(grid.n_slots[list(grid.hours).index(hours)])
+        future = prices.prices[first:first + n].astype(np.float64)
+        sums = [future[i:i + slots].sum() for i in range(n - slots + 1)]
+        assert point["best_start"] == prices.local_time(first + int(np.argmin(sums)))
+
+
+def test_tensors_agree_with_points(prices):
+    grid = SensitivityGrid(prices, NOW, capacities=(40, 80), soc=[(20, 80), (50, 60)], hours=(2, 6), charger_kws=(3.6, 7.4))
+    tensors = grid.tensors
+    assert tensors["cost"].shape == (2, 2, 2, 2)
+    point = grid.at(80, 50, 60, 6, 3.6)
+    assert tensors["cost"][1, 1, 1, 0] == pytest.approx(point["cost"])
+    assert (tensors["savings"] >= -1e-9).all()
+
+
+def test_nothing_to_charge_past_the_data(prices):
+    grid = SensitivityGrid(prices, pd.Timestamp("2030-01-01", tz="UTC"))
+    point = grid.at(60, 20, 80, 4, 7.4)
+    assert point["delivered"] == 0 and point["cost"] == 0 and point["best_start"] is None
+
+
+def test_grid_is_evaluated_once_per_instance(prices):
+    metrics.reset()
+    grid = SensitivityGrid(prices, NOW)
+    grid.cost, grid.savings, grid.best_start
+    grid.heatmap("cost"), grid.heatmap("savings", rows="soc", columns="charger_kw")
+    assert metrics.snapshot()["timers"]["sensitivity.grid"]["count"] == 1
@@ -0,0 +1,78 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from price_calculator import PriceCalculator
+from slot_scheduler import cheapest_slots, tapered_slots, SLOT_HOURS
+
+TAPER = ((0, 50, 80, 100), (7.0, 7.0, 3.0, 1.0))
+
+
+def brute_force_taper(prices, kwh_needed, battery_capacity, current_soc, taper, energy_step=0.1):
+    """Every rest/charge pattern simulated in time order: (most energy reachable, its cheapest cost)."""
+    soc_points, kw_points = (np.asarray(v, dtype=np.float64) for v in taper)
+    n_states = int(round(kwh_needed / energy_step)) + 1
+    best = (-1, np.inf)
+    for pattern in itertools.product((False, True), repeat=len(prices)):
+        state, cost = 0, 0.0
+        for price, charge in zip(prices, pattern):
+            if not charge:
+                continue
+            soc = current_soc + state * energy_step / battery_capacity * 100
+            steps = int(np.floor(np.interp(soc, soc_points, kw_points) * SLOT_HOURS / energy_step + 1e-9))
+            nxt = min(state + steps, n_states - 1)
+            cost += price * (nxt - state) * energy_step
+            state = nxt
+        if state > best[0] or (state == best[0] and cost < best[1] - 1e-12):
+            best = (state, cost)
+    return best[0] * energy_step, best[1]
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_tapered_slots_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    prices = np.round(rng.uniform(-0.05, 0.4, int(rng.integers(1, 9))), 3)
+    kwh_needed = float(rng.choice([0.5, 2.0, 4.5, 9.0]))
+    current_soc = float(rng.uniform(30, 90))
+    energy = tapered_slots(prices, kwh_needed, 20, current_soc, TAPER)
+    delivered, cost = brute_force_taper(prices, kwh_needed, 20, current_soc, TAPER)
+    assert energy.sum() == pytest.approx(delivered)
+    assert energy @ prices == pytest.approx(cost)
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_cheapest_slots_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(0, 0.4, 6)
+    kwh_needed, cap = float(rng.uniform(0, 12)), 3.7
+    energy = cheapest_slots(prices, kwh_needed, cap)
+    # Optimal plans fill whole slots cheapest first, so only the set of full slots varies
+    best = min(
+        sum(prices[i] * cap for i in full) + prices[rest] * (kwh_needed - cap * len(full))
+        for k in range(len(prices) + 1) for full in itertools.combinations(range(len(prices)), k)
+        if cap * len(full) <= kwh_needed for rest in set(range(len(prices))) - set(full)
+        if kwh_needed - cap * len(full) <= cap
+    ) if kwh_needed <= cap * len(prices) else None
+    assert energy.sum() == pytest.approx(min(kwh_needed, cap * len(prices)))
+    if best is not None:
+        assert energy @ prices == pytest.approx(best)
+    assert (energy <= cap + 1e-12).all()
+
+
+def test_schedule_charging_taper_never_exceeds_charger(make_series):
+    starts = pd.date_range("2026-01-01", periods=12, freq="30min", tz="UTC")
+    prices = make_series(np.linspace(0.3, 0.1, 12), starts[0])
+    calculator = PriceCalculator(prices, 60, 20, 80, 6)
+    plan = calculator.schedule_charging(3.6, starts[-1] + pd.Timedelta(minutes=30), plug_in=starts[0], taper=TAPER)
+    assert (plan["schedule_df"]["energy_kwh"] <= 3.6 * SLOT_HOURS + 1e-9).all()
+    clamped = tapered_slots(prices.prices, 36, 60, 20, (TAPER[0], np.minimum(TAPER[1], 3.6)))
+    assert plan["delivered_kwh"] == pytest.approx(clamped.sum())
+
+
+def test_charging_slots_skip_the_partial_current_slot(make_series):
+    starts = pd.date_range("2026-01-01", periods=12, freq="30min", tz="UTC")
+    prices = make_series(np.full(12, 0.2), starts[0])
+    calculator = PriceCalculator(prices, 60, 20, 80, 2)
+    now = starts[0] + pd.Timedelta(minutes=10)
+    assert len(calculator.charging_slots(now + pd.Timedelta(hours=2), plug_in=now)) == 3
+    assert len(calculator.charging_slots(starts[0] + pd.Timedelta(hours=2), plug_in=starts[0])) == 4
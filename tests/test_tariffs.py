@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from price_series import PriceSeries
+from price_store import PriceStore
+from tariffs import AgileTariff, FlatTariff, TariffComparison, TimeOfUseTariff
+
+REGIONS = ["A", "B", "C"]
+
+
+def grid(day, days=1):
+    start = pd.Timestamp(day, tz="Europe/London")
+    end = start + pd.DateOffset(days=days)
+    starts = pd.date_range(start.tz_convert("UTC"), end.tz_convert("UTC"), freq="30min", inclusive="left")
+    return ((starts - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+
+
+@pytest.fixture
+def tariffs(tmp_path):
+    store = PriceStore(str(tmp_path))
+    starts = grid("2024-03-30", 3)
+    rng = np.random.default_rng(2)
+    for code in ("A", "B"):
+        # Region B misses an afternoon; C has no Agile prices at all
+        keep = slice(None) if code == "A" else np.r_[0:60, 70:len(starts)]
+        store.append("AGILE-TEST", code, PriceSeries(starts[keep], rng.uniform(-0.05, 0.4, len(starts))[keep].astype(np.float32)))
+    return [
+        FlatTariff("Flat", {"A": 0.25, "B": 0.24, "C": 0.26}, standing_charge=0.6),
+        TimeOfUseTariff("Go", day_rate=0.27, night_rate=0.085, standing_charge=0.5),
+        TimeOfUseTariff("Overnight", day_rate=0.3, night_rate=0.1, night=("23:00", "06:00")),
+        AgileTariff("Agile", "AGILE-TEST", store=store, standing_charge=0.6),
+    ]
+
+
+def test_einsum_matches_a_loop_per_tariff(tariffs):
+    starts = grid("2024-03-30", 3)
+    comparison = TariffComparison(starts, REGIONS, tariffs)
+    rng = np.random.default_rng(0)
+    kwh = rng.uniform(0, 3.7, (len(REGIONS), len(starts))) * (rng.random((len(REGIONS), len(starts))) < 0.2)
+    costs = comparison.costs(kwh)
+    local = pd.to_datetime(starts, unit="s", utc=True).tz_convert("Europe/London")
+    minutes = np.asarray(local.hour * 60 + local.minute)
+    for tariff in tariffs:
+        rates = np.asarray(tariff.rates(starts, minutes, REGIONS), dtype=np.float64)
+        for r, region in enumerate(REGIONS):
+            used = kwh[r] > 0
+            expected = (rates[r, used] * kwh[r, used]).sum() + tariff.standing_charge * comparison.days
+            assert costs.loc[tariff.name, region] == pytest.approx(expected, nan_ok=True)
+    assert comparison.days == 3
+    assert np.isnan(costs.loc["Agile", "C"]) and np.isnan(costs.loc["Agile", "B"])
+    assert np.isfinite(costs.loc["Agile", "A"])
+    assert comparison.cheapest(kwh).set_index("region").loc["C", "tariff"] != "Agile"
+
+
+@pytest.mark.parametrize("day, night_slots", [("2024-03-30", 10), ("2024-03-31", 8), ("2024-10-27", 12)])
+def test_time_of_use_follows_local_clock_on_dst_days(day, night_slots):
+    starts = grid(day)
+    go = TimeOfUseTariff("Go", day_rate=0.3, night_rate=0.1)
+    comparison = TariffComparison(starts, ["A"], [go])
+    night = comparison.rates[0, 0] == 0.1
+    assert night.sum() == night_slots
+    local = pd.to_datetime(starts[night], unit="s", utc=True).tz_convert("Europe/London")
+    assert local[0].strftime("%H:%M") == "00:30" and local[-1].strftime("%H:%M") == "05:00"
+    # One kWh every slot of the day
+    assert comparison.costs(np.ones(len(starts)), include_standing=False).iloc[0, 0] == pytest.approx(
+        0.1 * night_slots + 0.3 * (len(starts) - night_slots))
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from v2g import V2GOptimizer
+
+START = pd.Timestamp("2024-01-01", tz="UTC")
+
+
+def fleet(n=3, current_soc=50.0, target_soc=80.0, hours=12):
+    return pd.DataFrame({
+        "vehicle_id": range(n), "battery_kwh": 60.0, "current_soc": current_soc, "target_soc": target_soc,
+        "max_kw": 7.4, "arrival": START, "departure": START + pd.Timedelta(hours=hours),
+    })
+
+
+def volatile(n=24, seed=0):
+    return np.random.default_rng(seed).uniform(0.02, 0.60, n)
+
+
+def test_soc_stays_within_floor_and_capacity(make_series):
+    power, soc, _ = V2GOptimizer(make_series(volatile()), min_soc=30).optimize(fleet())
+    assert soc.min() >= 30 - 1e-6
+    assert soc.max() <= 100 + 1e-6
+    assert (np.abs(power) <= 7.4 + 1e-6).all()
+
+
+def test_departure_target_is_met(make_series):
+    _, soc, summary = V2GOptimizer(make_series(volatile())).optimize(fleet(target_soc=90))
+    assert (soc[:, -1] >= 90 - 1e-6).all()
+    assert np.allclose(summary["shortfall_kwh"], 0, atol=1e-6)
+
+
+def test_round_trip_efficiency_is_applied(make_series):
+    rte = 0.81
+    power, soc, summary = V2GOptimizer(make_series(volatile()), round_trip_efficiency=rte).optimize(fleet())
+    eta = np.sqrt(rte)
+    stored_change = (soc[:, -1] - 50) / 100 * 60
+    expected = summary["charged_kwh"] * eta - summary["discharged_kwh"] / eta
+    assert np.allclose(stored_change, expected, atol=1e-6)
+    # Cycling is never free, so a flat price earns nothing from exporting
+    _, _, flat = V2GOptimizer(make_series([0.3] * 24), round_trip_efficiency=rte).optimize(fleet())
+    assert np.allclose(flat["discharged_kwh"], 0, atol=1e-6)
+
+
+def test_profit_is_never_below_charge_only(make_series):
+    for seed in range(5):
+        _, _, summary = V2GOptimizer(make_series(volatile(seed=seed))).optimize(fleet())
+        assert (summary["arbitrage_profit"] >= -1e-9).all()
+        assert np.allclose(summary["charge_only_cost"] - summary["cost"] - summary["degradation_cost"],
+                           summary["arbitrage_profit"])
+
+
+def test_scenarios_are_solved_as_blocks(make_series):
+    scenarios = np.stack([volatile(seed=s) for s in range(4)])
+    optimizer = V2GOptimizer(make_series(scenarios[0]))
+    power, soc, summary = optimizer.optimize(fleet(2), scenarios=scenarios)
+    assert power.shape == soc.shape == (2, 4, 24)
+    assert len(summary) == 8
+    _, _, single = optimizer.optimize(fleet(2))
+    assert np.allclose(summary.loc[summary["scenario"] == 0, "cost"], single["cost"])
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from window_engine import cheapest_windows, window_means
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_ties_on_rounded_prices_go_to_the_earliest_start(seed):
+    # Whole-penny prices tie often; integer sums give the exact answer
+    rng = np.random.default_rng(seed)
+    pence = rng.integers(5, 40, 96)
+    prices = (pence / 100).astype(np.float32)
+    results = cheapest_windows(prices, range(2, 25, 2))
+    for slots in range(2, 25, 2):
+        sums = np.array([pence[i:i + slots].sum() for i in range(len(pence) - slots + 1)])
+        expected = int(np.argmin(sums))
+        assert results[slots][0] == expected
+
+
+def test_first_start_and_too_few_slots():
+    prices = np.array([0.3, 0.1, 0.1, 0.2, 0.1, 0.1])
+    assert cheapest_windows(prices, [2], first_start=2)[2] == (4, pytest.approx(0.1))
+    assert cheapest_windows(prices, [7])[7] == (None, None)
+    assert len(window_means(prices, 7)) == 0
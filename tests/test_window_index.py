@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from window_engine import cheapest_window
+from window_index import WindowIndex
+
+
+START = "2024-03-30"
+
+
+def brute_force(prices, slots, first, last):
+    """Earliest cheapest window of `slots` starting in [first, last], summing each window."""
+    best = (None, None)
+    for i in range(max(first, 0), min(last, len(prices) - slots) + 1):
+        mean = float(np.mean(prices[i:i + slots], dtype=np.float64))
+        if best[0] is None or mean < best[1] - 1e-12:
+            best = (i, mean)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_cheapest_between_matches_brute_force(seed, make_series):
+    prices = make_series(150, START, seed, low=-0.05)
+    index = WindowIndex(prices)
+    rng = np.random.default_rng(seed)
+    for _ in range(200):
+        hours = int(rng.integers(1, 13))
+        first, last = sorted(rng.integers(-5, 160, size=2))
+        start, mean = index.cheapest_between(hours, int(first), int(last))
+        expected = brute_force(prices.prices, hours * 2, int(first), int(last))
+        assert start == expected[0]
+        if start is not None:
+            assert mean == pytest.approx(expected[1])
+
+
+def test_cheapest_on_day_stays_inside_the_day(make_series):
+    # Spans the clocks going forward (a 46-slot local day)
+    prices = make_series(48 * 4, START, seed=1, low=-0.05)
+    index = WindowIndex(prices)
+    for date in pd.date_range("2024-03-30", "2024-04-01").date:
+        day = prices.day(date)
+        first = prices.index_of(int(day.starts[0]))
+        start, mean = index.cheapest_on_day(3, date)
+        expected = cheapest_window(day.prices, 6)
+        assert start == first + expected[0]
+        assert mean == pytest.approx(expected[1])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_ties_on_rounded_prices_go_to_the_earliest_start(seed, make_series):
+    # Whole-penny prices tie often; integer sums give the exact answer
+    pence = np.random.default_rng(seed).integers(5, 40, 96)
+    index = WindowIndex(make_series(pence / 100))
+    for hours in range(1, 13):
+        sums = np.array([pence[i:i + 2 * hours].sum() for i in range(len(pence) - 2 * hours + 1)])
+        assert index.cheapest_between(hours, 0, len(pence))[0] == int(np.argmin(sums))
+
+
+def test_too_long_a_window_finds_nothing(make_series):
+    index = WindowIndex(make_series(10, START, low=-0.05))
+    assert index.cheapest_between(6, 0, 10) == (None, None)
+    assert index.cheapest_within(6) == (None, None)
@@ -0,0 +1,55 @@
+import numpy as np
+from window_optimizer import WindowCandidates
+
+
+def naive_front(price, carbon):
+    """Indices no other candidate beats on both axes; duplicates keep the first."""
+    price, carbon = np.round(price, 9), np.round(carbon, 9)
+    front = []
+    for i in range(len(price)):
+        beaten = any(
+            price[j] <= price[i] and carbon[j] <= carbon[i]
+            and (price[j] < price[i] or carbon[j] < carbon[i] or j < i)
+            for j in range(len(price)) if j != i
+        )
+        if not beaten:
+            front.append(i)
+    return front
+
+
+def candidates(n=96, seed=0, decimals=None):
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(-0.05, 0.4, n)
+    carbon = rng.uniform(50, 300, n)
+    if decimals is not None:
+        # Coarse values make equal averages (ties) common
+        prices, carbon = np.round(prices, decimals), np.round(carbon, decimals - 3)
+    carbon[rng.integers(0, n, 3)] = np.nan
+    return WindowCandidates(prices, carbon, slot_counts=(1, 2, 4, 8))
+
+
+def test_pareto_front_matches_pairwise_dominance():
+    for seed in range(5):
+        c = candidates(seed=seed)
+        front = c.pareto_front()
+        assert sorted(front) == naive_front(c.avg_price, c.avg_carbon)
+        assert (np.diff(c.avg_price[front]) >= 0).all()
+        assert (np.diff(c.avg_carbon[front]) < 0).all()
+
+
+def test_pareto_front_with_ties():
+    c = candidates(n=48, decimals=1)
+    front = c.pareto_front()
+    assert sorted(front) == naive_front(c.avg_price, c.avg_carbon)
+
+    tied = WindowCandidates([0.1, 0.1, 0.2, 0.1], [100, 100, 50, 200], slot_counts=(1,))
+    # Equal windows are reported once; an equal price with more carbon is beaten
+    assert tied.pareto_front().tolist() == [0, 2]
+
+
+def test_empty_candidates():
+    c = WindowCandidates([0.1, 0.2], [np.nan, np.nan], slot_counts=(1, 2))
+    assert len(c) == 0
+    assert len(c.pareto_front()) == 0
+    assert c.weighted_best() is None and c.greenest_within() is None
+    assert len(WindowCandidates([0.1, 0.2], [100, 100], slot_counts=(3,))) == 0
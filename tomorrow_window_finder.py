@@ -1,45 +1,42 @@
-import pandas as pd
 from datetime import datetime, timedelta
 import pytz
+from instrumentation import timer
+from price_series import PriceSeries
+from window_engine import cheapest_window
 
 class TomorrowWindowFinder:
-    def __init__(self, df, window_hours, timezone="Europe/London"):
-        self.df = df.copy()
+    def __init__(self, df, window_hours, timezone="Europe/London", index=None):
+        self.prices = PriceSeries.coerce(df, timezone)
+        # Optional WindowIndex over the same series turns the search into a lookup
+        self.index = index
         self.window_hours = window_hours
         self.timezone = timezone
         self.london_tz = pytz.timezone(timezone)
-        for col in ['valid_from_bst', 'valid_to_bst']:
-            if pd.api.types.is_datetime64_any_dtype(self.df[col]):
-                if self.df[col].dt.tz is None:
-                    self.df[col] = self.df[col].dt.tz_localize('UTC').dt.tz_convert(self.london_tz)
-                else:
-                    self.df[col] = self.df[col].dt.tz_convert(self.london_tz)
-            else:
-                self.df[col] = pd.to_datetime(self.df[col], utc=True).dt.tz_convert(self.london_tz)
-        self.df = self.df.sort_values('valid_from_bst').reset_index(drop=True)
 
+    @property
+    def df(self):
+        return self.prices.to_frame()
+
+    @timer("tomorrow_window_finder.find_cheapest_window_tomorrow")
     def find_cheapest_window_tomorrow(self):
         tomorrow = (datetime.now(self.london_tz) + timedelta(days=1)).date()
-        df_tomorrow = self.df[self.df['valid_from_bst'].dt.date == tomorrow].reset_index(drop=True)
+        prices_tomorrow = self.prices.day(tomorrow)
         slots_needed = int(self.window_hours * 2)
-        if len(df_tomorrow) < slots_needed:
-            return None, None, None, None, None, len(df_tomorrow)
-
-        min_avg = None
-        min_start = None
-        for i in range(0, len(df_tomorrow) - slots_needed + 1):
-            window = df_tomorrow.iloc[i:i + slots_needed]
-            avg = window['price_gbp'].mean()
-            if (min_avg is None) or (avg < min_avg):
-                min_avg = avg
-                min_start = i
+        if len(prices_tomorrow) < slots_needed:
+            return None, None, None, None, None, len(prices_tomorrow)
 
+        source = prices_tomorrow
+        if self.index is not None and self.index.covers(self.prices, self.window_hours):
+            # Index positions are relative to the full series
+            source = self.prices
+            min_start, avg_price = self.index.cheapest_on_day(self.window_hours, tomorrow)
+        else:
+            min_start, avg_price = cheapest_window(prices_tomorrow.prices, slots_needed)
         if min_start is None:
-            return None, None, None, None, None, len(df_tomorrow)
+            return None, None, None, None, None, len(prices_tomorrow)
 
-        window_df = df_tomorrow.iloc[min_start:min_start + slots_needed]
-        avg_price = window_df['price_gbp'].mean()
+        window_df = source.slice(min_start, min_start + slots_needed).to_frame()
         total_cost = avg_price * self.window_hours  # total cost for 1kW continuous charging
         start_time = window_df.iloc[0]['valid_from_bst']
         end_time = window_df.iloc[-1]['valid_to_bst']
-        return total_cost, avg_price, start_time, end_time, window_df, len(df_tomorrow)
\ No newline at end of file
+        return total_cost, avg_price, start_time, end_time, window_df, len(prices_tomorrow)
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import linprog
+from instrumentation import timer
+from price_series import PriceSeries
+from slot_scheduler import SLOT_HOURS, fill_in_order, plugged_in
+
+
+class V2GOptimizer:
+    """Charge/discharge plans for bidirectional chargers, solved as one batched LP.
+
+    `vehicles` uses the FleetScheduler columns (`vehicle_id`,
+    `battery_kwh`, `current_soc`, `target_soc`, `max_kw`, `arrival`,
+    `departure`) plus optional `max_discharge_kw` (default `max_kw`) and
+    `min_soc` (default the optimizer's `min_soc`, the floor discharging
+    may not cross). Per slot each car draws c kWh and exports d kWh; its
+    stored energy moves by c x eta - d / eta with eta the square root of
+    the round-trip efficiency, must stay between the floor and the
+    capacity, and must reach the target by departure (or as close as the
+    charger allows). Exports earn `export_prices` (default the import
+    price) less `degradation_cost` £/kWh for battery wear.
+
+    Every car (and, with a (scenarios, slots) price matrix, every
+    car x scenario pair) is an independent block of one sparse LP, so a
+    whole depot is a single HiGHS call rather than one solve per car.
+    """
+
+    def __init__(self, prices, round_trip_efficiency=0.85, degradation_cost=0.04, export_prices=None, min_soc=20):
+        self.prices = PriceSeries.coerce(prices)
+        self.eta = np.sqrt(round_trip_efficiency)
+        self.degradation_cost = degradation_cost
+        self.export_prices = export_prices
+        self.min_soc = min_soc
+
+    @timer("v2g.optimize")
+    def optimize(self, vehicles, scenarios=None):
+        """Returns (power_kw, soc, summary).
+
+        power_kw is charge minus discharge per slot and soc the stored
+        energy in % at the end of each slot, both (vehicles, slots), or
+        (vehicles, scenarios, slots) when `scenarios` (a (scenarios, slots)
+        £/kWh matrix on the same slots) is given. The summary has one row
+        per car (and scenario) with the V2G cost, the charge-only cost of
+        the same energy via cheapest_slots and the arbitrage profit.
+        """
+        n_slots = len(self.prices)
+        prices = self.prices.prices.astype(np.float64)[None, :] if scenarios is None else np.asarray(scenarios, dtype=np.float64)
+        n_scen = len(prices)
+        exports = prices if self.export_prices is None else np.broadcast_to(
+            np.asarray(self.export_prices, dtype=np.float64), prices.shape)
+
+        # One block per (vehicle, scenario), vehicles outermost
+        def per_block(values):
+            return np.repeat(np.asarray(values, dtype=np.float64), n_scen, axis=0)
+
+        capacity = per_block(vehicles['battery_kwh'])
+        max_kw = vehicles['max_kw'].to_numpy(np.float64)
+        discharge_kw = vehicles['max_discharge_kw'].to_numpy(np.float64) if 'max_discharge_kw' in vehicles else max_kw
+        min_soc = vehicles['min_soc'].to_numpy(np.float64) if 'min_soc' in vehicles else np.full(len(vehicles), self.min_soc)
+        available = np.repeat(plugged_in(self.prices.starts, vehicles), n_scen, axis=0)
+        charge_cap = per_block(max_kw)[:, None] * SLOT_HOURS * available
+        discharge_cap = per_block(discharge_kw)[:, None] * SLOT_HOURS * available
+        start = np.clip(per_block(vehicles['current_soc']) / 100 * capacity, 0, capacity)
+        floor = np.minimum(per_block(min_soc) / 100 * capacity, start)
+        reachable = np.minimum(start + charge_cap.sum(axis=1) * self.eta, capacity)
+        target = np.minimum(per_block(vehicles['target_soc']) / 100 * capacity, reachable)
+        block_prices = np.tile(prices, (len(vehicles), 1))
+        block_exports = np.tile(exports, (len(vehicles), 1))
+
+        # Variables per block: charge (slots), discharge (slots), stored energy (slots)
+        n_blocks, width = len(capacity), 3 * n_slots
+        cost = np.concatenate([block_prices, self.degradation_cost - block_exports, np.zeros_like(block_prices)], axis=1)
+        lower = np.zeros((n_blocks, width))
+        upper = np.concatenate([charge_cap, discharge_cap, np.repeat(capacity[:, None], n_slots, axis=1)], axis=1)
+        lower[:, 2 * n_slots:] = floor[:, None]
+        lower[:, -1] = np.maximum(floor, target)
+
+        # Energy balance rows: e[t] - e[t-1] - eta c[t] + d[t] / eta = (start if t == 0)
+        offset = (np.arange(n_blocks) * width)[:, None]
+        t = np.arange(n_slots)[None, :]
+        row = np.arange(n_blocks * n_slots).reshape(n_blocks, n_slots)
+        rows = [row, row, row, row[:, 1:]]
+        cols = [offset + 2 * n_slots + t, offset + t, offset + n_slots + t, offset + 2 * n_slots + t[:, :-1]]
+        vals = [1.0, -self.eta, 1 / self.eta, -1.0]
+        a_eq = sparse.csr_matrix((
+            np.concatenate([np.broadcast_to(v, r.shape).ravel() for v, r in zip(vals, rows)]),
+            (np.concatenate([r.ravel() for r in rows]), np.concatenate([np.broadcast_to(c, r.shape).ravel() for c, r in zip(cols, rows)])),
+        ), shape=(n_blocks * n_slots, n_blocks * width))
+        b_eq = np.zeros((n_blocks, n_slots))
+        b_eq[:, 0] = start
+
+        result = linprog(cost.ravel(), A_eq=a_eq, b_eq=b_eq.ravel(),
+                         bounds=np.column_stack([lower.ravel(), upper.ravel()]), method="highs")
+        if not result.success:
+            raise ValueError(f"V2G optimization failed: {result.message}")
+        x = result.x.reshape(n_blocks, 3, n_slots)
+        charge, discharge, stored = x[:, 0], x[:, 1], x[:, 2]
+
+        # Charge-only reference: cheapest_slots for the same stored energy (same losses), row-wise
+        order = np.argsort(block_prices, axis=1, kind="stable")
+        baseline_energy = fill_in_order(order, charge_cap, np.maximum(target - start, 0) / self.eta)
+        baseline = (block_prices * baseline_energy).sum(axis=1)
+        v2g_cost = (block_prices * charge).sum(axis=1) - (block_exports * discharge).sum(axis=1)
+        wear = self.degradation_cost * discharge.sum(axis=1)
+        summary = pd.DataFrame({
+            'vehicle_id': np.repeat(vehicles['vehicle_id'].to_numpy(), n_scen),
+            'scenario': np.tile(np.arange(n_scen), len(vehicles)),
+            'charged_kwh': charge.sum(axis=1),
+            'discharged_kwh': discharge.sum(axis=1),
+            'final_soc': stored[:, -1] / capacity * 100,
+            'shortfall_kwh': np.maximum(per_block(vehicles['target_soc']) / 100 * capacity - stored[:, -1], 0),
+            'cost': v2g_cost,
+            'degradation_cost': wear,
+            'charge_only_cost': baseline,
+            'arbitrage_profit': baseline - v2g_cost - wear,
+        })
+        if scenarios is None:
+            summary = summary.drop(columns='scenario')
+        shape = (len(vehicles), n_scen, n_slots) if scenarios is not None else (len(vehicles), n_slots)
+        power_kw = ((charge - discharge) / SLOT_HOURS).reshape(shape)
+        soc = (stored / capacity[:, None] * 100).reshape(shape)
+        return power_kw, soc, summary
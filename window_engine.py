@@ -0,0 +1,52 @@
+import numpy as np
+
+# Window means closer than this (£/kWh, 0.0001p) count as equal, so float32 prices and
+# prefix-sum rounding can't break ties between equally priced windows
+TIE_TOLERANCE = 1e-6
+
+
+def prefix_sums(prices):
+    """Cumulative sums with a leading zero, so sum(prices[i:j]) == c[j] - c[i]."""
+    c = np.zeros(len(prices) + 1, dtype=np.float64)
+    np.cumsum(np.asarray(prices, dtype=np.float64), out=c[1:])
+    return c
+
+
+def window_means(prices, slots, prefix=None):
+    """Mean price of every contiguous window of `slots` half-hour slots.
+
+    Element i is the mean of prices[i:i + slots]; the result has
+    len(prices) - slots + 1 entries (empty if there are too few slots).
+    """
+    c = prefix_sums(prices) if prefix is None else prefix
+    n = len(c) - 1
+    if slots <= 0 or n < slots:
+        return np.empty(0, dtype=np.float64)
+    return (c[slots:] - c[:-slots]) / slots
+
+
+def cheapest_windows(prices, slot_counts, first_start=0):
+    """Cheapest window for several window lengths in a single pass.
+
+    Returns {slots: (start_index, avg_price)} with (None, None) for lengths
+    that don't fit. Only windows starting at or after `first_start` are
+    considered. Ties (means within TIE_TOLERANCE of the cheapest) resolve
+    to the earliest start, like the old loops.
+    """
+    c = prefix_sums(prices)
+    results = {}
+    for slots in slot_counts:
+        means = window_means(prices, slots, prefix=c)
+        if len(means) <= first_start:
+            results[slots] = (None, None)
+            continue
+        candidates = means[first_start:]
+        ties = np.isclose(candidates, candidates.min(), rtol=0, atol=TIE_TOLERANCE)
+        start = first_start + int(np.argmax(ties))
+        results[slots] = (start, float(means[start]))
+    return results
+
+
+def cheapest_window(prices, slots, first_start=0):
+    """Cheapest single window of `slots` slots: (start_index, avg_price)."""
+    return cheapest_windows(prices, [slots], first_start)[slots]
@@ -0,0 +1,74 @@
+import numpy as np
+from instrumentation import timer
+from price_series import PriceSeries, to_epoch, SLOT_SECONDS
+from window_engine import TIE_TOLERANCE, prefix_sums, window_means
+
+
+class WindowIndex:
+    """Precomputed cheapest-window lookups for a fixed price series.
+
+    For every window length in `hours` the mean price of each window is
+    stored alongside a sparse table of range-argmins, so "cheapest N-hour
+    window starting between slots A and B" is two table reads. Build it
+    once per data version (it costs O(n log n) per length) and query it
+    from every slider move.
+    """
+
+    @timer("window_index.build")
+    def __init__(self, prices, hours=range(1, 13)):
+        self.prices = PriceSeries.coerce(prices)
+        self._means = {}
+        self._tables = {}
+        c = prefix_sums(self.prices.prices)
+        for h in hours:
+            slots = int(h * 2)
+            means = window_means(None, slots, prefix=c)
+            self._means[slots] = means
+            self._tables[slots] = self._sparse_table(means)
+
+    def covers(self, prices, hours):
+        """True if this index was built on `prices` and holds `hours` windows."""
+        return prices is self.prices and int(hours * 2) in self._means
+
+    @staticmethod
+    def _sparse_table(values):
+        """table[j][i] is the earliest argmin of values[i:i + 2**j], up to TIE_TOLERANCE."""
+        table = [np.arange(len(values), dtype=np.int32)]
+        j = 1
+        while (1 << j) <= len(values):
+            prev, half = table[-1], 1 << (j - 1)
+            left, right = prev[:len(values) - (1 << j) + 1], prev[half:half + len(values) - (1 << j) + 1]
+            table.append(np.where(values[right] < values[left] - TIE_TOLERANCE, right, left))
+            j += 1
+        return table
+
+    def cheapest_between(self, hours, first_start, last_start):
+        """Cheapest window of `hours` starting at slot index in [first_start, last_start].
+
+        Returns (start_index, avg_price), or (None, None) if no window fits.
+        """
+        slots = int(hours * 2)
+        means = self._means[slots]
+        first_start = max(first_start, 0)
+        last_start = min(last_start, len(means) - 1)
+        if first_start > last_start:
+            return None, None
+        table = self._tables[slots]
+        j = (last_start - first_start + 1).bit_length() - 1
+        a, b = table[j][first_start], table[j][last_start - (1 << j) + 1]
+        best = int(b if means[b] < means[a] - TIE_TOLERANCE else a)
+        return best, float(means[best])
+
+    def cheapest_within(self, hours, start=None, end=None):
+        """Cheapest window lying wholly inside [start, end) (timestamps; None is open)."""
+        first = 0 if start is None else self.prices.index_of(start)
+        stop = len(self.prices) if end is None else self.prices.index_of(to_epoch(end) - SLOT_SECONDS + 1)
+        return self.cheapest_between(hours, first, stop - int(hours * 2))
+
+    def cheapest_on_day(self, hours, date):
+        """Cheapest window lying wholly inside one local calendar day."""
+        day = self.prices.day(date)
+        if day.empty:
+            return None, None
+        first = self.prices.index_of(int(day.starts[0]))
+        return self.cheapest_between(hours, first, first + len(day) - int(hours * 2))
@@ -0,0 +1,83 @@
+import numpy as np
+from window_engine import TIE_TOLERANCE, prefix_sums, window_means
+
+
+class WindowCandidates:
+    """Every contiguous charging window scored on price and carbon at once.
+
+    `prices` (£/kWh) and `carbon` (gCO₂/kWh) are aligned per slot, e.g. a
+    PriceSeries' prices and CarbonIntensity.aligned() on its starts. For
+    each window length in `slot_counts`, every window starting at or after
+    `first_start` becomes a candidate; windows touching a slot with no
+    carbon forecast are dropped. All scoring is array arithmetic over the
+    flattened candidate set.
+    """
+
+    def __init__(self, prices, carbon, slot_counts, first_start=0):
+        prices = np.asarray(prices, dtype=np.float64)
+        carbon = np.asarray(carbon, dtype=np.float64)
+        price_sums = prefix_sums(prices)
+        carbon_sums = prefix_sums(np.nan_to_num(carbon))
+        missing_sums = prefix_sums(np.isnan(carbon))
+
+        slots, starts, avg_price, avg_carbon = [], [], [], []
+        for k in slot_counts:
+            p = window_means(prices, k, prefix=price_sums)[first_start:]
+            c = window_means(carbon, k, prefix=carbon_sums)[first_start:]
+            gaps = window_means(carbon, k, prefix=missing_sums)[first_start:]
+            keep = gaps == 0
+            slots.append(np.full(keep.sum(), k))
+            starts.append(first_start + np.flatnonzero(keep))
+            avg_price.append(p[keep])
+            avg_carbon.append(c[keep])
+        self.slots = np.concatenate(slots) if slots else np.empty(0, dtype=int)
+        self.starts = np.concatenate(starts) if starts else np.empty(0, dtype=int)
+        self.avg_price = np.concatenate(avg_price) if avg_price else np.empty(0)
+        self.avg_carbon = np.concatenate(avg_carbon) if avg_carbon else np.empty(0)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def window(self, i):
+        """(start_index, slots, avg_price, avg_carbon) for candidate i."""
+        return int(self.starts[i]), int(self.slots[i]), float(self.avg_price[i]), float(self.avg_carbon[i])
+
+    def pareto_front(self):
+        """Candidates not beaten on both price and carbon, cheapest first.
+
+        Averages within TIE_TOLERANCE count as equal; of equal windows only
+        the earliest listed is kept.
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=int)
+        price = np.round(self.avg_price / TIE_TOLERANCE)
+        carbon = np.round(self.avg_carbon / TIE_TOLERANCE)
+        order = np.lexsort((carbon, price))
+        carbon_sorted = carbon[order]
+        best_before = np.minimum.accumulate(np.concatenate([[np.inf], carbon_sorted[:-1]]))
+        return order[carbon_sorted < best_before]
+
+    def weighted_best(self, carbon_weight=0.5):
+        """Best candidate on a blend of min-max normalized price and carbon.
+
+        carbon_weight=0 is cheapest, 1 is greenest.
+        """
+        if len(self) == 0:
+            return None
+
+        def normalized(values):
+            span = values.max() - values.min()
+            return (values - values.min()) / span if span > 0 else np.zeros_like(values)
+
+        score = (1 - carbon_weight) * normalized(self.avg_price) + carbon_weight * normalized(self.avg_carbon)
+        return int(np.argmin(score))
+
+    def greenest_within(self, cost_tolerance=0.05):
+        """Lowest-carbon candidate costing at most (1 + tolerance) x the cheapest."""
+        if len(self) == 0:
+            return None
+        cheapest = self.avg_price.min()
+        # Agile prices can go negative, so the allowance is on the magnitude
+        limit = cheapest + abs(cheapest) * cost_tolerance
+        affordable = np.flatnonzero(self.avg_price <= limit)
+        return int(affordable[np.argmin(self.avg_carbon[affordable])])